@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+# core/compression.py
+"""
+文本压缩存储 (富文本 HTML、超大文本正文共用)
+压缩数据首字节标记编码方式，读取时无需知道写入时是否安装了 zstandard
+"""
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CODEC_ZLIB = b'Z'
+CODEC_ZSTD = b'S'
+
+
+def compress_text(text, level=6):
+    data = text.encode('utf-8')
+    if zstandard is not None:
+        return CODEC_ZSTD + zstandard.ZstdCompressor(level=level).compress(data)
+    return CODEC_ZLIB + zlib.compress(data, level)
+
+
+def decompress_text(blob):
+    if not blob:
+        return None
+    codec, payload = bytes(blob[:1]), bytes(blob[1:])
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("该内容使用 zstd 压缩，需要安装 zstandard")
+        return zstandard.ZstdDecompressor().decompress(payload).decode('utf-8')
+    return zlib.decompress(payload).decode('utf-8')
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# core/file_snapshot.py
+"""
+文件引用 / 快照工具
+- 引用模式: 只记录路径列表 + stat 指纹 (size, mtime, inode)
+- 快照模式: 单文件直接读取字节, 多文件(或文件夹)打包为内存 ZIP
+"""
+import io
+import os
+import json
+import stat
+import tempfile
+import zipfile
+
+# 文件状态 (ClipboardItem.file_state)
+STATE_REFERENCE = 'reference'  # 仅引用，尚未保存内容
+STATE_SNAPSHOT = 'snapshot'    # 内容已保存到 data_blob
+STATE_STALE = 'stale'          # 源文件在快照前已变化或丢失
+
+
+def make_fingerprint(paths):
+    """生成路径列表的 stat 指纹 (JSON 字符串)，不存在的文件记为 missing"""
+    entries = []
+    for p in paths:
+        try:
+            st = os.stat(p)
+            entries.append({
+                'path': p,
+                'size': st.st_size,
+                'mtime': st.st_mtime_ns,
+                'inode': st.st_ino,
+                'dir': stat.S_ISDIR(st.st_mode),
+            })
+        except OSError:
+            entries.append({'path': p, 'missing': True})
+    return json.dumps(entries, ensure_ascii=False)
+
+
+def changed_paths(fingerprint):
+    """重新 stat 并返回与指纹不一致的路径列表 (空列表表示源文件完好)"""
+    if not fingerprint:
+        return []
+    try:
+        entries = json.loads(fingerprint)
+    except ValueError:
+        return []
+    changed = []
+    for old in entries:
+        p = old.get('path')
+        if old.get('missing'):
+            changed.append(p)
+            continue
+        try:
+            st = os.stat(p)
+        except OSError:
+            changed.append(p)
+            continue
+        # 文件夹的 size/mtime 随内容变化，只比较 inode
+        if old.get('dir'):
+            if st.st_ino != old.get('inode'):
+                changed.append(p)
+        elif (st.st_size, st.st_mtime_ns, st.st_ino) != (old.get('size'), old.get('mtime'), old.get('inode')):
+            changed.append(p)
+    return changed
+
+
+def is_volatile_path(path):
+    """临时目录下的文件很可能很快被清理，应立即快照"""
+    try:
+        tmp = os.path.normcase(os.path.realpath(tempfile.gettempdir()))
+        target = os.path.normcase(os.path.realpath(path))
+        return os.path.commonpath([tmp, target]) == tmp
+    except (ValueError, OSError):
+        return False
+
+
+def pack_files(paths):
+    """读取文件内容：单个文件返回原始字节，多个文件或文件夹返回 ZIP 字节"""
+    if len(paths) == 1 and os.path.isfile(paths[0]):
+        with open(paths[0], 'rb') as f:
+            return f.read()
+
+    mem_zip = io.BytesIO()
+    with zipfile.ZipFile(mem_zip, mode='w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for file_path in paths:
+            if os.path.isdir(file_path):
+                root_name = os.path.basename(os.path.normpath(file_path))
+                for dirpath, _, filenames in os.walk(file_path):
+                    for name in filenames:
+                        full = os.path.join(dirpath, name)
+                        rel = os.path.relpath(full, file_path)
+                        zf.write(full, arcname=os.path.join(root_name, rel))
+            else:
+                zf.write(file_path, arcname=os.path.basename(file_path))
+    return mem_zip.getvalue()
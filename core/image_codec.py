@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+# core/image_codec.py
+"""
+图片存储编码策略
+- 无损 PNG (可设压缩级别) / 无损 WebP (需要 Qt 的 webp 图片插件，缺失时退回 PNG)
+- 超过像素上限时等比缩小存储，可选把原图 (快速 PNG) 另存到 original_blob
+- 超大图片捕获时先用最快的 PNG 级别，之后由后台重压缩任务迁移到目标编码
+每个项目的 image_codec 列记录实际使用的编码标签 (如 'png-6'、'webp')，解码和重压缩都依据它
+"""
+import math
+import logging
+from PyQt5.QtCore import QBuffer, QByteArray, QIODevice, Qt
+from PyQt5.QtGui import QImage, QImageWriter
+from core.settings import load_setting
+
+log = logging.getLogger("ImageCodec")
+
+CODEC_PNG = 'png'
+CODEC_WEBP = 'webp'
+FAST_PNG_LEVEL = 1
+
+DEFAULT_PNG_LEVEL = 6
+DEFAULT_FAST_ENCODE_PIXELS = 8_000_000   # 约 4K 截图以上使用快速编码
+
+
+def _flag(value):
+    return str(value).lower() in ('true', '1')
+
+
+def codec_format(tag):
+    """编码标签 -> Qt 图片格式名；旧数据 (标签为空) 一律为 PNG"""
+    return (tag or CODEC_PNG).split('-')[0]
+
+
+def webp_supported():
+    return b'webp' in QImageWriter.supportedImageFormats()
+
+
+class ImagePolicy:
+    """图片存储策略 (从 QSettings 读取，各部署可独立配置)"""
+
+    def __init__(self, codec=CODEC_PNG, png_level=DEFAULT_PNG_LEVEL, max_pixels=0,
+                 keep_original=False, fast_encode_pixels=DEFAULT_FAST_ENCODE_PIXELS):
+        if codec == CODEC_WEBP and not webp_supported():
+            log.warning("Qt 缺少 webp 图片插件，图片改用 PNG 存储")
+            codec = CODEC_PNG
+        self.codec = codec if codec in (CODEC_PNG, CODEC_WEBP) else CODEC_PNG
+        self.png_level = max(0, min(9, int(png_level)))
+        self.max_pixels = max(0, int(max_pixels or 0))
+        self.keep_original = keep_original
+        self.fast_encode_pixels = max(0, int(fast_encode_pixels or 0))
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            codec=str(load_setting("image_codec", CODEC_PNG)).lower(),
+            png_level=load_setting("image_png_level", DEFAULT_PNG_LEVEL),
+            max_pixels=load_setting("image_max_pixels", 0),
+            keep_original=_flag(load_setting("image_keep_original", False)),
+            fast_encode_pixels=load_setting("image_fast_encode_pixels", DEFAULT_FAST_ENCODE_PIXELS),
+        )
+
+    @property
+    def tag(self):
+        """目标编码标签；重压缩任务据此判断旧数据是否需要迁移"""
+        return CODEC_WEBP if self.codec == CODEC_WEBP else f"{CODEC_PNG}-{self.png_level}"
+
+    def fits(self, qimage):
+        return not self.max_pixels or qimage.width() * qimage.height() <= self.max_pixels
+
+    def downscale(self, qimage):
+        if self.fits(qimage):
+            return qimage
+        ratio = math.sqrt(self.max_pixels / (qimage.width() * qimage.height()))
+        width, height = max(1, int(qimage.width() * ratio)), max(1, int(qimage.height() * ratio))
+        return qimage.scaled(width, height, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+    def encode(self, qimage, fast=None, downscale=True):
+        """
+        按策略编码: 返回 (blob, 编码标签, 原图 blob 或 None)
+        fast 为 None 时按像素数自动决定是否使用快速编码
+        downscale 为 False 时只换编码、不缩小 (旧数据迁移用，像素保持不变)
+        """
+        if fast is None:
+            fast = bool(self.fast_encode_pixels) and qimage.width() * qimage.height() > self.fast_encode_pixels
+        original = None
+        stored = self.downscale(qimage) if downscale else qimage
+        if stored is not qimage and self.keep_original:
+            original = encode_png(qimage, FAST_PNG_LEVEL)
+        if fast:
+            return encode_png(stored, FAST_PNG_LEVEL), f"{CODEC_PNG}-{FAST_PNG_LEVEL}", original
+        if self.codec == CODEC_WEBP:
+            return _encode(stored, "WEBP", 100), CODEC_WEBP, original   # Qt 的 webp 插件在质量 100 时为无损
+        return encode_png(stored, self.png_level), self.tag, original
+
+
+def _encode(qimage, fmt, quality=-1):
+    byte_array = QByteArray()
+    buffer = QBuffer(byte_array)
+    buffer.open(QIODevice.WriteOnly)
+    if not qimage.save(buffer, fmt, quality):
+        raise ValueError(f"图片编码失败 ({fmt})")
+    return byte_array.data()
+
+
+def encode_png(qimage, level=DEFAULT_PNG_LEVEL):
+    # Qt 把 PNG 的 quality 换算为 zlib 级别: (100 - quality) * 9 / 91
+    return _encode(qimage, "PNG", 100 - (level * 91 + 8) // 9)
+
+
+def decode_image(blob, tag=None):
+    """按项目记录的编码标签解码，失败时再让 Qt 自行识别格式"""
+    image = QImage()
+    if blob and not image.loadFromData(blob, codec_format(tag).upper()):
+        image.loadFromData(blob)
+    return image
+
+
+def pixel_digest(qimage, hasher):
+    """按像素数据 (而非编码后的字节) 计算摘要，去重结果与存储编码无关"""
+    image = qimage.convertToFormat(QImage.Format_ARGB32)
+    size = image.sizeInBytes() if hasattr(image, 'sizeInBytes') else image.byteCount()
+    hasher.update(f"{image.width()}x{image.height()}".encode('ascii'))
+    hasher.update(image.constBits().asstring(size))
+    return hasher.hexdigest()
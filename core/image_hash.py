@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+# core/image_hash.py
+"""
+图片感知哈希 (dHash, 64 位)
+在缩略图上计算：灰度缩放到 9x8，比较每行相邻像素的明暗，得到 8x8 个比特
+光标、时钟等局部小变化只会翻转少数几位，可用汉明距离判断"几乎相同"
+安装了 NumPy 时向量化计算，否则逐像素比较 (只有 72 个像素，开销可忽略)
+数据库层只用到本模块的常量，Qt 在函数内导入
+"""
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HASH_W, HASH_H = 9, 8
+IMAGE_LSH_BANDS = 8           # 8 段 x 8 位，汉明距离 <= 7 的图片保证能被召回
+SIMILAR_DISTANCE = 6          # "查找相似图片" 的默认阈值
+NEAR_IDENTICAL_DISTANCE = 2   # 自动折叠使用的阈值
+
+
+def _gray_pixels(qimage):
+    """返回缩放后的灰度像素 (按行, 已去掉每行的对齐填充)"""
+    from PyQt5.QtCore import Qt
+    from PyQt5.QtGui import QImage
+    small = qimage.convertToFormat(QImage.Format_Grayscale8).scaled(
+        HASH_W, HASH_H, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+    bpl = small.bytesPerLine()
+    raw = small.constBits().asstring(bpl * HASH_H)
+    return raw, bpl
+
+
+def dhash64(qimage):
+    """返回无符号 64 位 dHash；图片为空时返回 None"""
+    if qimage is None or qimage.isNull():
+        return None
+    raw, bpl = _gray_pixels(qimage)
+    if np is not None:
+        px = np.frombuffer(raw, dtype=np.uint8).reshape(HASH_H, bpl)[:, :HASH_W]
+        bits = (px[:, 1:] > px[:, :-1]).flatten()
+        return int.from_bytes(np.packbits(bits, bitorder='little').tobytes(), 'little')
+    value = 0
+    for y in range(HASH_H):
+        row = raw[y * bpl:y * bpl + HASH_W]
+        for x in range(HASH_W - 1):
+            if row[x + 1] > row[x]:
+                value |= 1 << (y * (HASH_W - 1) + x)
+    return value
+
+
+def dhash_from_blob(blob):
+    """从已存储的缩略图 PNG 计算 (用于回填旧数据)"""
+    from PyQt5.QtGui import QImage
+    image = QImage()
+    if not blob or not image.loadFromData(blob):
+        return None
+    return dhash64(image)
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+# core/item_meta.py
+"""
+捕获时计算的派生元数据 (字节数、字符数、行数、类型键、扩展名、摘要)
+列表渲染只读取这些列，不再逐行处理完整内容或访问文件系统
+"""
+import os
+
+PREVIEW_LEN = 150
+
+AUDIO_EXTS = {'.mp3', '.wav', '.flac', '.aac', '.ogg', '.m4a', '.wma'}
+IMAGE_EXTS = {'.png', '.jpg', '.jpeg', '.gif', '.bmp', '.ico', '.webp'}
+VIDEO_EXTS = {'.mp4', '.mkv', '.avi', '.mov', '.wmv'}
+
+
+def make_preview(content):
+    """单行摘要：去掉换行，截断到 PREVIEW_LEN"""
+    return (content or '').replace('\r', '').replace('\n', ' ').strip()[:PREVIEW_LEN]
+
+
+def derive_metadata(content, item_type='text', file_path=None, image_path=None, data_blob=None):
+    """
+    计算派生列，返回可直接传给 ClipboardItem 的字典
+    文件夹判断需要访问文件系统，因此只在捕获时或后台回填时调用
+    """
+    content = content or ''
+    ext = ''
+    type_key = 'text'
+    if item_type == 'url':
+        type_key = 'url'
+    elif item_type == 'file' and file_path:
+        _, ext = os.path.splitext(file_path)
+        if os.path.isdir(file_path):
+            type_key, ext = 'folder', ''
+        else:
+            type_key = ext.lstrip('.').upper() if ext else 'FILE'
+    elif item_type == 'image':
+        path = image_path or file_path
+        if path:
+            _, ext = os.path.splitext(path)
+        type_key = ext.lstrip('.').upper() if ext else 'IMAGE'
+
+    encoded_len = len(content.encode('utf-8'))
+    return {
+        # 有二进制内容 (图片 / 文件快照) 时以其大小为准
+        'byte_size': len(data_blob) if data_blob else encoded_len,
+        'char_count': len(content),
+        'line_count': content.count('\n') + 1 if content else 0,
+        'type_key': type_key,
+        'file_ext': ext.lower(),
+        'preview': make_preview(content),
+    }
+
+
+def ensure_metadata(item):
+    """返回项目的派生元数据；旧数据尚未回填时现场计算 (不写回数据库)"""
+    if getattr(item, 'type_key', None) is not None:
+        return {
+            'byte_size': item.byte_size or 0,
+            'char_count': item.char_count or 0,
+            'line_count': item.line_count or 0,
+            'type_key': item.type_key,
+            'file_ext': item.file_ext or '',
+            'preview': item.preview or '',
+        }
+    return derive_metadata(item.content, item.item_type, item.file_path, item.image_path)
+
+
+def type_icon(item_type, type_key, file_ext):
+    """根据类型键和扩展名返回列表图标"""
+    if item_type == 'url': return "🔗"
+    if item_type == 'image': return "🖼️"
+    if item_type == 'file':
+        if type_key == 'folder': return "📂"
+        if file_ext in AUDIO_EXTS: return "🎵"
+        if file_ext in IMAGE_EXTS: return "🖼️"
+        if file_ext in VIDEO_EXTS: return "🎬"
+        return "📄"
+    return "📝"
+
+
+def type_label(item, meta):
+    """表格"类型"列的文字"""
+    if item.is_file and item.file_path:
+        return meta['file_ext'].upper()[1:] if meta['file_ext'] else "FILE"
+    return "TXT"
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+# core/pinyin.py
+"""
+拼音影子索引 (输入 pz / peizhi 找到 "配置")
+- 捕获时为正文开头 + 备注、标签名、分区名生成影子文本 "全拼\t首字母"，每段连续汉字之间用空格分隔，
+  如 "打开配置文件" -> "dakaipeizhiwenjian\tdkpzwj"，搜索时直接对影子列做 LIKE，不在查询时计算拼音
+- 安装了 pypinyin 时按词组转换 (多音字更准)，否则只能由 GB2312 一级汉字的编码区间得到首字母，全拼部分为空
+- match_spans 在显示时把命中位置映射回原文字符，用于高亮
+"""
+from bisect import bisect_right
+from functools import lru_cache
+from core.text_norm import to_simplified
+
+try:
+    from pypinyin import lazy_pinyin, Style
+except ImportError:
+    lazy_pinyin = None
+
+PINYIN_TEXT_CHARS = 200   # 每个项目只为正文开头生成拼音
+
+# GB2312 一级汉字按拼音排序，各首字母的起始编码 (I、U、V 没有汉字)
+_GB_INITIALS = (
+    (0xB0A1, 'a'), (0xB0C5, 'b'), (0xB2C1, 'c'), (0xB4EE, 'd'), (0xB6EA, 'e'), (0xB7A2, 'f'), (0xB8C1, 'g'),
+    (0xB9FE, 'h'), (0xBBF7, 'j'), (0xBFA6, 'k'), (0xC0AC, 'l'), (0xC2E8, 'm'), (0xC4C3, 'n'), (0xC5B6, 'o'),
+    (0xC5BE, 'p'), (0xC6DA, 'q'), (0xC8BB, 'r'), (0xC8F6, 's'), (0xCBFA, 't'), (0xCDDA, 'w'), (0xCEF4, 'x'),
+    (0xD1B9, 'y'), (0xD4D1, 'z'),
+)
+_GB_CODES = [code for code, _ in _GB_INITIALS]
+_GB_LEVEL1_END = 0xD7F9
+
+
+def full_available():
+    return lazy_pinyin is not None
+
+
+def _is_han(ch):
+    return '一' <= ch <= '鿿'
+
+
+@lru_cache(maxsize=8192)
+def _gb_initial(ch):
+    try:
+        hi, lo = ch.encode('gb2312')
+    except (UnicodeEncodeError, ValueError):
+        return None
+    code = hi << 8 | lo
+    if code < _GB_CODES[0] or code > _GB_LEVEL1_END:
+        return None
+    return _GB_INITIALS[bisect_right(_GB_CODES, code) - 1][1]
+
+
+def _syllables(run):
+    """一段连续汉字每个字的 (全拼, 首字母)；无法转换的字为 None"""
+    simplified = to_simplified(run)
+    if len(simplified) != len(run):
+        simplified = run
+    if lazy_pinyin is not None:
+        pys = lazy_pinyin(simplified, style=Style.NORMAL, errors=lambda chars: [None] * len(chars))
+        if len(pys) == len(run):
+            return [(py, py[0]) if py else None for py in pys]
+    return [('', initial) if initial else None for initial in map(_gb_initial, simplified)]
+
+
+def _han_runs(text):
+    """(起始位置, 连续汉字)"""
+    start = None
+    for i, ch in enumerate(text):
+        if _is_han(ch):
+            if start is None:
+                start = i
+        elif start is not None:
+            yield start, text[start:i]
+            start = None
+    if start is not None:
+        yield start, text[start:]
+
+
+def pinyin_text(*parts, limit=PINYIN_TEXT_CHARS):
+    """影子文本 "全拼\t首字母"；没有汉字时返回空串 (与 NULL 区分，回填不会重复处理)"""
+    text = ' '.join(p for p in parts if p)[:limit]
+    fulls, initials = [], []
+    for _, run in _han_runs(text):
+        sy = [s for s in _syllables(run) if s]
+        if sy:
+            fulls.append(''.join(full for full, _ in sy))
+            initials.append(''.join(initial for _, initial in sy))
+    if not initials:
+        return ''
+    return f"{' '.join(f for f in fulls if f)}\t{' '.join(initials)}"
+
+
+def is_pinyin_query(query):
+    """只含英文字母的搜索词才同时按拼音匹配"""
+    return bool(query) and query.isascii() and query.isalpha()
+
+
+def _match_run(sy, start, query):
+    """从第 start 个字开始，每个字消耗全拼或首字母 (最后一个字可以只是全拼的开头)，返回结束位置"""
+    def walk(i, j):
+        if j == len(query):
+            return i
+        if i == len(sy) or sy[i] is None:
+            return None
+        full, initial = sy[i]
+        if full and query.startswith(full, j):
+            end = walk(i + 1, j + len(full))
+            if end is not None:
+                return end
+        if full and full.startswith(query[j:]):
+            return i + 1
+        if query[j] == initial:
+            return walk(i + 1, j + 1)
+        return None
+    return walk(start, 0)
+
+
+def match_spans(text, query):
+    """text 中与 query 匹配的 (起, 止) 字符区间：普通子串 (不区分大小写) 与拼音命中"""
+    if not text or not query:
+        return []
+    spans = []
+    lowered, q = text.lower(), query.lower()
+    if len(lowered) == len(text):
+        pos = lowered.find(q)
+        while pos >= 0:
+            spans.append((pos, pos + len(q)))
+            pos = lowered.find(q, pos + len(q))
+    if is_pinyin_query(q):
+        for offset, run in _han_runs(text):
+            sy = _syllables(run)
+            i = 0
+            while i < len(run):
+                end = _match_run(sy, i, q)
+                if end is not None:
+                    spans.append((offset + i, offset + end))
+                    i = end
+                else:
+                    i += 1
+    return sorted(spans)
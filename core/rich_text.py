@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+# core/rich_text.py
+"""
+富文本 (text/html) 的清洗与压缩存储
+列表和搜索只使用纯文本影子列，HTML 只在预览和粘贴时解压
+"""
+import re
+from core.compression import compress_text, decompress_text
+
+_BLOCK_TAGS = re.compile(r'<(script|style|iframe|object|embed|noscript)\b.*?</\1\s*>', re.I | re.S)
+_VOID_TAGS = re.compile(r'<(?:meta|link|base|embed)\b[^>]*>', re.I)
+_COMMENTS = re.compile(r'<!--.*?-->', re.S)
+_EVENT_ATTRS = re.compile(r'''\s+on\w+\s*=\s*(?:"[^"]*"|'[^']*'|[^\s>]+)''', re.I)
+_JS_URLS = re.compile(r'''(\s(?:href|src|action)\s*=\s*["']?)\s*(?:javascript|vbscript):''', re.I)
+
+
+def sanitize_html(html):
+    """去掉脚本、样式表、嵌入对象、事件属性和注释 (含 Office 的 StartFragment 标记)"""
+    html = _COMMENTS.sub('', html or '')
+    html = _BLOCK_TAGS.sub('', html)
+    html = _VOID_TAGS.sub('', html)
+    html = _EVENT_ATTRS.sub('', html)
+    html = _JS_URLS.sub(r'\1#', html)
+    return html.strip()
+
+
+# HTML 与超大正文使用同一套带编码标记的压缩格式
+compress_html = compress_text
+decompress_html = decompress_text
+
+
+def make_text_mime(text, html=None):
+    """构建同时包含纯文本和 HTML 的剪贴板数据"""
+    from PyQt5.QtCore import QMimeData  # 数据库层也导入本模块，Qt 依赖只留在这里
+    mime_data = QMimeData()
+    mime_data.setText(text or '')
+    if html:
+        mime_data.setHtml(html)
+    return mime_data
@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+# core/search_query.py
+"""
+搜索语法
+    tag:work type:url star:>=3 created:7d "exact phrase" /regex/i -exclude  a OR b
+- 空格分隔的条件之间为"且"，相邻条件之间写 OR (大写) 为"或"，前缀 - 表示排除
+- 字段: tag 标签 / type 类型 / star 星级 / created 创建时间 / modified 修改时间 / color 颜色 / partition 分区 / is 状态
+  未知字段 (如 https://...) 按普通文本处理
+- 时间: 7d / 12h / 2w、today / yesterday / 今日 等日期分组、2024-05-01、>=2024-05-01、2024-05-01..2024-06-01
+- 正则在 SQLite 自定义函数 regexp_search 中执行；能从正则中提取出必须出现的字面文本时，先用全文索引缩小候选
+搜索框文本只解析一次 (结果按文本缓存)，由 DBManager 编译为 SQL；本模块不依赖数据库与 Qt
+"""
+import re
+from datetime import date, timedelta
+from functools import lru_cache
+from core.compression import decompress_text
+from core.pinyin import match_spans
+
+FIELDS = ('tag', 'type', 'star', 'created', 'modified', 'color', 'partition', 'is')
+FIELD_NAMES = {'tag': '标签', 'type': '类型', 'star': '星级', 'created': '创建', 'modified': '修改',
+               'color': '颜色', 'partition': '分区', 'is': '状态'}
+FLAG_FIELDS = ('pinned', 'favorite', 'locked')
+DATE_LABELS = {'today': '今日', 'yesterday': '昨日', 'week': '周内', 'month': '本月', 'lastmonth': '上月',
+               '今日': '今日', '昨日': '昨日', '周内': '周内', '两周': '两周', '本月': '本月', '上月': '上月'}
+DURATION_UNITS = {'h': 'hours', 'd': 'days', 'w': 'weeks'}
+REGEX_FLAGS = {'i': re.IGNORECASE, 'm': re.MULTILINE, 's': re.DOTALL}
+
+_TOKEN = re.compile(r'''
+    (?P<neg>-)?
+    (?:
+        /(?P<regex>(?:\\.|[^/\\])+)/(?P<flags>[a-z]*)(?=\s|$)
+      | "(?P<phrase>[^"]*)"?
+      | (?P<field>[A-Za-z]+):(?P<value>"[^"]*"?|\S*)
+      | (?P<word>\S+)
+    )''', re.X)
+SYNTAX_HELP = ("搜索语法: 空格分隔为\"且\"，OR 为\"或\"，-词 排除\n"
+               "tag:标签  type:url/image/file/pdf  star:>=3  color:#ff0000  partition:分区  is:pinned/favorite/locked\n"
+               "created:7d / 12h / today / 2024-05-01 / >=2024-05-01 / 2024-05-01..2024-06-01  (modified: 同上)\n"
+               "\"完整短语\"  /正则/i")
+_COMPARE = re.compile(r'^(>=|<=|>|<|=)?(.*)$')
+_DURATION = re.compile(r'^(\d+)([hdw])$')
+
+
+class Term:
+    """
+    一个条件
+    kind: 'text' / 'phrase' / 'regex' 或 FIELDS 中的字段名；op: 比较符 (star 与日期使用)
+    日期条件的 value 为 ('since', timedelta) / ('label', 日期分组名) / ('range', 起始日期, 结束日期)，编译时才换算成具体时间
+    """
+    __slots__ = ('kind', 'value', 'op', 'negate', 'flags')
+
+    def __init__(self, kind, value, op='=', negate=False, flags=0):
+        self.kind, self.value, self.op, self.negate, self.flags = kind, value, op, negate, flags
+
+    def __repr__(self):
+        return f"Term({self.kind!r}, {self.value!r}, op={self.op!r}, negate={self.negate})"
+
+    @property
+    def is_text(self):
+        return self.kind in ('text', 'phrase')
+
+    def describe(self):
+        prefix = "排除 " if self.negate else ""
+        if self.kind == 'text':
+            return f"{prefix}{self.value}"
+        if self.kind == 'phrase':
+            return f'{prefix}"{self.value}"'
+        if self.kind == 'regex':
+            return f"{prefix}正则 /{self.value}/"
+        if self.kind in ('created', 'modified'):
+            spec = self.value
+            if spec[0] == 'since':
+                hours = int(spec[1].total_seconds() // 3600)
+                text = f"最近 {hours // 24} 天" if hours % 24 == 0 else f"最近 {hours} 小时"
+            elif spec[0] == 'label':
+                text = spec[1]
+            else:
+                text = f"{spec[1] or '…'} ~ {spec[2] or '…'}"
+            return f"{prefix}{FIELD_NAMES[self.kind]} {text}"
+        op = '' if self.op == '=' else self.op
+        return f"{prefix}{FIELD_NAMES[self.kind]}:{op}{self.value}"
+
+
+class AnyOf:
+    """用 OR 连接的一组条件"""
+    __slots__ = ('terms',)
+
+    def __init__(self, terms):
+        self.terms = terms
+
+    def __repr__(self):
+        return f"AnyOf({self.terms!r})"
+
+    def describe(self):
+        return " 或 ".join(t.describe() for t in self.terms)
+
+
+class SearchQuery:
+    """解析结果: groups 之间为"且"，每个元素是 Term 或 AnyOf；errors 为无法解析而被忽略的条件"""
+
+    def __init__(self, groups, errors):
+        self.groups = groups
+        self.errors = errors
+
+    def __repr__(self):
+        return f"SearchQuery({self.groups!r})"
+
+    def __bool__(self):
+        return bool(self.groups)
+
+    def terms(self):
+        for group in self.groups:
+            yield from (group.terms if isinstance(group, AnyOf) else (group,))
+
+    @property
+    def is_simple(self):
+        """只有普通文本词 (逐字输入时结果单调缩小，可复用上一次的结果)"""
+        return all(isinstance(g, Term) and g.kind == 'text' and not g.negate for g in self.groups)
+
+    @property
+    def is_plain_text(self):
+        """只有 (非排除的) 文本词与短语，排序搜索可以直接对这些文本做模糊匹配"""
+        return all(isinstance(g, Term) and g.is_text and not g.negate for g in self.groups)
+
+    @property
+    def is_time_relative(self):
+        """含相对时间条件 (7d、today 等)，同样的数据结果也会随时间变化"""
+        return any(t.kind in ('created', 'modified') and t.value[0] != 'range' for t in self.terms())
+
+    def text_pattern(self):
+        """用于模糊匹配 / 高亮的文本 (非排除的文本词与短语)"""
+        return ' '.join(t.value for t in self.terms() if t.is_text and not t.negate)
+
+    def highlight_spans(self, text):
+        """text 中命中文本词 (含拼音) 或正则的 (起, 止) 区间"""
+        spans = []
+        for term in self.terms():
+            if term.negate:
+                continue
+            if term.is_text:
+                spans.extend(match_spans(text, term.value))
+            elif term.kind == 'regex':
+                pattern = compile_regex(term.value, term.flags)
+                if pattern is not None:
+                    spans.extend(m.span() for m in pattern.finditer(text) if m.end() > m.start())
+        return sorted(spans)
+
+    def describe(self):
+        lines = [" 且 ".join(g.describe() for g in self.groups)] if self.groups else []
+        lines += [f"⚠ {e}" for e in self.errors]
+        return "\n".join(lines)
+
+
+def _parse_date(text):
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        raise ValueError(f"无法识别的日期 '{text}'")
+
+
+def _date_spec(value):
+    low = value.lower()
+    if low in DATE_LABELS:
+        return 'label', DATE_LABELS[low]
+    m = _DURATION.match(low)
+    if m:
+        return 'since', timedelta(**{DURATION_UNITS[m.group(2)]: int(m.group(1))})
+    if '..' in value:
+        start, end = value.split('..', 1)
+        return 'range', _parse_date(start) if start else None, _parse_date(end) if end else None
+    op, rest = _COMPARE.match(value).groups()
+    day = _parse_date(rest)
+    if op == '>':
+        return 'range', day + timedelta(days=1), None
+    if op == '>=':
+        return 'range', day, None
+    if op == '<':
+        return 'range', None, day - timedelta(days=1)
+    if op == '<=':
+        return 'range', None, day
+    return 'range', day, day
+
+
+def _field_term(field, value, negate):
+    if value.startswith('"'):
+        value = value.strip('"')
+    if not value:
+        raise ValueError(f"{field}: 缺少值")
+    if field == 'star':
+        op, number = _COMPARE.match(value).groups()
+        if not number.isdigit() or not 0 <= int(number) <= 5:
+            raise ValueError(f"星级应为 0-5: '{value}'")
+        return Term('star', int(number), op or '=', negate)
+    if field in ('created', 'modified'):
+        return Term(field, _date_spec(value), negate=negate)
+    if field == 'is' and value.lower() not in FLAG_FIELDS:
+        raise ValueError(f"is: 只支持 {' / '.join(FLAG_FIELDS)}")
+    return Term(field, value.lower() if field in ('type', 'is', 'color') else value, '=', negate)
+
+
+@lru_cache(maxsize=256)
+def parse_query(text):
+    """解析搜索框文本；无法解析的条件记入 errors 并忽略，不会抛出异常"""
+    groups, errors, pending_or = [], [], False
+    for m in _TOKEN.finditer(text or ''):
+        negate = bool(m.group('neg'))
+        term = None
+        if m.group('regex') is not None:
+            flags = 0
+            for ch in m.group('flags'):
+                flags |= REGEX_FLAGS.get(ch, 0)
+            if compile_regex(m.group('regex'), flags) is None:
+                errors.append(f"无效的正则 /{m.group('regex')}/")
+                continue
+            term = Term('regex', m.group('regex'), negate=negate, flags=flags)
+        elif m.group('phrase') is not None:
+            if m.group('phrase').strip():
+                term = Term('phrase', m.group('phrase'), negate=negate)
+        elif m.group('field') is not None and m.group('field').lower() in FIELDS:
+            try:
+                term = _field_term(m.group('field').lower(), m.group('value'), negate)
+            except ValueError as e:
+                errors.append(str(e))
+                continue
+        else:
+            word = m.group(0)[1:] if negate else m.group(0)
+            if word == 'OR' and not negate:
+                pending_or = bool(groups)
+                continue
+            if word:
+                term = Term('text', word, negate=negate)
+        if term is None:
+            continue
+        if pending_or:
+            last = groups[-1]
+            groups[-1] = AnyOf((last.terms if isinstance(last, AnyOf) else (last,)) + (term,))
+            pending_or = False
+        else:
+            groups.append(term)
+    return SearchQuery(tuple(groups), tuple(errors))
+
+
+@lru_cache(maxsize=128)
+def compile_regex(pattern, flags=0):
+    try:
+        return re.compile(pattern, flags)
+    except re.error:
+        return None
+
+
+def regexp_search(pattern, flags, value):
+    """SQLite 自定义函数 regexp_search(模式, 标志, 值)：值为压缩正文 (bytes) 时先解压"""
+    if value is None:
+        return 0
+    compiled = compile_regex(pattern, flags or 0)
+    if compiled is None:
+        return 0
+    if isinstance(value, bytes):
+        value = decompress_text(value) or ''
+    return 1 if compiled.search(value) else 0
+
+
+def required_literal(pattern):
+    """
+    正则命中时必然出现的最长字面文本 (用于全文索引预筛选)；无法确定时返回 ''
+    只处理顶层的字面字符：含 | 时放弃，分组 / 字符集 / 转义类整体跳过，后跟 ? * {0 的字符不计入
+    """
+    if '|' in pattern:
+        return ''
+    runs, current, i = [], '', 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == '\\' and i + 1 < len(pattern):
+            nxt = pattern[i + 1]
+            literal = nxt if not nxt.isalnum() else None
+            i += 2
+        elif ch in '([':
+            depth, close = 0, ')' if ch == '(' else ']'
+            while i < len(pattern):
+                if pattern[i] == '\\':
+                    i += 2
+                    continue
+                if pattern[i] == ch:
+                    depth += 1
+                elif pattern[i] == close:
+                    depth -= 1
+                    if depth == 0 or close == ']':
+                        break
+                i += 1
+            literal = None
+            i += 1
+        elif ch in '.^$':
+            literal = None
+            i += 1
+        elif ch in '?*+{':
+            if ch != '+' and current:
+                current = current[:-1]
+            if ch == '{':
+                i = pattern.find('}', i) + 1 or len(pattern)
+            else:
+                i += 1
+            runs.append(current)
+            current = ''
+            continue
+        else:
+            literal = ch
+            i += 1
+        if literal is None:
+            runs.append(current)
+            current = ''
+        else:
+            current += literal
+    runs.append(current)
+    return max(runs, key=len)
@@ -7,7 +7,11 @@ from PyQt5.QtCore import Qt
 def format_size(text):
     """格式化显示大小"""
     if not text: return "0 B"
-    b = len(text.encode('utf-8'))
+    return format_bytes(len(text.encode('utf-8')))
+
+def format_bytes(b):
+    """格式化字节数 (用于捕获时已计算好的 byte_size 列)"""
+    b = b or 0
     if b < 1024: return f"{b} B"
     elif b < 1024**2: return f"{b/1024:.1f} KB"
     else: return f"{b/1024**2:.1f} MB"
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+# core/simhash.py
+"""
+64 位 SimHash 与分段 LSH
+- 文本先归一化 (大小写、连续空白、数字串)，时间戳或行号不同的日志仍得到相近的签名
+- 签名切成 4 段 16 位，两个签名汉明距离 <= 3 时至少有一段完全相同 (抽屉原理)，
+  因此按段精确匹配即可找出全部候选，不需要逐条比较
+- 捕获时在界面线程同步计算，超长文本只取开头与结尾各一段，耗时与文本长度无关 (约 0.1 秒以内)
+"""
+import re
+import hashlib
+from collections import Counter
+
+SIMHASH_BITS = 64
+LSH_BANDS = 4
+BAND_BITS = SIMHASH_BITS // LSH_BANDS
+NEAR_DUP_DISTANCE = LSH_BANDS - 1   # 分段保证可召回的最大距离
+
+MIN_TEXT_LEN = 8          # 太短的文本相似度没有意义
+MAX_TEXT_LEN = 8192       # 超长文本取开头与结尾各一半计算，避免捕获时卡顿
+SHINGLE_SIZE = 3
+
+_WS = re.compile(r'\s+')
+_DIGITS = re.compile(r'\d+')
+
+
+def _sample(text):
+    if len(text) <= MAX_TEXT_LEN:
+        return text
+    half = MAX_TEXT_LEN // 2
+    return f"{text[:half]}\n{text[-half:]}"
+
+
+def normalize(text):
+    text = _WS.sub(' ', _sample(text or '')).strip().casefold()
+    return _DIGITS.sub('0', text)
+
+
+def _feature_hash(shingle):
+    return int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def simhash64(text):
+    """返回无符号 64 位签名；文本过短时返回 None"""
+    norm = normalize(text)
+    if len(norm) < MIN_TEXT_LEN:
+        return None
+    weights = [0] * SIMHASH_BITS
+    shingles = Counter(norm[i:i + SHINGLE_SIZE] for i in range(len(norm) - SHINGLE_SIZE + 1))
+    for shingle, count in shingles.items():
+        h = _feature_hash(shingle)
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += count if (h >> bit) & 1 else -count
+    return sum(1 << bit for bit, w in enumerate(weights) if w > 0)
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def lsh_bands(signature, bands=LSH_BANDS):
+    """把 64 位签名切成 bands 段: [(段号, 段值), ...]"""
+    band_bits = SIMHASH_BITS // bands
+    mask = (1 << band_bits) - 1
+    return [(i, (signature >> (i * band_bits)) & mask) for i in range(bands)]
+
+
+# SQLite INTEGER 为有符号 64 位，存取时做补码转换
+def to_signed64(value):
+    return value - (1 << 64) if value is not None and value >= (1 << 63) else value
+
+
+def to_unsigned64(value):
+    return value + (1 << 64) if value is not None and value < 0 else value
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+# core/text_norm.py
+"""
+搜索用的归一化文本
+- NFKC: 全角 / 半角统一 (ＡＢＣ１２３ -> ABC123，全角标点 -> 半角)
+- casefold: 大小写折叠 (比 lower 更彻底，如 ß -> ss)
+- 繁体 -> 简体: 安装了 OpenCC 时使用其 t2s 转换，否则使用内置的常用字对照表
+捕获时写入 search_norm 列，排序搜索直接在这一列上做模糊匹配，查询时只需归一化搜索词
+"""
+import unicodedata
+
+try:
+    from opencc import OpenCC
+    _t2s = OpenCC('t2s').convert
+except Exception:  # 未安装或缺少配置文件
+    _t2s = None
+
+NORM_TEXT_CHARS = 512   # 每个项目保存的归一化文本长度 (正文开头 + 备注)
+
+# 内置繁简对照 (常用字)，两行按位置一一对应
+_TRAD = (
+    "萬與專業東絲兩嚴喪個豐臨為麗舉麼義烏樂喬習鄉書買亂爭於虧雲亞產畝親億僅從侖倉儀們價眾優夥會傘偉傳傷倫偽體餘傭僉俠侶儉債傾側僑儂價"
+    "兒兌黨蘭關興茲養獸內岡冊寫軍農馮沖決況凍淨涼減湊凜幾鳳憑凱擊鑿芻劃劉則剛創刪別剎劑剝劇勸辦務勱動勵勁勞勢勳匯區醫華協單賣盧衛卻廠廳曆厲壓厭參雙發變敘疊葉號嘆嘰嚇呂嗎噸聽啟吳員響問啞營喚嗆嗇團園圍圖圓聖場壞塊堅壇壩墳墜壘墾執報塗壯聲殼壺處備復夠頭誇夾奪奮獎妝婦媽嬌孫學寧寶實寵審憲宮寬賓導壽將爾塵嘗層屬屆岳峽島嶺崗幣師帳帶幫幹廣庫應廟廢開異棄張彌彎當錄徹徑後從御復徵總戀恆懇惡惱悅懸驚慣憂態"
+    "戰戲戶擴掃掛據擠擬擇護報擔擋擁擾揚換揮損搖攜撿攝擺攤擦攬數斂斷時晉曉晝暫曬術機殺雜權條來楊極構槍標棧棟欄樹樣檔橋業檢樓橫歡歐歲歷歸殘毆氣漢湯溝沒瀝淚潑澤潔灑濃漿濟測渾濁瀏滬滿漁滲溫濕灣濱濾滾災燈爐點煉爛烴煙煩燒熱愛爺牆狀猶獨獄獅環現璽瑪電畫暢當療瘋癢發皚盜監盤眾睜瞭礦碼磚礎確碼禮禍禪離種稱積穩窮竊競筆筍築簡類糧緊紅約級紀紋納純紙紛細終組絆結給絡絕統經綁綜綠網線練編緩緯縣縮總績繩繼續纜罷羅罰習翹聯聰聲職肅脅脈膽腦腫腳膚臉臘興艦艙艱芻蘇蘋藥藝節範華萬蒼蓋蓮蔣薦莊蟲術補裝襪見規視覽覺觀觸言訂計訊討訓記講許論設訪證評識詞試詩誠話該詳語誤說請諸讀課誰調談謝譯議護貝負貢財責賢敗貨販貧購貫貼賀資賈賊賓賞賠賤賴贊趕趙趨躍踐車軌軟轉輪軸載較輕輔輸辭農邊遼達遷過運還這進遠違連遲選遺郵鄧鄭醜釋針釘鈕銀鋼錢鐵鍵鏡長門閃閉問閒間閱闊隊陽陰陣階際陸險隱隨雖難雞離電靈韓頁頂項順須預領頻題額顏願類顯風飛飯飲館饅馬駐騎驗體髮鬥魚鮮鳥鳴麥黃齊齒龍"
+    "鏈庫籤蓋錯誤遞齡"
+)
+_SIMP = (
+    "万与专业东丝两严丧个丰临为丽举么义乌乐乔习乡书买乱争于亏云亚产亩亲亿仅从仑仓仪们价众优伙会伞伟传伤伦伪体余佣佥侠侣俭债倾侧侨侬价"
+    "儿兑党兰关兴兹养兽内冈册写军农冯冲决况冻净凉减凑凛几凤凭凯击凿刍划刘则刚创删别刹剂剥剧劝办务劢动励劲劳势勋汇区医华协单卖卢卫却厂厅历厉压厌参双发变叙叠叶号叹叽吓吕吗吨听启吴员响问哑营唤呛啬团园围图圆圣场坏块坚坛坝坟坠垒垦执报涂壮声壳壶处备复够头夸夹夺奋奖妆妇妈娇孙学宁宝实宠审宪宫宽宾导寿将尔尘尝层属届岳峡岛岭岗币师帐带帮干广库应庙废开异弃张弥弯当录彻径后从御复征总恋恒恳恶恼悦悬惊惯忧态"
+    "战戏户扩扫挂据挤拟择护报担挡拥扰扬换挥损摇携捡摄摆摊擦揽数敛断时晋晓昼暂晒术机杀杂权条来杨极构枪标栈栋栏树样档桥业检楼横欢欧岁历归残殴气汉汤沟没沥泪泼泽洁洒浓浆济测浑浊浏沪满渔渗温湿湾滨滤滚灾灯炉点炼烂烃烟烦烧热爱爷墙状犹独狱狮环现玺玛电画畅当疗疯痒发皑盗监盘众睁了矿码砖础确码礼祸禅离种称积稳穷窃竞笔笋筑简类粮紧红约级纪纹纳纯纸纷细终组绊结给络绝统经绑综绿网线练编缓纬县缩总绩绳继续缆罢罗罚习翘联聪声职肃胁脉胆脑肿脚肤脸腊兴舰舱艰刍苏苹药艺节范华万苍盖莲蒋荐庄虫术补装袜见规视览觉观触言订计讯讨训记讲许论设访证评识词试诗诚话该详语误说请诸读课谁调谈谢译议护贝负贡财责贤败货贩贫购贯贴贺资贾贼宾赏赔贱赖赞赶赵趋跃践车轨软转轮轴载较轻辅输辞农边辽达迁过运还这进远违连迟选遗邮邓郑丑释针钉钮银钢钱铁键镜长门闪闭问闲间阅阔队阳阴阵阶际陆险隐随虽难鸡离电灵韩页顶项顺须预领频题额颜愿类显风飞饭饮馆馒马驻骑验体发斗鱼鲜鸟鸣麦黄齐齿龙"
+    "链库签盖错误递龄"
+)
+_T2S_TABLE = str.maketrans(_TRAD, _SIMP)
+
+
+def to_simplified(text):
+    return _t2s(text) if _t2s else text.translate(_T2S_TABLE)
+
+
+def normalize(text):
+    """全半角、大小写、繁简统一后的文本 (搜索词与 search_norm 列使用同一函数)"""
+    if not text:
+        return ''
+    return to_simplified(unicodedata.normalize('NFKC', text).casefold())
+
+
+def search_text(content, note=None, limit=NORM_TEXT_CHARS):
+    """项目的归一化搜索文本：正文开头 + 备注 (换行折叠为空格)"""
+    head = ' '.join((content or '')[:limit].split())
+    text = f"{head} {note}" if note and note not in head else head
+    return normalize(text)[:limit + 100]
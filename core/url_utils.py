@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+# core/url_utils.py
+"""
+URL 规范化
+同一链接带不同追踪参数、大小写或结尾斜杠时得到相同的规范形式，用于去重与按域名分组
+"""
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# 常见追踪参数 (utm_* 另按前缀匹配)
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'gclsrc', 'msclkid', 'yclid', 'igshid',
+    'mc_cid', 'mc_eid', '_hsenc', '_hsmi', 'mkt_tok', 'spm', 'vero_id',
+    'ref_src', 'share_source', 'from_source',
+}
+TRACKING_PREFIXES = ('utm_',)
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def _is_tracking(key):
+    key = key.lower()
+    return key in TRACKING_PARAMS or key.startswith(TRACKING_PREFIXES)
+
+
+def url_domain(host):
+    """分组用的域名：小写并去掉 www. 前缀"""
+    host = (host or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def canonicalize_url(url):
+    """
+    返回 (规范化 URL, 域名)
+    - scheme / host 转小写，去掉默认端口
+    - 去掉追踪参数，其余参数按键排序
+    - 去掉路径结尾的斜杠和空 fragment
+    无法解析时原样返回
+    """
+    url = (url or '').strip()
+    try:
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        host = (parts.hostname or '').lower()
+        port = parts.port
+    except ValueError:
+        return url, ''
+    if not host:
+        return url, ''
+
+    netloc = host
+    if port and DEFAULT_PORTS.get(scheme) != port:
+        netloc = f"{host}:{port}"
+    if parts.username:
+        userinfo = parts.username + (f":{parts.password}" if parts.password else '')
+        netloc = f"{userinfo}@{netloc}"
+
+    path = parts.path.rstrip('/')
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _is_tracking(k)))
+
+    return urlunsplit((scheme, netloc, path, query, parts.fragment)), url_domain(host)
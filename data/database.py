@@ -1,15 +1,51 @@
 # -*- coding: utf-8 -*-
 import sys
 import os
+import sqlite3
 import hashlib
+import math
 import logging
+import threading
+import weakref
+from collections import OrderedDict
 from datetime import datetime, timedelta, time
-from sqlalchemy import create_engine, Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Table, Index, Float, func, or_, exists, and_, BLOB
-from sqlalchemy.orm import declarative_base, relationship, sessionmaker, joinedload
+from sqlalchemy import create_engine, event, Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Table, Index, Float, func, or_, exists, and_, BLOB, cast, LargeBinary, case, literal, select, union_all, insert, delete
+from sqlalchemy.orm import declarative_base, relationship, sessionmaker, joinedload, deferred, undefer, aliased
+from data.dedupe import get_dedupe_filter
+from data.search_index import SearchIndex
+from data.smart_partitions import SmartChangeLog
+from data.query_cache import QueryCache, estimate_rows_size
+from core.item_meta import derive_metadata
+from core.url_utils import canonicalize_url
+from core.rich_text import compress_html, decompress_html
+from core.compression import compress_text, decompress_text
+from core.simhash import simhash64, hamming, lsh_bands as split_bands, to_signed64, to_unsigned64, NEAR_DUP_DISTANCE, LSH_BANDS
+from core.image_hash import IMAGE_LSH_BANDS, SIMILAR_DISTANCE, NEAR_IDENTICAL_DISTANCE
+from core.file_snapshot import changed_paths, pack_files, STATE_REFERENCE, STATE_SNAPSHOT, STATE_STALE
+from core.text_norm import normalize, search_text
+from core.fuzzy import CandidateArray, max_score
+from core.pinyin import pinyin_text, is_pinyin_query, full_available as pinyin_full_available
+from core.search_query import AnyOf, parse_query, regexp_search, required_literal
 
 log = logging.getLogger("Database")
 Base = declarative_base()
 
+# 压缩存储的正文在 content 列保留的开头字符数 (列表摘要、短词 LIKE 搜索用)
+CONTENT_HEAD_CHARS = 2000
+
+# 写入这些表不影响列表结果与统计，不递增变更计数 (避免滚动生成缩略图时反复失效缓存)
+CACHE_NEUTRAL_TABLES = {'item_thumbnails'}
+# 同一进程中打开同一数据库文件的 DBManager (主窗口与快速面板各有一个)，本进程的提交对它们都不算外部写入
+_local_managers = {}
+_local_managers_lock = threading.Lock()
+# 排序搜索的权重：模糊匹配 / 拼音模糊匹配 / 全文索引 BM25 / 最近使用 (半衰期天数) / 使用次数
+RANK_WEIGHTS = {'fuzzy': 1.0, 'pinyin': 0.8, 'bm25': 0.6, 'recency': 0.3, 'visits': 0.1}
+RECENCY_HALF_LIFE_DAYS = 30
+# 含相对时间条件 (created:14d 等) 的智能分区，成员会随时间过期，超过该间隔后查看时整体重建
+SMART_REFRESH_INTERVAL = timedelta(minutes=10)
+# 日期筛选项 (与筛选面板一致)，按从近到远排列
+DATE_BUCKETS = ("今日", "昨日", "周内", "两周", "本月", "上月")
+
 item_tags = Table(
     'item_tags', Base.metadata,
     Column('item_id', Integer, ForeignKey('clipboard_items.id'), primary_key=True),
@@ -17,6 +53,34 @@ item_tags = Table(
     Index('idx_tag_item', 'tag_id', 'item_id')
 )
 
+# 分段 LSH 索引：kind 区分签名种类，同一 (kind, band, key) 下的项目互为相似候选
+lsh_bands = Table(
+    'lsh_bands', Base.metadata,
+    Column('kind', String(10), primary_key=True),
+    Column('band', Integer, primary_key=True),
+    Column('item_id', Integer, ForeignKey('clipboard_items.id'), primary_key=True),
+    Column('key', Integer, nullable=False),
+    Index('idx_lsh_lookup', 'kind', 'band', 'key', 'item_id')
+)
+
+# 智能分区的物化成员 (由 data.smart_partitions 的变更队列增量维护)
+smart_partition_items = Table(
+    'smart_partition_items', Base.metadata,
+    Column('smart_id', Integer, ForeignKey('smart_partitions.id'), primary_key=True),
+    Column('item_id', Integer, ForeignKey('clipboard_items.id'), primary_key=True),
+    Index('idx_smart_item', 'item_id')
+)
+
+# 多尺寸缩略图 (list / detail / preview)，由缩略图服务按需生成
+item_thumbnails = Table(
+    'item_thumbnails', Base.metadata,
+    Column('item_id', Integer, ForeignKey('clipboard_items.id'), primary_key=True),
+    Column('size_key', String(10), primary_key=True),
+    Column('width', Integer),
+    Column('height', Integer),
+    Column('blob', BLOB, nullable=False)
+)
+
 partition_tags = Table(
     'partition_tags', Base.metadata,
     Column('partition_id', Integer, ForeignKey('partitions.id'), primary_key=True),
@@ -29,6 +93,7 @@ class Partition(Base):
     name = Column(String(50), nullable=False)
     color = Column(String(20), default=None)
     sort_index = Column(Float, default=0.0)
+    search_pinyin = Column(Text, default=None)
     parent_id = Column(Integer, ForeignKey('partitions.id'), nullable=True)
     parent = relationship("Partition", remote_side=[id], back_populates="children")
     children = relationship("Partition", back_populates="parent", cascade="all, delete-orphan", order_by="Partition.sort_index")
@@ -51,30 +116,90 @@ class ClipboardItem(Base):
     last_visited_at = Column(DateTime, default=datetime.now)
     visit_count = Column(Integer, default=0)
     sort_index = Column(Float, default=0.0)
-    star_level = Column(Integer, default=0) 
+    star_level = Column(Integer, default=0, index=True)
     is_favorite = Column(Boolean, default=False)
     is_locked = Column(Boolean, default=False)
     is_pinned = Column(Boolean, default=False)
     is_deleted = Column(Boolean, default=False, index=True)
-    custom_color = Column(String(20), default=None)
+    custom_color = Column(String(20), default=None, index=True)
     is_file = Column(Boolean, default=False)
     file_path = Column(Text, default=None)
     item_type = Column(String(20), default='text')
     image_path = Column(Text, default=None)
-    data_blob = Column(BLOB, nullable=True)
-    thumbnail_blob = Column(BLOB, nullable=True)
+    # 二进制内容延迟加载，列表查询不再把整张图片读进内存 (需在会话内访问或使用 get_image_blob)
+    data_blob = deferred(Column(BLOB, nullable=True))
+    thumbnail_blob = deferred(Column(BLOB, nullable=True))
+    file_fingerprint = Column(Text, default=None)
+    file_state = Column(String(20), default=None, index=True)
+    # 捕获时计算的派生列，列表渲染不再处理完整内容
+    byte_size = Column(Integer, default=None, index=True)
+    char_count = Column(Integer, default=None)
+    line_count = Column(Integer, default=None)
+    type_key = Column(String(20), default=None, index=True)
+    file_ext = Column(String(20), default=None, index=True)
+    preview = Column(String(200), default=None)
+    # URL 项目: 原始链接 / 规范化链接 (去重用) / 域名 (分组用) / 标题
+    url = Column(Text, default=None)
+    url_canonical = Column(Text, default=None, index=True)
+    url_domain = Column(String(255), default=None, index=True)
+    url_title = Column(Text, default=None)
+    # 富文本: 清洗后压缩的 HTML，延迟加载，列表查询不会读取
+    html_blob = deferred(Column(BLOB, nullable=True))
+    has_html = Column(Boolean, default=False)
+    # 超大正文: content 只保留开头，完整正文压缩后存在 content_blob (延迟加载)
+    is_compressed = Column(Boolean, default=False)
+    content_blob = deferred(Column(BLOB, nullable=True))
+    # 近似重复: 64 位 SimHash (有符号存储) 与所属相似组 (组内最早项目的 ID，自身为组首时为空)
+    simhash = Column(Integer, default=None)
+    near_dup_group = Column(Integer, default=None, index=True)
+    # 图片感知哈希 (dHash，在缩略图上计算)
+    phash = Column(Integer, default=None, index=True)
+    # 图片存储编码标签 (如 'png-6'、'webp'，为空表示旧版 PNG)；按像素上限缩小时保留的原图
+    image_codec = Column(String(20), default=None)
+    original_blob = deferred(Column(BLOB, nullable=True))
+    # 排序搜索用的归一化文本 (全半角、大小写、繁简统一后的正文开头 + 备注)
+    search_norm = deferred(Column(Text, default=None))
+    # 拼音影子文本 "全拼\t首字母" (正文开头 + 备注)，见 core.pinyin
+    search_pinyin = deferred(Column(Text, default=None))
     partition_id = Column(Integer, ForeignKey('partitions.id'), nullable=True)
     original_partition_id = Column(Integer, nullable=True)
     partition = relationship("Partition", back_populates="items")
     tags = relationship("Tag", secondary=item_tags, back_populates="items")
 
+    # 覆盖索引：分区 / 日期视图的计数只扫描索引，不读取正文所在的数据页
+    __table_args__ = (
+        Index('idx_items_partition_live', 'partition_id', 'is_deleted'),
+        Index('idx_items_created_live', 'created_at', 'is_deleted'),
+        Index('idx_items_modified_live', 'modified_at', 'is_deleted'),
+    )
+
 class Tag(Base):
     __tablename__ = 'tags'
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String(50), unique=True, nullable=False)
+    search_pinyin = Column(Text, default=None)
     items = relationship("ClipboardItem", secondary=item_tags, back_populates="tags")
     partitions = relationship("Partition", secondary=partition_tags, back_populates="tags")
 
+
+class SmartPartition(Base):
+    """智能分区: 保存的搜索 (core.search_query 语法)，成员物化在 smart_partition_items 中"""
+    __tablename__ = 'smart_partitions'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String(50), nullable=False)
+    query = Column(Text, nullable=False, default="")
+    color = Column(String(20), default=None)
+    sort_index = Column(Float, default=0.0)
+    is_stale = Column(Boolean, default=True)        # 需要整体重建 (新建、修改搜索、标签 / 分区变化)
+    refreshed_at = Column(DateTime, default=None)   # 上次整体重建的时间
+
+
+@event.listens_for(Tag.name, 'set')
+@event.listens_for(Partition.name, 'set')
+def _name_pinyin(target, value, oldvalue, initiator):
+    """标签 / 分区新建或改名时同步拼音影子文本"""
+    target.search_pinyin = pinyin_text(value)
+
 class DBManager:
     def __init__(self, db_name='clipboard_data.db'):
         if getattr(sys, 'frozen', False):
@@ -87,12 +212,38 @@ class DBManager:
 
         try:
             self.engine = create_engine(f'sqlite:///{db_path}?check_same_thread=False', echo=False)
+            event.listen(self.engine, 'connect', self._register_functions)
             Base.metadata.create_all(self.engine)
             self.Session = sessionmaker(bind=self.engine)
+            self._generation = 0
+            self._generation_lock = threading.Lock()
+            self._data_version = None
+            self._version_conn = sqlite3.connect(db_path, check_same_thread=False)
+            with _local_managers_lock:
+                self._local_peers = _local_managers.setdefault(os.path.normcase(os.path.abspath(db_path)), weakref.WeakSet())
+                self._local_peers.add(self)
+            self.query_cache = QueryCache()
+            self._watch_writes()
             self._check_migrations()
+            self.compress_threshold = 32 * 1024  # 正文超过该字节数时压缩存储，0 表示关闭
+            self._content_cache = OrderedDict()
+            self._content_cache_lock = threading.Lock()
+            self._search = SearchIndex(self.engine)
+            self._search.ensure()
+            self._smart = SmartChangeLog(self.engine)
+            self._smart.ensure()
+            self._smart_lock = threading.Lock()
+            self._dedupe = get_dedupe_filter(db_path)
+            self._dedupe.load_async(self._fetch_all_hashes)
+            threading.Thread(target=self._background_maintenance, daemon=True).start()
         except Exception as e:
             log.critical(f"数据库初始化失败: {e}", exc_info=True)
 
+    @staticmethod
+    def _register_functions(dbapi_connection, connection_record):
+        """每个新连接注册搜索语法用到的自定义函数 (正则，编译结果在 core.search_query 中缓存)"""
+        dbapi_connection.create_function('regexp_search', 3, regexp_search, deterministic=True)
+
     def _check_migrations(self):
         from sqlalchemy import inspect, text
         try:
@@ -111,6 +262,9 @@ class DBManager:
                                 stmt = text(f'ALTER TABLE {table_name} ADD COLUMN {column.name} {col_type}')
                                 connection.execute(stmt)
                                 log.info(f"✅ 表 '{table_name}' 中添加字段: {column.name}")
+                        # create_all 不会为已存在的表补建索引
+                        for index in table.indexes:
+                            index.create(connection, checkfirst=True)
                     add_col_transaction.commit()
                 except Exception as e:
                     log.error(f"添加新列失败，正在回滚: {e}")
@@ -160,41 +314,267 @@ class DBManager:
         except Exception as e:
             log.error(f"迁移检查失败: {e}", exc_info=True)
 
+    # ---------- 变更计数 ----------
+    def _watch_writes(self):
+        """
+        所有会话 (包括界面层直接拿 get_session 写入的地方) 提交了数据修改时递增变更计数，
+        统计与查询缓存以此判断是否失效，不需要在每个写方法里手动通知
+        只写 CACHE_NEUTRAL_TABLES 的提交不递增。本进程的提交同样会改变 data_version，提交后在本进程的
+        每个 DBManager 中立即记下新值，这样 generation 中的 data_version 检查只反映其他进程 (或绕过会话) 的写入
+        """
+        def mark(session, neutral=False):
+            session.info['wrote'] = True
+            if not neutral:
+                session.info['dirty'] = True
+
+        def on_flush(session, flush_context):
+            if session.new or session.dirty or session.deleted:
+                mark(session)
+
+        def on_execute(state):
+            if state.is_insert or state.is_update or state.is_delete:
+                table = getattr(state.statement, 'table', None)
+                mark(state.session, getattr(table, 'name', None) in CACHE_NEUTRAL_TABLES)
+
+        def peers():
+            with _local_managers_lock:
+                return list(self._local_peers)
+
+        def before_commit(session):
+            # 先吸收提交前外部的写入，避免提交后记录 data_version 时把它们一并当成本进程的写入
+            if session.info.get('wrote') or session.new or session.dirty or session.deleted:
+                for manager in peers():
+                    manager.generation
+
+        def on_commit(session):
+            if session.info.pop('wrote', False):
+                dirty = session.info.pop('dirty', False)
+                for manager in peers():
+                    manager._record_own_commit(dirty)
+
+        def on_rollback(session):
+            session.info.pop('wrote', None)
+            session.info.pop('dirty', None)
+
+        event.listen(self.Session, 'after_flush', on_flush)
+        event.listen(self.Session, 'do_orm_execute', on_execute)
+        event.listen(self.Session, 'after_bulk_update', lambda state: mark(state.session))
+        event.listen(self.Session, 'after_bulk_delete', lambda state: mark(state.session))
+        event.listen(self.Session, 'before_commit', before_commit)
+        event.listen(self.Session, 'after_commit', on_commit)
+        event.listen(self.Session, 'after_rollback', on_rollback)
+
+    def _read_data_version(self):
+        try:
+            return self._version_conn.execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.Error:
+            return None
+
+    def _record_own_commit(self, dirty):
+        """本进程 (任一 DBManager) 提交之后: 影响列表的写入递增计数；记下提交后的 data_version，不再被当作外部写入"""
+        with self._generation_lock:
+            if dirty:
+                self._generation += 1
+            version = self._read_data_version()
+            if version is not None:
+                self._data_version = version
+
+    @property
+    def generation(self):
+        """
+        数据变更计数：任何影响列表内容的提交都会使其递增
+        其他进程或本进程中直接走 engine 连接的写入不经过会话事件，
+        通过专用连接上的 PRAGMA data_version 发现 (其他连接提交后该值会变化)
+        """
+        with self._generation_lock:
+            version = self._read_data_version()
+            if version is None:
+                return self._generation
+            if version != self._data_version:
+                if self._data_version is not None:
+                    self._generation += 1
+                self._data_version = version
+            return self._generation
+
     def get_session(self):
         return self.Session()
 
-    def add_item(self, text, is_file=False, file_path=None, item_type='text', image_path=None, partition_id=None, data_blob=None, thumbnail_blob=None):
+    def _fetch_all_hashes(self):
+        with self.engine.connect() as conn:
+            return [row[0] for row in conn.exec_driver_sql("SELECT content_hash FROM clipboard_items")]
+
+    def _background_maintenance(self):
+        """启动后在后台依次执行的回填任务 (旧数据派生列 / 归一化文本 -> 全文索引 -> 大文本压缩)"""
+        self.backfill_derived_metadata()
+        self.backfill_search_norm()
+        self.backfill_search_pinyin()
+        self.backfill_simhash()
+        self.backfill_image_hashes()
+        self.rebuild_search_index()
+        self.compress_large_content()
+
+    def _pack_content(self, text):
+        """返回正文相关列；超过阈值时 content 只保留开头，完整正文压缩到 content_blob"""
+        if self.compress_threshold and len(text.encode('utf-8')) > self.compress_threshold:
+            return {'content': text[:CONTENT_HEAD_CHARS], 'content_blob': compress_text(text), 'is_compressed': True}
+        return {'content': text, 'content_blob': None, 'is_compressed': False}
+
+    @staticmethod
+    def _unpack_content(content, is_compressed, content_blob):
+        return decompress_text(content_blob) if is_compressed else content
+
+    def _full_text(self, item):
+        return self._unpack_content(item.content, item.is_compressed, item.content_blob if item.is_compressed else None)
+
+    # --- 分段 LSH (kind: 'text' 为 SimHash 4 段, 'image' 为 dHash 8 段) ---
+    LSH_KINDS = {
+        'text': ('simhash', LSH_BANDS, NEAR_DUP_DISTANCE),
+        'image': ('phash', IMAGE_LSH_BANDS, NEAR_IDENTICAL_DISTANCE),
+    }
+
+    def _lsh_store(self, session, kind, item_id, signature):
+        session.execute(lsh_bands.delete().where(and_(lsh_bands.c.kind == kind, lsh_bands.c.item_id == item_id)))
+        if signature is None:
+            return
+        session.execute(lsh_bands.insert(), [
+            {'kind': kind, 'band': band, 'key': key, 'item_id': item_id}
+            for band, key in split_bands(signature, self.LSH_KINDS[kind][1])
+        ])
+
+    def _lsh_candidates(self, session, kind, signature, exclude_id=None):
+        conds = [and_(lsh_bands.c.band == band, lsh_bands.c.key == key) for band, key in split_bands(signature, self.LSH_KINDS[kind][1])]
+        q = session.query(lsh_bands.c.item_id).filter(lsh_bands.c.kind == kind, or_(*conds)).distinct()
+        if exclude_id is not None:
+            q = q.filter(lsh_bands.c.item_id != exclude_id)
+        return [i for i, in q.all()]
+
+    def _near_duplicates(self, session, signature, exclude_id=None, max_distance=None, kind='text'):
+        """返回 [(项目, 距离), ...]，只含未删除项目，按距离升序"""
+        column, _, default_distance = self.LSH_KINDS[kind]
+        max_distance = default_distance if max_distance is None else max_distance
+        ids = self._lsh_candidates(session, kind, signature, exclude_id)
+        if not ids:
+            return []
+        rows = session.query(ClipboardItem).filter(ClipboardItem.id.in_(ids), ClipboardItem.is_deleted != True).all()
+        matches = [(item, hamming(signature, to_unsigned64(getattr(item, column)))) for item in rows if getattr(item, column) is not None]
+        return sorted([m for m in matches if m[1] <= max_distance], key=lambda m: (m[1], -m[0].id))
+
+    def _phash_values(self, session, item_id, phash):
+        """写入图片 dHash 的 LSH，返回 phash (及 near_dup_group) 列值；几乎相同的截图归入同一相似组 (需在 flush 之后调用)"""
+        values = {'phash': to_signed64(phash)}
+        if phash is None:
+            self._lsh_store(session, 'image', item_id, None)
+            return values
+        matches = self._near_duplicates(session, phash, exclude_id=item_id, kind='image')
+        if matches:
+            nearest = matches[0][0]
+            values['near_dup_group'] = nearest.near_dup_group or nearest.id
+        self._lsh_store(session, 'image', item_id, phash)
+        return values
+
+    def _index_phash(self, session, item, phash):
+        for k, v in self._phash_values(session, item.id, phash).items():
+            setattr(item, k, v)
+
+    def _simhash_values(self, session, item_id, text, item_type='text'):
+        """计算签名并写入 LSH，返回 simhash / near_dup_group 列值；有近似重复时加入对方的相似组 (需在 flush 之后调用)"""
+        signature = simhash64(text) if item_type == 'text' else None
+        values = {'simhash': to_signed64(signature), 'near_dup_group': None}
+        if signature is None:
+            session.execute(lsh_bands.delete().where(and_(lsh_bands.c.kind == 'text', lsh_bands.c.item_id == item_id)))
+            return values
+        matches = self._near_duplicates(session, signature, exclude_id=item_id)
+        if matches:
+            nearest = matches[0][0]
+            values['near_dup_group'] = nearest.near_dup_group or nearest.id
+        self._lsh_store(session, 'text', item_id, signature)
+        return values
+
+    def _index_simhash(self, session, item, text):
+        for k, v in self._simhash_values(session, item.id, text, item.item_type).items():
+            setattr(item, k, v)
+
+    def _touch_existing(self, session, existing, partition_id=None):
+        """重复内容：更新访问时间和计数"""
+        existing.last_visited_at = datetime.now()
+        existing.modified_at = datetime.now()
+        existing.visit_count = (existing.visit_count or 0) + 1
+        if partition_id and not existing.partition_id:
+            existing.partition_id = partition_id
+        session.commit()
+        return existing, False
+
+    def add_item(self, text, is_file=False, file_path=None, item_type='text', image_path=None, partition_id=None, data_blob=None, thumbnail_blob=None, file_fingerprint=None, file_state=None, url=None, url_domain=None, url_title=None, html=None, dedupe_key=None, phash=None, collapse_distance=None, image_codec=None, original_blob=None):
+        """
+        dedupe_key: 去重依据 (默认为 text)，图片传入像素数据的摘要
+        phash / collapse_distance: 图片 dHash；给出 collapse_distance 时，与已有图片距离不超过它视为同一张
+        image_codec / original_blob: data_blob 的编码标签，以及缩小存储时保留的原图
+        """
         session = self.get_session()
         try:
-            text_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
-            existing = session.query(ClipboardItem).filter_by(content_hash=text_hash).first()
+            url_canonical = None
+            if dedupe_key is not None:
+                text_hash = hashlib.sha256(dedupe_key.encode('utf-8')).hexdigest()
+            elif item_type == 'url':
+                url_canonical, canonical_domain = canonicalize_url(url or text)
+                url_domain = canonical_domain or url_domain
+                # 同一链接带不同追踪参数时按规范化形式去重
+                text_hash = hashlib.sha256(url_canonical.encode('utf-8')).hexdigest()
+            else:
+                text_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+            # 先问去重过滤器：LRU 命中直接按主键取；Bloom 判定一定不存在则跳过 hash 查询
+            known_id, might_exist = self._dedupe.lookup(text_hash)
+            existing = None
+            if known_id is not None:
+                existing = session.query(ClipboardItem).get(known_id)
+                if existing is not None and existing.content_hash != text_hash:
+                    existing = None
+            if existing is None and might_exist:
+                existing = session.query(ClipboardItem).filter_by(content_hash=text_hash).first()
             if existing:
-                existing.last_visited_at = datetime.now()
-                existing.modified_at = datetime.now()
-                existing.visit_count += 1
-                if partition_id and not existing.partition_id:
-                     existing.partition_id = partition_id
-                session.commit()
-                return existing, False
+                self._dedupe.add(text_hash, existing.id)
+                return self._touch_existing(session, existing, partition_id)
+            if phash is not None and collapse_distance is not None:
+                # 自动折叠几乎相同的截图：只更新已有项目的访问信息
+                matches = self._near_duplicates(session, phash, max_distance=collapse_distance, kind='image')
+                if matches:
+                    log.debug(f"图片与项目 {matches[0][0].id} 几乎相同 (距离 {matches[0][1]})，自动折叠")
+                    return self._touch_existing(session, matches[0][0], partition_id)
             
             min_sort = session.query(func.min(ClipboardItem.sort_index)).scalar()
             new_sort = (min_sort - 1.0) if min_sort is not None else 0.0
             note_txt = os.path.basename(file_path) if is_file and file_path else text.split('\n')[0][:50]
             
             new_item = ClipboardItem(
-                content=text, content_hash=text_hash, sort_index=new_sort, note=note_txt,
+                content_hash=text_hash, sort_index=new_sort, note=note_txt,
                 is_file=is_file, file_path=file_path, item_type=item_type, image_path=image_path,
-                partition_id=partition_id, data_blob=data_blob, thumbnail_blob=thumbnail_blob
+                partition_id=partition_id, data_blob=data_blob, thumbnail_blob=thumbnail_blob,
+                image_codec=image_codec, original_blob=original_blob,
+                file_fingerprint=file_fingerprint, file_state=file_state,
+                url=url or (text if item_type == 'url' else None), url_canonical=url_canonical,
+                url_domain=url_domain, url_title=url_title,
+                html_blob=compress_html(html) if html else None, has_html=bool(html),
+                search_norm=search_text(text, note_txt), search_pinyin=pinyin_text(text, note_txt),
+                **derive_metadata(text, item_type, file_path, image_path, data_blob),
+                **self._pack_content(text)
             )
             session.add(new_item)
             try:
+                session.flush()
+                self._search.add(session.connection(), new_item.id, text, note_txt)
+                self._index_simhash(session, new_item, text)
+                if phash is not None:
+                    self._index_phash(session, new_item, phash)
                 session.commit()
                 session.refresh(new_item)
+                self._dedupe.add(text_hash, new_item.id, self._fetch_all_hashes)
                 return new_item, True
             except Exception:
                 session.rollback()
                 existing = session.query(ClipboardItem).filter_by(content_hash=text_hash).first()
                 if existing:
+                    self._dedupe.add(text_hash, existing.id)
                     existing.last_visited_at = datetime.now()
                     existing.visit_count += 1
                     session.commit()
@@ -207,9 +587,604 @@ class DBManager:
         finally:
             session.close()
 
-    def _build_query(self, session, sort_mode="manual", date_filter=None, date_modify_filter=None, partition_filter=None, include_deleted=False):
-        log.debug(f"🔍 构建查询: sort={sort_mode}, date={date_filter}, date_modify={date_modify_filter}, partition={partition_filter}, deleted={include_deleted}")
-        q = session.query(ClipboardItem).options(joinedload(ClipboardItem.tags))
+    def backfill_derived_metadata(self, batch_size=500):
+        """后台回填旧数据的派生列 (type_key 为空的行)，分批提交避免长时间占用写锁"""
+        total = 0
+        try:
+            while True:
+                session = self.get_session()
+                try:
+                    rows = session.query(ClipboardItem.id, ClipboardItem.content, ClipboardItem.item_type, ClipboardItem.file_path, ClipboardItem.image_path, ClipboardItem.data_blob) \
+                        .filter(ClipboardItem.type_key == None).limit(batch_size).all()
+                    if not rows:
+                        break
+                    for item_id, content, item_type, file_path, image_path, data_blob in rows:
+                        # 批量 UPDATE 不触发 onupdate，回填不算修改，保留 modified_at
+                        values = derive_metadata(content, item_type, file_path, image_path, data_blob)
+                        values['modified_at'] = ClipboardItem.modified_at
+                        session.query(ClipboardItem).filter(ClipboardItem.id == item_id).update(values, synchronize_session=False)
+                    session.commit()
+                    total += len(rows)
+                finally:
+                    session.close()
+            if total:
+                log.info(f"✅ 已回填 {total} 条项目的派生元数据")
+        except Exception as e:
+            log.error(f"回填派生元数据失败: {e}", exc_info=True)
+        return total
+
+    def backfill_search_norm(self, batch_size=500):
+        """后台为旧数据生成排序搜索用的归一化文本"""
+        total = 0
+        try:
+            while True:
+                session = self.get_session()
+                try:
+                    rows = session.query(ClipboardItem.id, ClipboardItem.content, ClipboardItem.note).filter(ClipboardItem.search_norm == None).limit(batch_size).all()
+                    if not rows:
+                        break
+                    for item_id, content, note in rows:
+                        session.query(ClipboardItem).filter(ClipboardItem.id == item_id).update(
+                            {ClipboardItem.search_norm: search_text(content, note), ClipboardItem.modified_at: ClipboardItem.modified_at},
+                            synchronize_session=False)
+                    session.commit()
+                    total += len(rows)
+                finally:
+                    session.close()
+            if total:
+                log.info(f"✅ 已回填 {total} 条项目的归一化搜索文本")
+        except Exception as e:
+            log.error(f"回填归一化搜索文本失败: {e}", exc_info=True)
+        return total
+
+    def backfill_search_pinyin(self, batch_size=500):
+        """
+        后台为旧数据 (项目、标签、分区) 生成拼音影子文本
+        之前只能生成首字母的行 (全拼部分为空) 在安装 pypinyin 后重新生成
+        """
+        total = 0
+        try:
+            for model, columns in ((ClipboardItem, (ClipboardItem.content, ClipboardItem.note)), (Tag, (Tag.name,)), (Partition, (Partition.name,))):
+                pending = model.search_pinyin == None
+                if pinyin_full_available():
+                    pending = or_(pending, model.search_pinyin.like('\t%'))
+                last_id = 0
+                while True:
+                    session = self.get_session()
+                    try:
+                        rows = session.query(model.id, *columns).filter(pending, model.id > last_id).order_by(model.id).limit(batch_size).all()
+                        if not rows:
+                            break
+                        for row_id, *parts in rows:
+                            values = {model.search_pinyin: pinyin_text(*parts)}
+                            if model is ClipboardItem:
+                                values[ClipboardItem.modified_at] = ClipboardItem.modified_at
+                            session.query(model).filter(model.id == row_id).update(values, synchronize_session=False)
+                        session.commit()
+                        total += len(rows)
+                        last_id = rows[-1][0]
+                    finally:
+                        session.close()
+            if total:
+                log.info(f"✅ 已回填 {total} 条拼音索引")
+        except Exception as e:
+            log.error(f"回填拼音索引失败: {e}", exc_info=True)
+        return total
+
+    def rebuild_search_index(self, batch_size=500, force=False):
+        """索引为空或与项目数不一致时 (新建、旧版本数据库) 重建全文索引"""
+        if not self._search.available:
+            return 0
+        total = 0
+        try:
+            with self.engine.begin() as conn:
+                indexed = self._search.count(conn)
+                item_count = conn.exec_driver_sql("SELECT count(*) FROM clipboard_items").scalar()
+                if not force and indexed == item_count:
+                    return 0
+                # 清空与取 max_id 在同一事务内，之后新增的项目由 add_item 自行索引
+                self._search.clear(conn)
+                max_id = conn.exec_driver_sql("SELECT max(id) FROM clipboard_items").scalar() or 0
+            last_id = 0
+            while last_id < max_id:
+                with self.engine.begin() as conn:
+                    rows = conn.exec_driver_sql(
+                        "SELECT id, content, note, is_compressed, content_blob FROM clipboard_items "
+                        "WHERE id > ? AND id <= ? ORDER BY id LIMIT ?", (last_id, max_id, batch_size)
+                    ).fetchall()
+                    if not rows:
+                        break
+                    for item_id, content, note, is_compressed, blob in rows:
+                        self._search.add(conn, item_id, self._unpack_content(content, is_compressed, blob), note)
+                    last_id = rows[-1][0]
+                    total += len(rows)
+            log.info(f"✅ 全文索引已重建 ({total} 条)")
+        except Exception as e:
+            log.error(f"重建全文索引失败: {e}", exc_info=True)
+        return total
+
+    def compress_large_content(self, batch_size=100):
+        """把超过阈值但尚未压缩的旧正文转为压缩存储 (全文索引不受影响)"""
+        if not self.compress_threshold:
+            return 0
+        total = 0
+        try:
+            while True:
+                session = self.get_session()
+                try:
+                    rows = session.query(ClipboardItem.id, ClipboardItem.content).filter(
+                        # 旧库 ALTER TABLE 补出的列为 NULL，NULL != 1 不成立，需要单独匹配
+                        or_(ClipboardItem.is_compressed.is_(None), ClipboardItem.is_compressed == False),
+                        func.length(cast(ClipboardItem.content, LargeBinary)) > self.compress_threshold
+                    ).limit(batch_size).all()
+                    if not rows:
+                        break
+                    for item_id, content in rows:
+                        # 存储格式变化不算修改，保留 modified_at
+                        values = self._pack_content(content)
+                        values['modified_at'] = ClipboardItem.modified_at
+                        session.query(ClipboardItem).filter(ClipboardItem.id == item_id).update(values, synchronize_session=False)
+                    session.commit()
+                    total += len(rows)
+                finally:
+                    session.close()
+            if total:
+                log.info(f"🗜️ 已压缩 {total} 条大文本 (执行 VACUUM 后数据库文件才会缩小)")
+        except Exception as e:
+            log.error(f"压缩大文本失败: {e}", exc_info=True)
+        return total
+
+    def get_full_content(self, item_id):
+        """返回完整正文；压缩项目按 content_hash 缓存解压结果 (详情、预览、粘贴使用)"""
+        session = self.get_session()
+        try:
+            row = session.query(ClipboardItem.content, ClipboardItem.is_compressed, ClipboardItem.content_hash).filter(ClipboardItem.id == item_id).first()
+            if not row:
+                return None
+            content, is_compressed, content_hash = row
+            if not is_compressed:
+                return content
+            with self._content_cache_lock:
+                if content_hash in self._content_cache:
+                    self._content_cache.move_to_end(content_hash)
+                    return self._content_cache[content_hash]
+            blob = session.query(ClipboardItem.content_blob).filter(ClipboardItem.id == item_id).scalar()
+            full = decompress_text(blob)
+            with self._content_cache_lock:
+                self._content_cache[content_hash] = full
+                while len(self._content_cache) > 16:
+                    self._content_cache.popitem(last=False)
+            return full
+        except Exception as e:
+            log.error(f"读取完整正文失败: {e}", exc_info=True)
+            return None
+        finally:
+            session.close()
+
+    def _search_filter(self, query):
+        """搜索条件 (查询语句内使用)：全文索引子查询，短词退回 LIKE"""
+        if self._search.can_match(query):
+            return self._search.match_clause(query)
+        pattern = f"%{query}%"
+        return or_(ClipboardItem.content.ilike(pattern), ClipboardItem.note.ilike(pattern))
+
+    def _search_condition(self, query):
+        """
+        列表搜索条件: 正文 / 备注 (全文索引或 LIKE)、标签名或分区名包含搜索词
+        纯字母的搜索词同时匹配各自的拼音影子文本 (全拼或首字母)
+        """
+        def tag_hit(condition):
+            return exists().where(and_(item_tags.c.item_id == ClipboardItem.id, item_tags.c.tag_id == Tag.id, condition))
+
+        def partition_hit(condition):
+            return ClipboardItem.partition_id.in_(select(Partition.id).where(condition))
+
+        pattern = f"%{query}%"
+        conditions = [self._search_filter(query), tag_hit(Tag.name.ilike(pattern)), partition_hit(Partition.name.ilike(pattern))]
+        if is_pinyin_query(query):
+            pattern = f"%{query.lower()}%"
+            conditions += [ClipboardItem.search_pinyin.like(pattern), tag_hit(Tag.search_pinyin.like(pattern)),
+                           partition_hit(Partition.search_pinyin.like(pattern))]
+        return or_(*conditions)
+
+    def _regex_condition(self, pattern, flags):
+        """正文 (压缩存储的项目取完整正文) 或备注匹配正则；由自定义函数 regexp_search 逐行执行"""
+        body = case((ClipboardItem.is_compressed == True, ClipboardItem.content_blob), else_=ClipboardItem.content)
+        return or_(func.regexp_search(pattern, flags, body, type_=Boolean),
+                   func.regexp_search(pattern, flags, func.coalesce(ClipboardItem.note, ''), type_=Boolean))
+
+    def _term_condition(self, session, term):
+        """搜索语法中单个条件 -> SQL 条件"""
+        kind, value = term.kind, term.value
+        if term.is_text:
+            condition = self._search_condition(value)
+        elif kind == 'regex':
+            condition = self._regex_condition(value, term.flags)
+            required = required_literal(value)
+            if not term.negate and self._search.can_match(required):
+                # 正则必然包含的字面文本先走全文索引，自定义函数只在这些候选上执行
+                condition = and_(self._search_filter(required), condition)
+        elif kind == 'tag':
+            condition = exists().where(and_(item_tags.c.item_id == ClipboardItem.id, item_tags.c.tag_id == Tag.id, func.lower(Tag.name) == value.lower()))
+        elif kind == 'type':
+            condition = or_(func.lower(ClipboardItem.type_key) == value, ClipboardItem.item_type == value)
+        elif kind == 'star':
+            star = func.coalesce(ClipboardItem.star_level, 0)
+            condition = {'=': star == value, '>': star > value, '>=': star >= value, '<': star < value, '<=': star <= value}[term.op]
+        elif kind in ('created', 'modified'):
+            column = ClipboardItem.created_at if kind == 'created' else ClipboardItem.modified_at
+            if value[0] == 'since':
+                start_dt, end_dt = datetime.now() - value[1], None
+            elif value[0] == 'label':
+                start_dt, end_dt = self._date_range(value[1])
+            else:
+                start_dt = datetime.combine(value[1], time.min) if value[1] else None
+                end_dt = datetime.combine(value[2], time.max) if value[2] else None
+            bounds = [c for c in (start_dt and column >= start_dt, end_dt and column <= end_dt) if c is not None]
+            condition = and_(*bounds) if bounds else literal(True)
+        elif kind == 'color':
+            condition = func.lower(ClipboardItem.custom_color) == value
+        elif kind == 'partition':
+            ids = [i for i, in session.query(Partition.id).filter(func.lower(Partition.name) == value.lower()).all()]
+            ids = {d for pid in ids for d in self._get_all_descendant_ids(session, pid)}
+            condition = ClipboardItem.partition_id.in_(ids)
+        else:  # is:
+            condition = getattr(ClipboardItem, f"is_{value}") == True
+        if term.negate:
+            condition = ~func.coalesce(condition, False)
+        return condition
+
+    def _query_condition(self, session, query):
+        """
+        解析后的搜索语法 (core.search_query) -> SQL 条件；没有有效条件时返回 None
+        正则条件放在最后，SQLite 先用其他条件 (索引) 缩小范围
+        """
+        conditions, regex = [], []
+        for group in query.groups:
+            terms = group.terms if isinstance(group, AnyOf) else (group,)
+            condition = or_(*[self._term_condition(session, t) for t in terms])
+            (regex if any(t.kind == 'regex' for t in terms) else conditions).append(condition)
+        conditions += regex
+        return and_(*conditions) if conditions else None
+
+    def iter_item_ids(self, sort_mode="manual", batch_size=500, within=None, **filters):
+        """
+        按列表顺序分批产出匹配的项目 ID (搜索会话流式显示用)
+        within: 上一次结果的有序 ID 列表；给出时只在这些候选中按 filters['search'] 复查，不再扫描整张表
+        """
+        self._sync_smart_view(filters)
+        session = self.get_session()
+        try:
+            if within is None:
+                q = self._build_query(session, sort_mode=sort_mode, include_deleted=self._is_trash(filters), **filters)
+                for part in session.execute(q.with_entities(ClipboardItem.id).statement).partitions(batch_size):
+                    yield [i for i, in part]
+                return
+            search = (filters.get('search') or '').strip()
+            condition = self._query_condition(session, parse_query(search)) if search else None
+            for start in range(0, len(within), batch_size):
+                chunk = within[start:start + batch_size]
+                q = session.query(ClipboardItem.id).filter(ClipboardItem.id.in_(chunk))
+                if condition is not None:
+                    q = q.filter(condition)
+                hits = {i for i, in q.all()}
+                yield [i for i in chunk if i in hits]
+        finally:
+            session.close()
+
+    def _rank_candidates(self, filters):
+        """
+        排序搜索的候选数组 (范围内全部项目的 ID、归一化文本、拼音影子文本、最近使用时间、使用次数，以及 ID -> 下标)
+        按范围条件与数据版本缓存，连续输入时每次只需在内存中匹配
+        """
+        self._sync_smart_view(filters)
+        key = ('rank', self._filter_key(filters))
+        generation = self.generation
+        cached = self.query_cache.get(key, generation)
+        if cached is not None:
+            return cached
+        session = self.get_session()
+        try:
+            q = self._build_query(session, sort_mode=None, include_deleted=self._is_trash(filters), **filters).with_entities(
+                ClipboardItem.id, ClipboardItem.search_norm, ClipboardItem.search_pinyin, ClipboardItem.preview, ClipboardItem.note,
+                func.coalesce(ClipboardItem.last_visited_at, ClipboardItem.modified_at, ClipboardItem.created_at), ClipboardItem.visit_count)
+            rows = q.all()
+        finally:
+            session.close()
+        now = datetime.now()
+        ids, texts, pinyins, ages, visits = [], [], [], [], []
+        for item_id, norm, pinyin, preview, note, used_at, visit_count in rows:
+            ids.append(item_id)
+            texts.append(norm if norm is not None else search_text(preview, note))  # 尚未回填时用摘要代替
+            pinyins.append(pinyin or '')
+            ages.append((now - used_at).total_seconds() / 86400 if used_at else 365)
+            visits.append(visit_count or 0)
+        position = {item_id: i for i, item_id in enumerate(ids)}
+        candidates = (ids, CandidateArray(texts), CandidateArray(pinyins), ages, visits, position)
+        self.query_cache.put(key, generation, candidates, size=candidates[1].size_bytes + candidates[2].size_bytes + len(ids) * 112)
+        return candidates
+
+    def search_ranked(self, query, limit=500, **filters):
+        """
+        排序搜索: 返回按相关度排列的项目 ID (最多 limit 个)
+        得分 = 模糊匹配 (子序列，连续 / 词首加分) + 全文索引 BM25 + 最近使用 + 使用次数，权重见 RANK_WEIGHTS
+        模糊匹配在归一化文本 (正文开头 + 备注) 上进行；正文较长时后半部分只能由全文索引命中
+        纯字母的搜索词同时在拼音影子文本上模糊匹配，取两者中较高的得分
+        搜索语法中除单个文本词以外的条件 (字段、排除、正则、多个词) 先在 SQL 中求出命中集合，再在集合内排序
+        """
+        parsed = parse_query(query.strip())
+        words = [t.value for t in parsed.terms() if t.is_text and not t.negate]
+        if not parsed:
+            return []
+        try:
+            ids, texts, pinyins, ages, visits, position = self._rank_candidates(filters)
+            allowed = None
+            if not (parsed.is_plain_text and len(words) == 1):
+                allowed = {position[i] for i in self._query_ids(query.strip(), filters) if i in position}
+        except Exception as e:
+            log.error(f"排序搜索失败: {e}", exc_info=True)
+            return []
+
+        fuzzy, bm25 = {}, {}
+        for word in words:
+            pattern = normalize(word)
+            if not pattern:
+                continue
+            scores = texts.match(pattern)
+            if is_pinyin_query(pattern):
+                for i, score in pinyins.match(pattern).items():
+                    scores[i] = max(scores.get(i, 0), RANK_WEIGHTS['pinyin'] * score)
+            top_fuzzy = max_score(pattern) * len(words)
+            for i, score in scores.items():
+                fuzzy[i] = fuzzy.get(i, 0) + score / top_fuzzy
+            if self._search.can_match(word):
+                with self.engine.connect() as conn:
+                    for rowid, score in self._search.match_scores(conn, word):
+                        if rowid in position:
+                            i = position[rowid]
+                            bm25[i] = bm25.get(i, 0) - score  # FTS5 的 bm25 越小越相关
+        top_bm25 = max(bm25.values(), default=0) or 1
+
+        weights = RANK_WEIGHTS
+        ranked = []
+        for i in (allowed if allowed is not None else set(fuzzy) | set(bm25)):
+            score = weights['fuzzy'] * fuzzy.get(i, 0) + weights['bm25'] * bm25.get(i, 0) / top_bm25
+            score += weights['recency'] * 0.5 ** (ages[i] / RECENCY_HALF_LIFE_DAYS)
+            score += weights['visits'] * min(1.0, math.log1p(visits[i]) / 5)
+            ranked.append((score, ids[i]))
+        ranked.sort(reverse=True)
+        return [item_id for _, item_id in ranked[:limit]]
+
+    def _query_ids(self, search, filters):
+        """范围 filters 内满足搜索语法的项目 ID"""
+        session = self.get_session()
+        try:
+            q = self._build_query(session, sort_mode=None, include_deleted=self._is_trash(filters), **dict(filters, search=search))
+            return [i for i, in q.with_entities(ClipboardItem.id).all()]
+        finally:
+            session.close()
+
+    def get_items_by_ids(self, ids):
+        """按给定顺序返回项目 (不存在的 ID 跳过)"""
+        if not ids:
+            return []
+        session = self.get_session()
+        try:
+            rows = session.query(ClipboardItem).options(joinedload(ClipboardItem.tags)).filter(ClipboardItem.id.in_(list(ids))).all()
+            by_id = {item.id: item for item in rows}
+            return [by_id[i] for i in ids if i in by_id]
+        except Exception as e:
+            log.error(f"按 ID 查询失败: {e}", exc_info=True)
+            return []
+        finally:
+            session.close()
+
+    def search_item_ids(self, query):
+        """正文 (含压缩正文) 或备注包含 query 的项目 ID 集合；trigram 无法处理的短词退回 LIKE"""
+        query = (query or '').strip()
+        if not query:
+            return set()
+        session = self.get_session()
+        try:
+            if self._search.can_match(query):
+                return self._search.match_ids(session.connection(), query)
+            return {i for i, in session.query(ClipboardItem.id).filter(self._search_filter(query)).all()}
+        except Exception as e:
+            log.error(f"搜索失败: {e}", exc_info=True)
+            return set()
+        finally:
+            session.close()
+
+    def backfill_simhash(self, batch_size=500):
+        """按 ID 顺序为旧文本项目计算 SimHash 并归入相似组"""
+        total = 0
+        try:
+            last_id = 0
+            while True:
+                session = self.get_session()
+                try:
+                    rows = session.query(ClipboardItem.id, ClipboardItem.content, ClipboardItem.is_compressed, ClipboardItem.content_blob).filter(
+                        ClipboardItem.id > last_id, ClipboardItem.item_type == 'text', ClipboardItem.simhash == None
+                    ).order_by(ClipboardItem.id).limit(batch_size).all()
+                    if not rows:
+                        break
+                    for item_id, content, is_compressed, blob in rows:
+                        # 批量 UPDATE 立即写入 (后面的行能查到它的签名)，且不触发 onupdate，保留 modified_at
+                        values = self._simhash_values(session, item_id, self._unpack_content(content, is_compressed, blob))
+                        values['modified_at'] = ClipboardItem.modified_at
+                        session.query(ClipboardItem).filter(ClipboardItem.id == item_id).update(values, synchronize_session=False)
+                    session.commit()
+                    last_id = rows[-1][0]
+                    total += len(rows)
+                finally:
+                    session.close()
+            if total:
+                log.info(f"✅ 已为 {total} 条文本计算 SimHash")
+        except Exception as e:
+            log.error(f"回填 SimHash 失败: {e}", exc_info=True)
+        return total
+
+    def backfill_image_hashes(self, batch_size=200):
+        """为旧图片项目从缩略图计算 dHash (不解码原图)；没有 Qt 环境时跳过"""
+        try:
+            from core.image_hash import dhash_from_blob
+            dhash_from_blob(None)
+        except ImportError:
+            return 0
+        total = 0
+        try:
+            last_id = 0
+            while True:
+                session = self.get_session()
+                try:
+                    rows = session.query(ClipboardItem.id, ClipboardItem.thumbnail_blob).filter(
+                        ClipboardItem.id > last_id, ClipboardItem.item_type == 'image',
+                        ClipboardItem.phash == None, ClipboardItem.thumbnail_blob != None
+                    ).order_by(ClipboardItem.id).limit(batch_size).all()
+                    if not rows:
+                        break
+                    for item_id, thumbnail_blob in rows:
+                        # 与 backfill_simhash 相同：逐行批量 UPDATE，保留 modified_at
+                        values = self._phash_values(session, item_id, dhash_from_blob(thumbnail_blob))
+                        values['modified_at'] = ClipboardItem.modified_at
+                        session.query(ClipboardItem).filter(ClipboardItem.id == item_id).update(values, synchronize_session=False)
+                    session.commit()
+                    last_id = rows[-1][0]
+                    total += len(rows)
+                finally:
+                    session.close()
+            if total:
+                log.info(f"✅ 已为 {total} 张图片计算感知哈希")
+        except Exception as e:
+            log.error(f"回填图片哈希失败: {e}", exc_info=True)
+        return total
+
+    def find_near_duplicates(self, item_id, max_distance=None):
+        """返回与指定项目近似重复的 [(项目, 汉明距离), ...] (文本按 SimHash，图片按 dHash)"""
+        session = self.get_session()
+        try:
+            item = session.query(ClipboardItem).get(item_id)
+            if not item:
+                return []
+            kind = 'image' if item.item_type == 'image' else 'text'
+            signature = getattr(item, self.LSH_KINDS[kind][0])
+            if signature is None:
+                return []
+            return self._near_duplicates(session, to_unsigned64(signature), exclude_id=item_id, max_distance=max_distance, kind=kind)
+        except Exception as e:
+            log.error(f"查找近似重复失败: {e}", exc_info=True)
+            return []
+        finally:
+            session.close()
+
+    def _similar_ids(self, session, item_id):
+        """'相似内容'视图的成员：图片用宽松阈值，文本用近似重复阈值"""
+        item = session.query(ClipboardItem).get(item_id)
+        if not item:
+            return []
+        kind = 'image' if item.item_type == 'image' else 'text'
+        signature = getattr(item, self.LSH_KINDS[kind][0])
+        if signature is None:
+            return []
+        max_distance = SIMILAR_DISTANCE if kind == 'image' else None
+        return [m.id for m, _ in self._near_duplicates(session, to_unsigned64(signature), exclude_id=item_id, max_distance=max_distance, kind=kind)]
+
+    def find_similar_images(self, item_id, max_distance=SIMILAR_DISTANCE):
+        """相似图片 (阈值比近似重复宽松，光标、时钟、小块区域不同的截图都会命中)"""
+        return self.find_near_duplicates(item_id, max_distance=max_distance)
+
+    def merge_items(self, keep_id, merge_ids):
+        """
+        合并近似重复：标签、访问次数、星级和收藏/置顶状态并入 keep_id，
+        其余项目移入回收站 (锁定的项目保持不动)
+        """
+        merge_ids = [i for i in merge_ids if i != keep_id]
+        if not merge_ids:
+            return False
+        session = self.get_session()
+        try:
+            keep = session.query(ClipboardItem).get(keep_id)
+            others = session.query(ClipboardItem).filter(ClipboardItem.id.in_(merge_ids)).all()
+            if not keep or not others:
+                return False
+            for other in others:
+                for tag in other.tags:
+                    if tag not in keep.tags:
+                        keep.tags.append(tag)
+                keep.visit_count = (keep.visit_count or 0) + (other.visit_count or 0)
+                keep.star_level = max(keep.star_level or 0, other.star_level or 0)
+                keep.is_favorite = keep.is_favorite or other.is_favorite
+                keep.is_pinned = keep.is_pinned or other.is_pinned
+                keep.custom_color = keep.custom_color or other.custom_color
+                if not keep.note and other.note:
+                    keep.note = other.note
+            session.commit()
+        except Exception as e:
+            log.error(f"合并项目失败: {e}", exc_info=True)
+            session.rollback()
+            return False
+        finally:
+            session.close()
+        self.move_items_to_trash(merge_ids)
+        log.info(f"🧬 已将 {len(merge_ids)} 条近似重复合并到项目 {keep_id}")
+        return True
+
+    @staticmethod
+    def _date_range(label):
+        """日期分组名 -> (起始时间, 结束时间)，无上/下界时为 None"""
+        today = datetime.now().date()
+        if label == "今日":
+            return datetime.combine(today, time.min), datetime.combine(today, time.max)
+        if label == "昨日":
+            return datetime.combine(today - timedelta(days=1), time.min), datetime.combine(today - timedelta(days=1), time.max)
+        if label == "周内":
+            return datetime.combine(today - timedelta(days=7), time.min), None
+        if label == "两周":
+            return datetime.combine(today - timedelta(days=14), time.min), None
+        if label == "本月":
+            return datetime.combine(today.replace(day=1), time.min), None
+        if label == "上月":
+            last_month_end = today.replace(day=1) - timedelta(days=1)
+            return datetime.combine(last_month_end.replace(day=1), time.min), datetime.combine(last_month_end, time.max)
+        return None, None
+
+    def _date_condition(self, column, labels):
+        """一个或多个日期分组 (之间为"或") -> 列上的范围条件，可走日期列索引"""
+        if isinstance(labels, str):
+            labels = [labels]
+        ranges = []
+        for start_dt, end_dt in map(self._date_range, labels or ()):
+            bounds = [c for c in (start_dt and column >= start_dt, end_dt and column <= end_dt) if c is not None]
+            if bounds:
+                ranges.append(and_(*bounds))
+        return or_(*ranges) if ranges else None
+
+    def _build_query(self, session, sort_mode="manual", date_filter=None, date_modify_filter=None, partition_filter=None, include_deleted=False, collapse_similar=False, search=None,
+                     stars=None, colors=None, types=None, tag_ids=None, tag_mode='any'):
+        """
+        列表查询: 所有筛选条件都在 SQL 中完成，分页与计数直接基于筛选后的结果
+        - date_filter / date_modify_filter: 日期分组名或分组名列表 (之间为"或")
+        - stars / colors / types: 取值集合 (维度内为"或"，维度之间为"且")
+        - tag_ids: 标签 ID 集合，tag_mode 为 'any' (含任一标签) 或 'all' (含全部标签)
+        - search: 搜索语法 (core.search_query)，普通词匹配正文 / 备注 (全文索引)、标签名或分区名
+        """
+        log.debug(f"🔍 构建查询: sort={sort_mode}, date={date_filter}, date_modify={date_modify_filter}, partition={partition_filter}, deleted={include_deleted}, collapse={collapse_similar}, search={search!r}, "
+                  f"stars={stars}, colors={colors}, types={types}, tags={tag_ids}({tag_mode})")
+        q = self._apply_filters(session, session.query(ClipboardItem).options(joinedload(ClipboardItem.tags)), date_filter, date_modify_filter, partition_filter, include_deleted,
+                                collapse_similar, search, stars, colors, types, tag_ids, tag_mode)
+        if sort_mode == "manual":
+            q = q.order_by(ClipboardItem.is_pinned.desc(), ClipboardItem.sort_index.asc())
+        elif sort_mode == "time":
+            q = q.order_by(ClipboardItem.is_pinned.desc(), ClipboardItem.created_at.desc())
+        return q
+
+    def _count_query(self, session, date_filter=None, date_modify_filter=None, partition_filter=None, include_deleted=False, collapse_similar=False, search=None,
+                     stars=None, colors=None, types=None, tag_ids=None, tag_mode='any'):
+        """计数专用: 只选 count(*)，没有预加载标签的 JOIN 和排序，分区 / 日期条件可由覆盖索引直接回答"""
+        return self._apply_filters(session, session.query(func.count(ClipboardItem.id)), date_filter, date_modify_filter, partition_filter, include_deleted,
+                                   collapse_similar, search, stars, colors, types, tag_ids, tag_mode)
+
+    def _apply_filters(self, session, q, date_filter, date_modify_filter, partition_filter, include_deleted, collapse_similar, search, stars, colors, types, tag_ids, tag_mode):
         if include_deleted:
             q = q.filter(ClipboardItem.is_deleted == True)
         else:
@@ -224,86 +1199,393 @@ class DBManager:
                 q = q.filter(ClipboardItem.partition_id == None)
             elif ptype == 'untagged':
                 q = q.filter(~exists().where(item_tags.c.item_id == ClipboardItem.id))
-        
-        def apply_date_filter(query, column, filter_str):
-            if not filter_str:
-                return query
-            today = datetime.now().date()
-            start_dt, end_dt = None, None
-            if filter_str == "今日":
-                start_dt, end_dt = datetime.combine(today, time.min), datetime.combine(today, time.max)
-            elif filter_str == "昨日":
-                start_dt, end_dt = datetime.combine(today - timedelta(days=1), time.min), datetime.combine(today - timedelta(days=1), time.max)
-            elif filter_str == "周内":
-                start_dt = datetime.combine(today - timedelta(days=7), time.min)
-            elif filter_str == "两周":
-                start_dt = datetime.combine(today - timedelta(days=14), time.min)
-            elif filter_str == "本月":
-                start_dt = datetime.combine(today.replace(day=1), time.min)
-            elif filter_str == "上月":
-                first_day = today.replace(day=1)
-                last_month_end = first_day - timedelta(days=1)
-                start_dt, end_dt = datetime.combine(last_month_end.replace(day=1), time.min), datetime.combine(last_month_end, time.max)
-            
-            if start_dt:
-                query = query.filter(column >= start_dt)
-            if end_dt:
-                query = query.filter(column <= end_dt)
-            return query
-
-        q = apply_date_filter(q, ClipboardItem.created_at, date_filter)
-        q = apply_date_filter(q, ClipboardItem.modified_at, date_modify_filter)
-            
-        if sort_mode == "manual":
-            q = q.order_by(ClipboardItem.is_pinned.desc(), ClipboardItem.sort_index.asc())
-        elif sort_mode == "time":
-            q = q.order_by(ClipboardItem.is_pinned.desc(), ClipboardItem.created_at.desc())
+            elif ptype == 'domain':
+                q = q.filter(ClipboardItem.url_domain == pid)
+            elif ptype == 'similar':
+                q = q.filter(ClipboardItem.id.in_([pid] + self._similar_ids(session, pid)))
+            elif ptype == 'smart':
+                members = smart_partition_items
+                q = q.filter(ClipboardItem.id.in_(select(members.c.item_id).where(members.c.smart_id == pid)))
+
+        if search and search.strip():
+            condition = self._query_condition(session, parse_query(search.strip()))
+            if condition is not None:
+                q = q.filter(condition)
+
+        for column, labels in ((ClipboardItem.created_at, date_filter), (ClipboardItem.modified_at, date_modify_filter)):
+            condition = self._date_condition(column, labels)
+            if condition is not None:
+                q = q.filter(condition)
+
+        if stars:
+            stars = {int(s) for s in stars}
+            condition = ClipboardItem.star_level.in_(stars)
+            q = q.filter(or_(condition, ClipboardItem.star_level == None) if 0 in stars else condition)
+        if colors:
+            q = q.filter(ClipboardItem.custom_color.in_(list(colors)))
+        if types:
+            types = list(types)
+            q = q.filter(or_(ClipboardItem.type_key.in_(types), and_(ClipboardItem.type_key == None, ClipboardItem.item_type.in_(types))))
+        if tag_ids:
+            def has_tags(ids):
+                return exists().where(and_(item_tags.c.item_id == ClipboardItem.id, item_tags.c.tag_id.in_(ids)))
+            if tag_mode == 'all':
+                q = q.filter(and_(*[has_tags([tag_id]) for tag_id in set(tag_ids)]))
+            else:
+                q = q.filter(has_tags(list(tag_ids)))
+
+        if collapse_similar and not include_deleted:
+            # 折叠近似重复：组内存在更新的未删除项目时隐藏 (组员的 near_dup_group 必不为空，可走索引)
+            newer = aliased(ClipboardItem)
+            group_key = func.coalesce(ClipboardItem.near_dup_group, ClipboardItem.id)
+            q = q.filter(~exists().where(and_(
+                newer.near_dup_group == group_key, newer.id > ClipboardItem.id, newer.is_deleted != True
+            )))
         return q
 
-    def get_items(self, sort_mode="manual", limit=50, offset=0, date_filter=None, date_modify_filter=None, partition_filter=None):
+    @staticmethod
+    def _is_trash(filters):
+        partition_filter = filters.get('partition_filter')
+        return bool(partition_filter and partition_filter.get('type') == 'trash')
+
+    def get_items(self, sort_mode="manual", limit=50, offset=0, **filters):
+        """
+        filters 与 _build_query 的筛选参数相同
+        结果 (脱离会话的行对象，二进制列未加载) 按 (筛选条件, 排序, 分页) 缓存，重新访问同一视图直接命中
+        """
+        self._sync_smart_view(filters)
+        key = ('items', sort_mode, limit, offset, self._filter_key(filters))
+        generation = self.generation
+        cached = self.query_cache.get(key, generation)
+        if cached is not None:
+            return list(cached)
         session = self.get_session()
         try:
-            include_deleted = (partition_filter and partition_filter.get('type') == 'trash')
-            q = self._build_query(session, sort_mode=sort_mode, date_filter=date_filter, date_modify_filter=date_modify_filter, partition_filter=partition_filter, include_deleted=include_deleted)
+            q = self._build_query(session, sort_mode=sort_mode, include_deleted=self._is_trash(filters), **filters)
             if limit is not None:
                 q = q.limit(limit)
             if offset > 0:
                 q = q.offset(offset)
-            return q.all()
+            rows = q.all()
         except Exception as e:
             log.error(f"查询失败: {e}", exc_info=True)
             return []
         finally:
             session.close()
+        self.query_cache.put(key, generation, rows, size=estimate_rows_size(rows))
+        return list(rows)
 
-    def get_count(self, date_filter=None, date_modify_filter=None, partition_filter=None):
+    def get_count(self, cap=None, **filters):
+        """
+        筛选后的项目数，按筛选条件缓存，数据变更计数递增后失效
+        cap: 近似计数上限，只数到 cap 条为止 (返回值等于 cap 表示"至少 cap 条")，大分区翻页时不必扫描全部结果
+        """
+        self._sync_smart_view(filters)
+        key = ('count', cap, self._filter_key(filters))
+        generation = self.generation
+        cached = self.query_cache.get(key, generation)
+        if cached is not None:
+            return cached
         session = self.get_session()
         try:
-            include_deleted = (partition_filter and partition_filter.get('type') == 'trash')
-            q = self._build_query(session, date_filter=date_filter, date_modify_filter=date_modify_filter, partition_filter=partition_filter, include_deleted=include_deleted)
-            return q.count()
+            q = self._count_query(session, include_deleted=self._is_trash(filters), **filters)
+            if cap:
+                limited = q.with_entities(ClipboardItem.id).limit(cap).subquery()
+                count = session.query(func.count()).select_from(limited).scalar()
+            else:
+                count = q.scalar()
         except Exception as e:
             log.error(f"计数失败: {e}", exc_info=True)
             return 0
         finally:
             session.close()
+        self.query_cache.put(key, generation, count)
+        return count
+
+    def get_tag_ids(self, names):
+        """标签名 -> 标签 ID 列表 (筛选面板按名称勾选标签)"""
+        if not names:
+            return []
+        session = self.get_session()
+        try:
+            return [i for i, in session.query(Tag.id).filter(Tag.name.in_(list(names))).all()]
+        except Exception as e:
+            log.error(f"查询标签 ID 失败: {e}")
+            return []
+        finally:
+            session.close()
+
+    @staticmethod
+    def _filter_key(filters):
+        """筛选条件 -> 可哈希的缓存键 (字典、集合、列表按内容归一化；空集合、None、False 视为未设置)"""
+        def freeze(value):
+            if isinstance(value, dict):
+                return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+            if isinstance(value, (set, frozenset)):
+                return tuple(sorted(freeze(v) for v in value))
+            if isinstance(value, (list, tuple)):
+                return tuple(freeze(v) for v in value)
+            return value
+        return freeze({k: v for k, v in filters.items() if v})  # 空条件与未传入等价
+
+    @staticmethod
+    def _date_bucket(column):
+        """日期列 -> 筛选面板的日期分组名 (与 _build_query 的日期筛选边界一致)"""
+        today = datetime.now().date()
+        month_start = today.replace(day=1)
+        bounds = (today, today - timedelta(days=1), today - timedelta(days=7), today - timedelta(days=14),
+                  month_start, (month_start - timedelta(days=1)).replace(day=1))
+        return case(*[(column >= datetime.combine(day, time.min), label) for day, label in zip(bounds, DATE_BUCKETS)], else_=None)
+
+    def get_facets(self, **filters):
+        """
+        筛选面板统计: 在筛选后的完整结果集上一次 UNION ALL 查询得到星级 / 颜色 / 类型 / 标签 / 日期分组的数量
+        返回 {'stars': {}, 'colors': {}, 'types': {}, 'tags': [(名称, 数量)], 'date_create': {}, 'date_modify': {}}；
+        filters 与 _build_query 的筛选参数相同；所有标签都会列出 (数量可能为 0)。结果按筛选条件缓存，数据变更计数递增后失效
+        """
+        self._sync_smart_view(filters)
+        key = ('facets', datetime.now().date(), self._filter_key(filters))  # 日期分组随日期变化
+        generation = self.generation
+        cached = self.query_cache.get(key, generation)
+        if cached is not None:
+            return cached
+
+        stats = {'stars': {}, 'colors': {}, 'types': {}, 'tags': [], 'date_create': {}, 'date_modify': {}}
+        session = self.get_session()
+        try:
+            f = self._build_query(session, sort_mode=None, include_deleted=self._is_trash(filters), **filters).with_entities(
+                ClipboardItem.id.label('id'),
+                ClipboardItem.star_level.label('star'),
+                ClipboardItem.custom_color.label('color'),
+                func.coalesce(ClipboardItem.type_key, ClipboardItem.item_type).label('type'),
+                self._date_bucket(ClipboardItem.created_at).label('created'),
+                self._date_bucket(ClipboardItem.modified_at).label('modified'),
+            ).cte('f')
+
+            def grouped(facet, column, *where):
+                return select(literal(facet).label('facet'), column.label('value'), func.count().label('n')).where(*where).group_by(column)
+
+            tagged = select(literal('tags').label('facet'), Tag.name.label('value'), func.count().label('n')) \
+                .select_from(f.join(item_tags, item_tags.c.item_id == f.c.id).join(Tag, Tag.id == item_tags.c.tag_id)) \
+                .group_by(Tag.name)
+            all_tags = select(literal('all_tags').label('facet'), Tag.name.label('value'), literal(0).label('n'))
+            stmt = union_all(
+                grouped('stars', f.c.star),
+                grouped('colors', f.c.color, f.c.color != None, f.c.color != ''),
+                grouped('types', f.c.type),
+                grouped('date_create', f.c.created, f.c.created != None),
+                grouped('date_modify', f.c.modified, f.c.modified != None),
+                tagged,
+                all_tags,
+            )
+            tag_counts = {}
+            for facet, value, n in session.execute(stmt):
+                if facet == 'tags':
+                    tag_counts[value] = n
+                elif facet == 'all_tags':
+                    tag_counts.setdefault(value, 0)
+                else:
+                    stats[facet][int(value or 0) if facet == 'stars' else value] = n
+            stats['tags'] = list(tag_counts.items())
+        except Exception as e:
+            log.error(f"统计筛选项失败: {e}", exc_info=True)
+            return stats
+        finally:
+            session.close()
+
+        self.query_cache.put(key, generation, stats, size=64 * (1 + sum(len(v) for v in stats.values())))
+        return stats
 
     def update_item(self, item_id, **kwargs):
         session = self.get_session()
+        needs_snapshot = False
         try:
             item = session.query(ClipboardItem).get(item_id)
-            if item:
-                for k, v in kwargs.items():
+            if not item:
+                return False
+            reindex = 'content' in kwargs or 'note' in kwargs
+            if reindex:
+                old_body, old_note = self._full_text(item), item.note
+            for k, v in kwargs.items():
+                setattr(item, k, v)
+            body = kwargs['content'] if 'content' in kwargs else None
+            if body is not None:
+                for k, v in self._pack_content(body).items():
                     setattr(item, k, v)
-                session.commit()
-                return True
-            return False
+            if 'data_blob' in kwargs:
+                session.execute(item_thumbnails.delete().where(item_thumbnails.c.item_id == item_id))
+            if 'content' in kwargs or 'data_blob' in kwargs:
+                full = body if body is not None else self._full_text(item)
+                for k, v in derive_metadata(full, item.item_type, item.file_path, item.image_path, item.data_blob).items():
+                    setattr(item, k, v)
+            if body is not None:
+                self._index_simhash(session, item, body)
+            if reindex:
+                conn = session.connection()
+                self._search.remove(conn, item_id, old_body, old_note)
+                self._search.add(conn, item_id, body if body is not None else old_body, item.note)
+                item.search_norm = search_text(body if body is not None else item.content, item.note)
+                item.search_pinyin = pinyin_text(body if body is not None else item.content, item.note)
+            # 置顶或锁定意味着用户要长期保留，引用模式的文件需要立即快照
+            needs_snapshot = item.file_state == STATE_REFERENCE and bool(kwargs.get('is_pinned') or kwargs.get('is_locked'))
+            session.commit()
         except Exception as e:
             log.error(f"更新失败: {e}")
             session.rollback()
             return False
         finally:
             session.close()
+        if needs_snapshot:
+            self.snapshot_file_item(item_id)
+        return True
+
+    def get_item_html(self, item_id):
+        """解压并返回富文本项目的 HTML，仅供预览和粘贴使用"""
+        session = self.get_session()
+        try:
+            blob = session.query(ClipboardItem.html_blob).filter(ClipboardItem.id == item_id).scalar()
+            return decompress_html(blob)
+        except Exception as e:
+            log.error(f"读取 HTML 失败: {e}", exc_info=True)
+            return None
+        finally:
+            session.close()
+
+    def get_image_blob(self, item_id, thumbnail=False, original=False):
+        """读取图片原始数据 (或捕获时生成的 200px 缩略图)；original=True 时优先返回保留的原图"""
+        blob, _ = self.get_image_data(item_id, thumbnail, original)
+        return blob
+
+    def get_image_data(self, item_id, thumbnail=False, original=False):
+        """返回 (图片数据, 编码标签)；缩略图和保留的原图固定为 PNG"""
+        session = self.get_session()
+        try:
+            if thumbnail:
+                return session.query(ClipboardItem.thumbnail_blob).filter(ClipboardItem.id == item_id).scalar(), None
+            columns = [ClipboardItem.data_blob, ClipboardItem.image_codec]
+            if original:
+                columns.append(ClipboardItem.original_blob)
+            row = session.query(*columns).filter(ClipboardItem.id == item_id).first()
+            if not row:
+                return None, None
+            if original and row[2]:
+                return row[2], None
+            return row[0], row[1]
+        except Exception as e:
+            log.error(f"读取图片数据失败: {e}", exc_info=True)
+            return None, None
+        finally:
+            session.close()
+
+    def get_images_to_recompress(self, target_codec, after_id=0, limit=20):
+        """返回编码标签与目标不同的图片 [(id, data_blob, image_codec), ...]，按 ID 分批"""
+        session = self.get_session()
+        try:
+            return [tuple(r) for r in session.query(ClipboardItem.id, ClipboardItem.data_blob, ClipboardItem.image_codec).filter(
+                ClipboardItem.id > after_id, ClipboardItem.item_type == 'image', ClipboardItem.data_blob != None,
+                or_(ClipboardItem.image_codec == None, ClipboardItem.image_codec != target_codec)
+            ).order_by(ClipboardItem.id).limit(limit).all()]
+        except Exception as e:
+            log.error(f"查询待重压缩图片失败: {e}", exc_info=True)
+            return []
+        finally:
+            session.close()
+
+    def replace_image_blob(self, item_id, blob, image_codec, expected_codec=None):
+        """
+        写回重新编码的图片；编码标签已被其他写入改变时放弃 (返回 False)
+        像素内容不变，缩略图、感知哈希和去重摘要都保持有效
+        """
+        session = self.get_session()
+        try:
+            codec_match = ClipboardItem.image_codec == expected_codec if expected_codec else ClipboardItem.image_codec == None
+            q = session.query(ClipboardItem).filter(ClipboardItem.id == item_id, codec_match)
+            # 存储格式变化不算修改，保留 modified_at
+            values = {'data_blob': blob, 'image_codec': image_codec, 'byte_size': len(blob),
+                      'modified_at': ClipboardItem.modified_at}
+            updated = q.update(values, synchronize_session=False)
+            session.commit()
+            return bool(updated)
+        except Exception as e:
+            log.error(f"写回重压缩图片失败: {e}")
+            session.rollback()
+            return False
+        finally:
+            session.close()
+
+    def get_thumbnail(self, item_id, size_key):
+        session = self.get_session()
+        try:
+            return session.query(item_thumbnails.c.blob).filter(
+                item_thumbnails.c.item_id == item_id, item_thumbnails.c.size_key == size_key
+            ).scalar()
+        except Exception as e:
+            log.error(f"读取缩略图失败: {e}", exc_info=True)
+            return None
+        finally:
+            session.close()
+
+    def save_thumbnail(self, item_id, size_key, blob, width, height):
+        """
+        缩略图缓存只写 item_thumbnails (CACHE_NEUTRAL_TABLES)，不改变变更计数：
+        为预取页生成缩略图不会让这些页的查询缓存失效
+        """
+        session = self.get_session()
+        try:
+            session.execute(item_thumbnails.insert().prefix_with('OR REPLACE').values(
+                item_id=item_id, size_key=size_key, blob=blob, width=width, height=height))
+            session.commit()
+        except Exception as e:
+            log.error(f"保存缩略图失败: {e}")
+            session.rollback()
+        finally:
+            session.close()
+
+    def get_reference_file_items(self):
+        """返回所有仍处于引用模式的文件项目 [(id, file_fingerprint), ...]"""
+        session = self.get_session()
+        try:
+            return session.query(ClipboardItem.id, ClipboardItem.file_fingerprint).filter(
+                ClipboardItem.file_state == STATE_REFERENCE,
+                ClipboardItem.is_deleted != True
+            ).all()
+        except Exception as e:
+            log.error(f"获取引用文件失败: {e}", exc_info=True)
+            return []
+        finally:
+            session.close()
+
+    def snapshot_file_item(self, item_id):
+        """
+        将引用模式的文件项目转为快照 (读取文件内容存入 data_blob)
+        源文件已与指纹不一致时无法还原捕获时的内容，标记为 stale
+        """
+        session = self.get_session()
+        try:
+            item = session.query(ClipboardItem).get(item_id)
+            if not item or item.file_state != STATE_REFERENCE:
+                return False
+            paths = [p for p in (item.file_path or '').split(';') if p]
+            if changed_paths(item.file_fingerprint):
+                item.file_state = STATE_STALE
+                session.commit()
+                log.warning(f"⚠️ 项目 {item_id} 的源文件已变化，无法快照")
+                return False
+            item.data_blob = pack_files(paths)
+            item.byte_size = len(item.data_blob)
+            item.file_state = STATE_SNAPSHOT
+            session.commit()
+            log.info(f"📦 已快照项目 {item_id} ({len(item.data_blob)} 字节)")
+            return True
+        except Exception as e:
+            log.error(f"文件快照失败: {e}", exc_info=True)
+            session.rollback()
+            return False
+        finally:
+            session.close()
+
+    def mark_file_item_stale(self, item_id):
+        return self.update_item(item_id, file_state=STATE_STALE)
 
     def move_items_to_trash(self, ids):
         session = self.get_session()
@@ -338,11 +1620,27 @@ class DBManager:
         finally:
             session.close()
 
+    def _unindex(self, session, q):
+        """永久删除前从全文索引、LSH 和缩略图表中移除，返回这些项目的 content_hash (供去重过滤器清理)"""
+        rows = q.with_entities(ClipboardItem.id, ClipboardItem.content_hash, ClipboardItem.content, ClipboardItem.note,
+                               ClipboardItem.is_compressed, ClipboardItem.content_blob).all()
+        conn = session.connection()
+        for item_id, _, content, note, is_compressed, blob in rows:
+            self._search.remove(conn, item_id, self._unpack_content(content, is_compressed, blob), note)
+        ids = [r[0] for r in rows]
+        for i in range(0, len(ids), 500):
+            session.execute(lsh_bands.delete().where(lsh_bands.c.item_id.in_(ids[i:i + 500])))
+            session.execute(item_thumbnails.delete().where(item_thumbnails.c.item_id.in_(ids[i:i + 500])))
+        return [h for _, h, *_ in rows]
+
     def delete_items_permanently(self, ids):
         session = self.get_session()
         try:
-            session.query(ClipboardItem).filter(ClipboardItem.id.in_(ids)).delete(synchronize_session=False)
+            q = session.query(ClipboardItem).filter(ClipboardItem.id.in_(ids))
+            hashes = self._unindex(session, q)
+            q.delete(synchronize_session=False)
             session.commit()
+            self._dedupe.discard(hashes)
         except Exception as e:
             log.error(f"永久删除失败: {e}")
             session.rollback()
@@ -415,11 +1713,14 @@ class DBManager:
     def auto_delete_old_data(self, days=21):
         session = self.get_session()
         try:
-            count = session.query(ClipboardItem).filter(
+            q = session.query(ClipboardItem).filter(
                 ClipboardItem.created_at < datetime.now() - timedelta(days=days),
                 ClipboardItem.is_locked == False
-            ).delete(synchronize_session=False)
+            )
+            hashes = self._unindex(session, q)
+            count = q.delete(synchronize_session=False)
             session.commit()
+            self._dedupe.discard(hashes)
             return count
         except Exception as e:
             log.error(f"清理旧数据失败: {e}")
@@ -512,7 +1813,25 @@ class DBManager:
         finally:
             session.close()
 
+    def get_url_domains(self):
+        """返回 [(域名, 链接数), ...]，按数量降序 (走 url_domain 索引)"""
+        session = self.get_session()
+        try:
+            return session.query(ClipboardItem.url_domain, func.count(ClipboardItem.id)).filter(
+                ClipboardItem.url_domain != None, ClipboardItem.is_deleted != True
+            ).group_by(ClipboardItem.url_domain).order_by(func.count(ClipboardItem.id).desc()).all()
+        except Exception as e:
+            log.error(f"获取域名列表失败: {e}", exc_info=True)
+            return []
+        finally:
+            session.close()
+
+    def get_items_by_domain(self, domain, limit=None, offset=0):
+        """某个域名下的全部链接 (等价于 partition_filter={'type': 'domain', 'id': domain})"""
+        return self.get_items(sort_mode="time", limit=limit, offset=offset, partition_filter={'type': 'domain', 'id': domain})
+
     def get_partition_item_counts(self):
+        self.sync_smart_partitions()
         session = self.get_session()
         try:
             base_q = session.query(ClipboardItem).filter(ClipboardItem.is_deleted != True)
@@ -535,7 +1854,8 @@ class DBManager:
                 'uncategorized': uncategorized,
                 'untagged': base_q.filter(~exists().where(item_tags.c.item_id == ClipboardItem.id)).count(),
                 'trash': session.query(func.count(ClipboardItem.id)).filter(ClipboardItem.is_deleted == True).scalar(),
-                'today_modified': base_q.filter(ClipboardItem.modified_at >= today_start).count()
+                'today_modified': base_q.filter(ClipboardItem.modified_at >= today_start).count(),
+                'smart': dict(session.query(smart_partition_items.c.smart_id, func.count()).group_by(smart_partition_items.c.smart_id).all())
             }
         except Exception as e:
             log.error(f"获取分区项目计数失败: {e}", exc_info=True)
@@ -543,6 +1863,136 @@ class DBManager:
         finally:
             session.close()
 
+    # --- 智能分区 ---
+
+    def get_smart_partitions(self):
+        session = self.get_session()
+        try:
+            return session.query(SmartPartition).order_by(SmartPartition.sort_index, SmartPartition.id).all()
+        except Exception as e:
+            log.error(f"获取智能分区失败: {e}", exc_info=True)
+            return []
+        finally:
+            session.close()
+
+    def add_smart_partition(self, name, query, color=None):
+        session = self.get_session()
+        try:
+            max_sort = session.query(func.max(SmartPartition.sort_index)).scalar()
+            smart = SmartPartition(name=name, query=query.strip(), color=color, sort_index=(max_sort or 0) + 1)
+            session.add(smart)
+            session.commit()
+            session.refresh(smart)
+        except Exception as e:
+            log.error(f"添加智能分区失败: {e}", exc_info=True)
+            session.rollback()
+            return None
+        finally:
+            session.close()
+        self.sync_smart_partitions()
+        return smart
+
+    def update_smart_partition(self, smart_id, **kwargs):
+        """可修改 name / query / color / sort_index；修改搜索后整体重建"""
+        session = self.get_session()
+        try:
+            smart = session.get(SmartPartition, smart_id)
+            if not smart:
+                return False
+            for key in ('name', 'query', 'color', 'sort_index'):
+                if key in kwargs:
+                    setattr(smart, key, kwargs[key].strip() if key == 'query' else kwargs[key])
+            if 'query' in kwargs:
+                smart.is_stale = True
+            session.commit()
+        except Exception as e:
+            log.error(f"更新智能分区失败: {e}", exc_info=True)
+            session.rollback()
+            return False
+        finally:
+            session.close()
+        if 'query' in kwargs:
+            self.sync_smart_partitions()
+        return True
+
+    def delete_smart_partition(self, smart_id):
+        """只删除保存的搜索与成员表，不影响项目本身"""
+        session = self.get_session()
+        try:
+            session.execute(delete(smart_partition_items).where(smart_partition_items.c.smart_id == smart_id))
+            session.query(SmartPartition).filter(SmartPartition.id == smart_id).delete(synchronize_session=False)
+            if not session.query(SmartPartition.id).first():
+                self._smart.clear(session.connection())
+            session.commit()
+            return True
+        except Exception as e:
+            log.error(f"删除智能分区失败: {e}", exc_info=True)
+            session.rollback()
+            return False
+        finally:
+            session.close()
+
+    def _sync_smart_view(self, filters):
+        """查看智能分区前先处理变更队列 (其他视图不受影响，不做处理)"""
+        partition_filter = filters.get('partition_filter')
+        if partition_filter and partition_filter.get('type') == 'smart':
+            self.sync_smart_partitions()
+
+    def _materialize_smart(self, session, smart, parsed, item_ids=None):
+        """重新计算智能分区的成员；给出 item_ids 时只重算这些项目"""
+        members = smart_partition_items
+        condition = self._query_condition(session, parsed)
+        chunks = [None] if item_ids is None else [item_ids[i:i + 500] for i in range(0, len(item_ids), 500)]
+        for chunk in chunks:
+            stale = delete(members).where(members.c.smart_id == smart.id)
+            q = session.query(literal(smart.id), ClipboardItem.id).filter(ClipboardItem.is_deleted != True)
+            if condition is not None:
+                q = q.filter(condition)
+            if chunk is not None:
+                stale = stale.where(members.c.item_id.in_(chunk))
+                q = q.filter(ClipboardItem.id.in_(chunk))
+            session.execute(stale)
+            session.execute(insert(members).from_select(['smart_id', 'item_id'], q.statement))
+
+    def sync_smart_partitions(self):
+        """
+        处理变更队列: 队列中的项目按各智能分区的搜索重新求值，只涉及变化的项目
+        需要重建的智能分区，以及含相对时间条件且超过 SMART_REFRESH_INTERVAL 未重建的，整体重建
+        返回是否有改动；队列为空且没有需要重建的分区时只有两次小查询
+        """
+        with self._smart_lock:
+            session = self.get_session()
+            try:
+                smart_list = session.query(SmartPartition).all()
+                if not smart_list:
+                    return False
+                conn = session.connection()
+                changed = self._smart.pending(conn) if self._smart.has_pending(conn) else []
+                now = datetime.now()
+                rebuilt = []
+                for smart in smart_list:
+                    parsed = parse_query(smart.query or '')
+                    expired = parsed.is_time_relative and (smart.refreshed_at is None or now - smart.refreshed_at > SMART_REFRESH_INTERVAL)
+                    if smart.is_stale or expired:
+                        self._materialize_smart(session, smart, parsed)
+                        smart.is_stale, smart.refreshed_at = False, now
+                        rebuilt.append(smart.name)
+                    elif changed:
+                        self._materialize_smart(session, smart, parsed, changed)
+                if not changed and not rebuilt:
+                    return False
+                if changed:
+                    self._smart.clear(conn, changed)
+                session.commit()
+                log.debug(f"智能分区同步: {len(changed)} 个变化的项目，重建 {rebuilt}")
+                return True
+            except Exception as e:
+                log.error(f"同步智能分区失败: {e}", exc_info=True)
+                session.rollback()
+                return False
+            finally:
+                session.close()
+
     def move_items_to_partition(self, item_ids, partition_id):
         session = self.get_session()
         try:
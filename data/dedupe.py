@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+内容去重过滤器
+- 精确层: 最近 content_hash -> item_id 的 LRU，命中即可按主键更新访问计数
+- 概率层: 覆盖整个 content_hash 列的 Bloom 过滤器，判定"一定不存在"时跳过查库
+同一个数据库文件在进程内共享一个过滤器 (快速面板与主窗口各有一个 DBManager)
+"""
+import math
+import logging
+import threading
+from collections import OrderedDict
+
+log = logging.getLogger("Dedupe")
+
+
+class BloomFilter:
+    """基于 bytearray 的 Bloom 过滤器，输入为 SHA-256 十六进制串 (本身已均匀分布)"""
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = max(1024, int(capacity))
+        self.num_bits = int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / self.capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, hex_hash):
+        # 双重哈希: 取摘要的两段作为 h1/h2
+        h1 = int(hex_hash[:16], 16)
+        h2 = int(hex_hash[16:32], 16) | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, hex_hash):
+        for pos in self._positions(hex_hash):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, hex_hash):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(hex_hash))
+
+
+class DedupeFilter:
+    """LRU + Bloom 两级去重，后台线程加载完成前一律回退到数据库查询"""
+
+    def __init__(self, lru_size=2048):
+        self.lru_size = lru_size
+        self._lru = OrderedDict()
+        self._bloom = None
+        self._lock = threading.Lock()
+        self._loading = False
+        self.stats = {'lru_hits': 0, 'definitely_new': 0, 'lookups': 0}
+
+    @property
+    def ready(self):
+        return self._bloom is not None
+
+    def load_async(self, fetch_hashes):
+        """在后台线程中调用 fetch_hashes() 取得全部 hash 并构建 Bloom 过滤器"""
+        with self._lock:
+            if self._loading:
+                return
+            self._loading = True
+        threading.Thread(target=self._load, args=(fetch_hashes,), daemon=True).start()
+
+    def _load(self, fetch_hashes):
+        try:
+            hashes = [h for h in fetch_hashes() if h]
+            bloom = BloomFilter(capacity=len(hashes) * 2)
+            for h in hashes:
+                bloom.add(h)
+            with self._lock:
+                self._bloom = bloom
+            log.info(f"✅ 去重过滤器已加载 {len(hashes)} 个哈希 ({len(bloom.bits) // 1024} KB)")
+        except Exception as e:
+            log.error(f"去重过滤器加载失败: {e}", exc_info=True)
+        finally:
+            self._loading = False
+
+    def lookup(self, hex_hash):
+        """
+        Returns:
+            (item_id, might_exist): LRU 命中时返回 item_id；
+            might_exist 为 False 表示该 hash 一定不在数据库中
+        """
+        with self._lock:
+            item_id = self._lru.get(hex_hash)
+            if item_id is not None:
+                self._lru.move_to_end(hex_hash)
+                self.stats['lru_hits'] += 1
+                return item_id, True
+            if self._bloom is not None and hex_hash not in self._bloom:
+                self.stats['definitely_new'] += 1
+                return None, False
+            self.stats['lookups'] += 1
+            return None, True
+
+    def add(self, hex_hash, item_id, fetch_hashes=None):
+        """记录新插入 (或刚查到) 的 hash；Bloom 超出容量时后台重建"""
+        with self._lock:
+            self._lru[hex_hash] = item_id
+            self._lru.move_to_end(hex_hash)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+            needs_rebuild = False
+            if self._bloom is not None:
+                self._bloom.add(hex_hash)
+                needs_rebuild = self._bloom.count > self._bloom.capacity
+        if needs_rebuild and fetch_hashes:
+            self.load_async(fetch_hashes)
+
+    def discard(self, hex_hashes):
+        """删除后移出 LRU；Bloom 不支持删除，残留位只会导致一次多余的查库"""
+        with self._lock:
+            for h in hex_hashes:
+                self._lru.pop(h, None)
+
+
+_filters = {}
+_filters_lock = threading.Lock()
+
+
+def get_dedupe_filter(db_path):
+    """按数据库路径返回进程内共享的过滤器"""
+    with _filters_lock:
+        if db_path not in _filters:
+            _filters[db_path] = DedupeFilter()
+        return _filters[db_path]
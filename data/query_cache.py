@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+查询结果缓存
+- 键为归一化后的 (查询种类, 筛选条件, 排序, 分页)，值为列表行摘要 / 计数 / 统计
+- 按估算字节数限制总大小，超出时按最近最少使用淘汰
+- 每个条目记录写入时的数据版本，版本变化 (本进程提交或其他连接 / 进程写入) 后自然失效
+"""
+import sys
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+ROW_OVERHEAD = 512   # 每行 ORM 对象、标签列表等的固定开销估算
+
+
+def estimate_rows_size(rows):
+    """列表行的内存估算：文本列长度 + 固定开销 (二进制列延迟加载，不计入)"""
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += ROW_OVERHEAD + sum(len(getattr(row, attr, None) or '') for attr in ('content', 'note', 'preview', 'file_path', 'url'))
+    return size
+
+
+class QueryCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()   # key -> (版本, 值, 字节数)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, version, value, size=64):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (version, value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key):
+        self._bytes -= self._entries.pop(key)[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    @property
+    def size_bytes(self):
+        return self._bytes
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+全文搜索索引 (SQLite FTS5)
+- 无内容表 (content='')：只存倒排索引，不重复保存正文，压缩后的大文本依然能完整检索
+- 优先使用 trigram 分词 (任意子串、中文可用)，SQLite 不支持时退回 unicode61
+- 无内容表删除时必须提供原始值，调用方负责传入与写入时完全一致的 (正文, 备注)
+"""
+import logging
+from sqlalchemy import bindparam, text
+
+log = logging.getLogger("SearchIndex")
+
+FTS_TABLE = 'items_fts'
+TRIGRAM_MIN_LEN = 3
+
+
+class SearchIndex:
+    def __init__(self, engine):
+        self.engine = engine
+        self.tokenizer = None
+
+    def ensure(self):
+        """建表并返回是否为新建 (新建时需要回填)"""
+        with self.engine.begin() as conn:
+            row = conn.exec_driver_sql(
+                "SELECT sql FROM sqlite_master WHERE type='table' AND name=?", (FTS_TABLE,)
+            ).fetchone()
+            if row:
+                self.tokenizer = 'trigram' if 'trigram' in row[0] else 'unicode61'
+                return False
+            for tokenizer in ('trigram', 'unicode61'):
+                try:
+                    conn.exec_driver_sql(
+                        f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(body, note, content='', tokenize='{tokenizer}')"
+                    )
+                    self.tokenizer = tokenizer
+                    log.info(f"✅ 创建全文索引 ({tokenizer})")
+                    return True
+                except Exception as e:
+                    log.warning(f"FTS5 分词器 {tokenizer} 不可用: {e}")
+        return False
+
+    @property
+    def available(self):
+        return self.tokenizer is not None
+
+    def add(self, conn, item_id, body, note):
+        if not self.available:
+            return
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}(rowid, body, note) VALUES (:id, :body, :note)"),
+                     {'id': item_id, 'body': body or '', 'note': note or ''})
+
+    def remove(self, conn, item_id, body, note):
+        if not self.available:
+            return
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, body, note) VALUES ('delete', :id, :body, :note)"),
+                     {'id': item_id, 'body': body or '', 'note': note or ''})
+
+    def clear(self, conn):
+        if self.available:
+            conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')"))
+
+    def can_match(self, query):
+        """trigram 少于 3 个字符无法命中，调用方应改用 LIKE"""
+        return self.available and (self.tokenizer != 'trigram' or len(query) >= TRIGRAM_MIN_LEN)
+
+    @staticmethod
+    def _phrase(query):
+        return '"' + query.replace('"', '""') + '"'
+
+    def match_ids(self, conn, query):
+        """返回正文或备注包含 query 的项目 ID 集合 (整体作为短语匹配)"""
+        rows = conn.execute(text(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :q"), {'q': self._phrase(query)})
+        return {r[0] for r in rows}
+
+    def match_scores(self, conn, query):
+        """(项目 ID, bm25 得分) 列表；得分越小越相关 (FTS5 约定)"""
+        return conn.execute(text(f"SELECT rowid, bm25({FTS_TABLE}) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :q"),
+                            {'q': self._phrase(query)}).fetchall()
+
+    def match_clause(self, query, id_column='clipboard_items.id'):
+        """与 match_ids 相同的条件，作为子查询嵌入主查询，分页和计数都在数据库内完成"""
+        # unique: 同一查询中可能有多个搜索词，各自使用独立的参数名
+        return text(f"{id_column} IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :fts_phrase)").bindparams(
+            bindparam('fts_phrase', self._phrase(query), unique=True))
+
+    def count(self, conn):
+        return conn.execute(text(f"SELECT count(*) FROM {FTS_TABLE}")).scalar() if self.available else 0
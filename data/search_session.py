@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+增量搜索会话 (快速面板)
+- 记住上一次搜索的有序结果 ID；上一次的每个搜索词都包含在新搜索的某个词中时 (如 con -> conf -> config、
+  conf -> conf log)，结果必然是上一次结果的子集，只在这些候选中复查，不再扫描整张表
+- 分区 / 日期范围变化，或数据变更计数递增 (有新增、删除、编辑) 时退回完整查询
+- 查询在后台线程分批执行，每批结果通过回调交给界面，新的搜索会取消仍在运行的旧搜索
+- 排序模式 (ranked) 下按相关度 (模糊匹配 + BM25 + 最近使用) 排序，候选数组由 DBManager 缓存，一次返回全部结果
+"""
+import logging
+import threading
+from core.search_query import parse_query
+
+log = logging.getLogger("SearchSession")
+
+SEARCH_BATCH = 500
+
+
+class SearchSession:
+    def __init__(self, db_manager, batch_size=SEARCH_BATCH):
+        self.db = db_manager
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._run_id = 0
+        self._cancel = None
+        # 上一次完整结束的搜索: (搜索词, 范围条件, 数据版本, 有序 ID 列表)
+        self._last = None
+
+    @staticmethod
+    def _narrows(last, current):
+        """
+        current 的结果必然是 last 结果的子集:
+        两者都只有"且"连接的普通文本词 (字段、排除、正则、OR 加长后可能反而命中更多)，
+        且 last 的每个词都是 current 某个词的子串 (文本词按包含匹配，词变长只会更严格，多出的词是额外的"且")
+        """
+        if not (last.is_simple and current.is_simple):
+            return False
+        words = [term.value.lower() for term in current.terms()]
+        return all(any(term.value.lower() in word for word in words) for term in last.terms())
+
+    def _candidates(self, query, scope, generation):
+        """可以复用的上一次结果；不能复用时返回 None"""
+        if not self._last:
+            return None
+        last_query, last_scope, last_generation, ids = self._last
+        if last_scope == scope and last_generation == generation and self._narrows(parse_query(last_query), parse_query(query)):
+            return ids
+        return None
+
+    def start(self, query, filters, on_chunk, on_done=None, ranked=False):
+        """
+        开始一次搜索，取消上一次。返回本次搜索的编号
+        on_chunk(编号, ID 列表) 每查到一批调用一次 (在工作线程中)；on_done(编号) 在正常结束时调用
+        ranked 为 True 时按相关度排序，否则按列表排序分批返回
+        """
+        query = query.strip()
+        scope = self.db._filter_key(filters)
+        with self._lock:
+            if self._cancel:
+                self._cancel.set()
+            self._run_id += 1
+            run_id, cancel = self._run_id, threading.Event()
+            self._cancel = cancel
+        target = self._run_ranked if ranked else self._run
+        threading.Thread(target=target, args=(run_id, cancel, query, filters, scope, on_chunk, on_done),
+                         name="SearchSession", daemon=True).start()
+        return run_id
+
+    def cancel(self):
+        with self._lock:
+            if self._cancel:
+                self._cancel.set()
+
+    def _run(self, run_id, cancel, query, filters, scope, on_chunk, on_done):
+        generation = self.db.generation
+        within = self._candidates(query, scope, generation)
+        found = []
+        batches = self.db.iter_item_ids(batch_size=self.batch_size, within=within, search=query, **filters)
+        try:
+            for ids in batches:
+                if cancel.is_set():
+                    return
+                if ids:
+                    found.extend(ids)
+                    on_chunk(run_id, ids)
+        except Exception as e:
+            log.error(f"搜索 '{query}' 失败: {e}", exc_info=True)
+            return
+        finally:
+            batches.close()  # 被取消时立即释放会话
+        with self._lock:
+            if run_id == self._run_id:
+                self._last = (query, scope, generation, found)
+        log.debug(f"搜索 '{query}' 完成: {len(found)} 条 ({'复用上次结果' if within is not None else '完整查询'})")
+        if on_done:
+            on_done(run_id)
+
+    def _run_ranked(self, run_id, cancel, query, filters, scope, on_chunk, on_done):
+        try:
+            ids = self.db.search_ranked(query, **filters)
+        except Exception as e:
+            log.error(f"排序搜索 '{query}' 失败: {e}", exc_info=True)
+            return
+        if cancel.is_set():
+            return
+        if ids:
+            on_chunk(run_id, ids)
+        log.debug(f"排序搜索 '{query}' 完成: {len(ids)} 条")
+        if on_done:
+            on_done(run_id)
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+智能分区 (保存的搜索) 的变更队列
+- 智能分区的成员物化在 smart_partition_items 中，侧栏计数与列表直接读这张表，和普通分区一样快
+- SQLite 触发器把影响成员的写入记入队列表 smart_changes:
+    新增 / 修改项目、项目增删标签 -> 记录项目 ID (同步时只对这些项目重新求值)
+    删除项目 -> 直接删除其成员行
+    标签 / 分区新建、改名、移动、删除 -> 把所有智能分区标记为需要重建 (搜索词也会匹配标签名与分区名)
+- 触发器对任何连接生效 (另一个 DBManager 实例、批量 UPDATE)，没有智能分区时不记录
+"""
+import logging
+from sqlalchemy import text
+
+log = logging.getLogger("SmartPartitions")
+
+CHANGE_TABLE = 'smart_changes'
+# 搜索语法可能用到的列；只改访问次数 / 排序等其他列时 modified_at 也会随之更新，同样会入队
+WATCHED_COLUMNS = ('content', 'note', 'is_deleted', 'star_level', 'custom_color', 'type_key', 'item_type', 'partition_id',
+                   'is_pinned', 'is_favorite', 'is_locked', 'created_at', 'modified_at', 'content_blob', 'search_pinyin')
+_HAS_SMART = "EXISTS (SELECT 1 FROM smart_partitions)"
+_MARK_STALE = "UPDATE smart_partitions SET is_stale = 1;"
+
+TRIGGERS = {
+    'smart_item_insert': f"AFTER INSERT ON clipboard_items WHEN {_HAS_SMART} "
+                         f"BEGIN INSERT OR IGNORE INTO {CHANGE_TABLE}(item_id) VALUES (new.id); END",
+    'smart_item_update': f"AFTER UPDATE OF {', '.join(WATCHED_COLUMNS)} ON clipboard_items WHEN {_HAS_SMART} "
+                         f"BEGIN INSERT OR IGNORE INTO {CHANGE_TABLE}(item_id) VALUES (new.id); END",
+    'smart_item_delete': f"AFTER DELETE ON clipboard_items "
+                         f"BEGIN DELETE FROM smart_partition_items WHERE item_id = old.id; DELETE FROM {CHANGE_TABLE} WHERE item_id = old.id; END",
+    'smart_tag_link': f"AFTER INSERT ON item_tags WHEN {_HAS_SMART} "
+                      f"BEGIN INSERT OR IGNORE INTO {CHANGE_TABLE}(item_id) VALUES (new.item_id); END",
+    'smart_tag_unlink': f"AFTER DELETE ON item_tags WHEN {_HAS_SMART} "
+                        f"BEGIN INSERT OR IGNORE INTO {CHANGE_TABLE}(item_id) VALUES (old.item_id); END",
+    'smart_tag_rename': f"AFTER UPDATE OF name, search_pinyin ON tags BEGIN {_MARK_STALE} END",
+    'smart_partition_insert': f"AFTER INSERT ON partitions BEGIN {_MARK_STALE} END",
+    'smart_partition_update': f"AFTER UPDATE OF name, parent_id, search_pinyin ON partitions BEGIN {_MARK_STALE} END",
+    'smart_partition_delete': f"AFTER DELETE ON partitions BEGIN {_MARK_STALE} END",
+}
+
+
+class SmartChangeLog:
+    def __init__(self, engine):
+        self.engine = engine
+
+    def ensure(self):
+        """建队列表与触发器 (已存在时跳过)"""
+        try:
+            with self.engine.begin() as conn:
+                conn.exec_driver_sql(f"CREATE TABLE IF NOT EXISTS {CHANGE_TABLE} (item_id INTEGER PRIMARY KEY)")
+                for name, body in TRIGGERS.items():
+                    conn.exec_driver_sql(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+        except Exception as e:
+            log.error(f"创建智能分区触发器失败: {e}", exc_info=True)
+
+    def pending(self, conn):
+        """队列中的项目 ID"""
+        return [r[0] for r in conn.execute(text(f"SELECT item_id FROM {CHANGE_TABLE}"))]
+
+    def has_pending(self, conn):
+        return conn.execute(text(f"SELECT EXISTS (SELECT 1 FROM {CHANGE_TABLE})")).scalar()
+
+    def clear(self, conn, item_ids=None):
+        """移除已处理的项目 (为空时清空队列)；处理期间新入队的项目保留到下次"""
+        if item_ids is None:
+            conn.execute(text(f"DELETE FROM {CHANGE_TABLE}"))
+            return
+        for start in range(0, len(item_ids), 500):
+            chunk = item_ids[start:start + 500]
+            conn.execute(text(f"DELETE FROM {CHANGE_TABLE} WHERE item_id IN ({','.join(map(str, chunk))})"))
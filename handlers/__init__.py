@@ -4,15 +4,19 @@
 导出所有处理器类
 """
 from handlers.base_handler import BaseHandler
+from handlers.context import CaptureContext
 from handlers.text_handler import TextHandler
 from handlers.file_handler import FileHandler
+from handlers.rich_text_handler import RichTextHandler
 from handlers.image_handler import ImageHandler
 from handlers.url_handler import URLHandler
 
 __all__ = [
     'BaseHandler',
+    'CaptureContext',
     'TextHandler',
     'FileHandler',
+    'RichTextHandler',
     'ImageHandler',
     'URLHandler'
 ]
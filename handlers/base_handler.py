@@ -4,8 +4,8 @@
 定义所有处理器的抽象接口
 """
 from abc import ABC, abstractmethod
-from PyQt5.QtCore import QMimeData
 import logging
+from handlers.context import CaptureContext
 
 log = logging.getLogger("BaseHandler")
 
@@ -24,12 +24,12 @@ class BaseHandler(ABC):
         self.last_content = ""  # 用于去重
     
     @abstractmethod
-    def can_handle(self, mime_data: QMimeData) -> bool:
+    def can_handle(self, ctx: CaptureContext) -> bool:
         """
         判断是否能处理该剪贴板数据
         
         Args:
-            mime_data: Qt剪贴板数据对象
+            ctx: 预解析的捕获上下文 (ctx.mime_data 为原始 Qt 剪贴板数据)
             
         Returns:
             bool: True表示可以处理，False表示不能处理
@@ -37,12 +37,12 @@ class BaseHandler(ABC):
         pass
     
     @abstractmethod
-    def handle(self, mime_data: QMimeData, db_manager, partition_info: dict = None):
+    def handle(self, ctx: CaptureContext, db_manager, partition_info: dict = None):
         """
         处理剪贴板数据
         
         Args:
-            mime_data: Qt剪贴板数据对象
+            ctx: 预解析的捕获上下文
             db_manager: 数据库管理器实例
             partition_info: (可选) 分区信息 {'type': 'group'/'partition', 'id': ID}
             
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+捕获上下文
+一次剪贴板变化只解析一次：各 MIME 格式、文本和 URL 判定在首次访问时提取并缓存，
+所有处理器共享同一个上下文
+"""
+import re
+from functools import cached_property
+from urllib.parse import urlparse
+from PyQt5.QtCore import QMimeData
+from PyQt5.QtGui import QImage
+
+URL_PATTERN = re.compile(
+    r'https?://(?:www\.)?[-a-zA-Z0-9@:%._\+~#=]{1,256}\.[a-zA-Z0-9()]{1,6}\b'
+    r'(?:[-a-zA-Z0-9()@:%_\+.~#?&/=]*)'
+)
+
+
+class CaptureContext:
+    """预解析的剪贴板数据"""
+
+    def __init__(self, mime_data: QMimeData):
+        self.mime_data = mime_data
+
+    @cached_property
+    def formats(self):
+        return list(self.mime_data.formats())
+
+    @cached_property
+    def has_image(self):
+        return self.mime_data.hasImage()
+
+    @cached_property
+    def image(self):
+        """QImage；没有图片或无法解析时为 None"""
+        if not self.has_image:
+            return None
+        data = self.mime_data.imageData()
+        if not data or data.isNull():
+            return None
+        image = QImage(data)
+        return None if image.isNull() else image
+
+    @cached_property
+    def urls(self):
+        return list(self.mime_data.urls()) if self.mime_data.hasUrls() else []
+
+    @cached_property
+    def local_files(self):
+        return [u.toLocalFile() for u in self.urls if u.isLocalFile()]
+
+    @cached_property
+    def text(self):
+        """去除首尾空白后的纯文本"""
+        return self.mime_data.text().strip() if self.mime_data.hasText() else ""
+
+    @cached_property
+    def html(self):
+        """text/html 内容；没有时为空串"""
+        return self.mime_data.html() if self.mime_data.hasHtml() else ""
+
+    @cached_property
+    def is_url(self):
+        """整段文本是否以 URL 开头 (URL 处理器 / 文本处理器共用的判定)"""
+        return bool(self.text) and bool(URL_PATTERN.match(self.text))
+
+    @cached_property
+    def parsed_url(self):
+        return urlparse(self.text) if self.is_url else None
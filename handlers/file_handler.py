@@ -1,39 +1,34 @@
 # -*- coding: utf-8 -*-
 """
 文件处理器
-处理文件剪贴板数据，将单个或多个文件打包存入数据库
+处理文件剪贴板数据，默认只记录路径和 stat 指纹 (引用模式)，
+需要持久副本时再将单个或多个文件打包存入数据库 (快照模式)
 """
 import logging
 import os
-import io
-import zipfile
-from PyQt5.QtCore import QMimeData
 from handlers.base_handler import BaseHandler
+from handlers.context import CaptureContext
+from core.settings import load_setting
+from core.file_snapshot import (make_fingerprint, is_volatile_path, pack_files,
+                                STATE_REFERENCE, STATE_SNAPSHOT)
 
 log = logging.getLogger("FileHandler")
 
 
 class FileHandler(BaseHandler):
-    """文件处理器 (支持多文件打包)"""
+    """文件处理器 (支持引用模式与多文件打包快照)"""
     
     def __init__(self):
         super().__init__(priority=20)
     
-    def can_handle(self, mime_data: QMimeData) -> bool:
-        """判断剪贴板中是否有本地文件"""
-        if not mime_data.hasUrls():
-            return False
-        
-        # 检查并确认至少有一个URL是本地文件
-        for url in mime_data.urls():
-            if url.isLocalFile():
-                return True
-        return False
+    def can_handle(self, ctx: CaptureContext) -> bool:
+        """判断剪贴板中是否有本地文件 (至少有一个URL是本地文件)"""
+        return bool(ctx.local_files)
     
-    def handle(self, mime_data: QMimeData, db_manager, partition_info: dict = None):
-        """处理文件，将单个文件或多个文件的ZIP包存入数据库"""
+    def handle(self, ctx: CaptureContext, db_manager, partition_info: dict = None):
+        """处理文件：引用模式只记录路径和指纹，快照模式将单个文件或多个文件的ZIP包存入数据库"""
         try:
-            local_files = [u.toLocalFile() for u in mime_data.urls() if u.isLocalFile()]
+            local_files = ctx.local_files
             
             if not local_files:
                 return None, False
@@ -54,26 +49,19 @@ class FileHandler(BaseHandler):
                 log.debug("文件组合重复，跳过")
                 return None, False
             
-            # --- 处理文件数据 ---
-            file_blob = None
-            if len(local_files) == 1:
-                # 单个文件: 直接读取二进制内容
-                log.info(f"读取单个文件: {local_files[0]}")
-                with open(local_files[0], 'rb') as f:
-                    file_blob = f.read()
+            # --- 引用模式: 只记录路径 + 指纹，内容按需快照 ---
+            capture_mode = load_setting("file_capture_mode", STATE_REFERENCE)
+            if capture_mode == STATE_REFERENCE and not any(is_volatile_path(p) for p in local_files):
+                file_blob = None
+                file_state = STATE_REFERENCE
             else:
-                # 多个文件: 在内存中创建ZIP压缩包
-                log.info(f"打包 {len(local_files)} 个文件到内存ZIP...")
-                mem_zip = io.BytesIO()
-                with zipfile.ZipFile(mem_zip, mode='w', compression=zipfile.ZIP_DEFLATED) as zf:
-                    for file_path in local_files:
-                        zf.write(file_path, arcname=os.path.basename(file_path))
-                mem_zip.seek(0)
-                file_blob = mem_zip.read()
-            
-            if not file_blob:
-                log.warning("未能成功生成文件或压缩包的二进制数据")
-                return None, False
+                # 快照模式 (或源文件位于临时目录，随时可能消失)
+                log.info(f"快照 {len(local_files)} 个文件...")
+                file_blob = pack_files(local_files)
+                file_state = STATE_SNAPSHOT
+                if not file_blob:
+                    log.warning("未能成功生成文件或压缩包的二进制数据")
+                    return None, False
 
             # --- 存入数据库 ---
             partition_id = partition_info.get('id') if partition_info and partition_info.get('type') == 'partition' else None
@@ -83,12 +71,14 @@ class FileHandler(BaseHandler):
                 item_type='file',
                 is_file=True,
                 file_path=';'.join(local_files),  # 存储原始路径列表，用分号分隔
-                data_blob=file_blob,              # 存储实际的文件二进制数据或ZIP数据
+                data_blob=file_blob,              # 快照模式: 文件二进制数据或ZIP数据
+                file_fingerprint=make_fingerprint(local_files),
+                file_state=file_state,
                 partition_id=partition_id
             )
             
             if is_new:
-                log.info(f"✅ 成功捕获 {len(local_files)} 个文件到数据库")
+                log.info(f"✅ 成功捕获 {len(local_files)} 个文件到数据库 ({file_state})")
 
             return item, is_new
             
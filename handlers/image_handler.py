@@ -8,9 +8,13 @@ import os
 import sys
 import hashlib
 from datetime import datetime
-from PyQt5.QtCore import Qt, QMimeData, QBuffer, QByteArray, QIODevice
+from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QImage
 from handlers.base_handler import BaseHandler
+from handlers.context import CaptureContext
+from core.settings import load_setting
+from core.image_hash import dhash64, NEAR_IDENTICAL_DISTANCE
+from core.image_codec import ImagePolicy, encode_png, pixel_digest
 
 log = logging.getLogger("ImageHandler")
 
@@ -21,40 +25,35 @@ class ImageHandler(BaseHandler):
     def __init__(self):
         super().__init__(priority=10)
     
-    def can_handle(self, mime_data: QMimeData) -> bool:
+    def can_handle(self, ctx: CaptureContext) -> bool:
         """判断是否为图片数据"""
-        return mime_data.hasImage()
+        return ctx.has_image
     
-    def handle(self, mime_data: QMimeData, db_manager, partition_info: dict = None):
+    def handle(self, ctx: CaptureContext, db_manager, partition_info: dict = None):
         """处理图片数据"""
         try:
-            image = mime_data.imageData()
-            if not image or image.isNull():
-                log.warning("图片数据为空")
+            qimage = ctx.image
+            if qimage is None:
+                log.warning("图片数据为空或无法解析")
                 return None, False
-            
-            qimage = QImage(image)
-            if qimage.isNull():
-                log.warning("无法解析图片")
-                return None, False
-
-            # 将 QImage 转换为二进制数据 (PNG格式)
-            byte_array = QByteArray()
-            buffer = QBuffer(byte_array)
-            buffer.open(QIODevice.WriteOnly)
-            qimage.save(buffer, "PNG")
-            image_blob = byte_array.data()
 
-            # 计算哈希用于去重
-            img_hash = hashlib.md5(image_blob).hexdigest()
+            # 按像素计算哈希用于去重，重复图片不必编码
+            img_hash = pixel_digest(qimage, hashlib.md5())
             if self._is_duplicate(img_hash):
                 log.debug("图片重复，跳过")
                 return None, False
 
-            # 生成缩略图的二进制数据
-            thumbnail_blob = self._create_thumbnail_blob(qimage)
+            # 按存储策略编码 (PNG 级别 / WebP / 像素上限)
+            policy = ImagePolicy.from_settings()
+            image_blob, image_codec, original_blob = policy.encode(qimage)
+
+            # 生成缩略图，感知哈希直接在缩略图上计算
+            thumbnail = self._create_thumbnail(qimage)
+            thumbnail_blob = encode_png(thumbnail) if thumbnail is not None else None
+            phash = dhash64(thumbnail if thumbnail is not None else qimage)
 
             partition_id = partition_info.get('id') if partition_info and partition_info.get('type') == 'partition' else None
+            auto_collapse = str(load_setting("image_auto_collapse", False)).lower() in ('true', '1')
             
             item, is_new = db_manager.add_item(
                 text=f"[图片] {qimage.width()}x{qimage.height()}",
@@ -62,12 +61,17 @@ class ImageHandler(BaseHandler):
                 is_file=False,
                 data_blob=image_blob,
                 thumbnail_blob=thumbnail_blob,
-                partition_id=partition_id
+                image_codec=image_codec,
+                original_blob=original_blob,
+                partition_id=partition_id,
+                dedupe_key=img_hash,  # 同尺寸的不同图片文字描述相同，按像素数据去重
+                phash=phash,
+                collapse_distance=NEAR_IDENTICAL_DISTANCE if auto_collapse else None
             )
             
             if is_new:
                 size_kb = len(image_blob) / 1024
-                log.info(f"✅ 捕获图片: {qimage.width()}x{qimage.height()} ({size_kb:.1f}KB)")
+                log.info(f"✅ 捕获图片: {qimage.width()}x{qimage.height()} ({size_kb:.1f}KB, {image_codec})")
 
             return item, is_new
             
@@ -75,17 +79,11 @@ class ImageHandler(BaseHandler):
             log.error(f"图片处理失败: {e}", exc_info=True)
             return None, False
 
-    def _create_thumbnail_blob(self, qimage: QImage) -> bytes:
-        """创建缩略图并返回其二进制数据"""
+    def _create_thumbnail(self, qimage: QImage) -> QImage:
+        """创建缩略图 (QImage)"""
         try:
             thumb_size = 200
-            thumbnail = qimage.scaled(thumb_size, thumb_size, aspectRatioMode=Qt.KeepAspectRatio, transformMode=Qt.SmoothTransformation)
-            
-            byte_array = QByteArray()
-            buffer = QBuffer(byte_array)
-            buffer.open(QIODevice.WriteOnly)
-            thumbnail.save(buffer, "PNG")
-            return byte_array.data()
+            return qimage.scaled(thumb_size, thumb_size, aspectRatioMode=Qt.KeepAspectRatio, transformMode=Qt.SmoothTransformation)
         except Exception as e:
             log.error(f"创建缩略图失败: {e}")
             return None
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+处理器注册表
+处理器来源 (按顺序合并，同名类只保留一次):
+1. 配置项 clipboard_handlers: ["模块路径:类名", ...]，未配置时使用 DEFAULT_HANDLERS
+2. 已安装包声明的 entry points (组名 clipboardpro.handlers)
+"""
+import bisect
+import logging
+import importlib
+from importlib import metadata
+from core.settings import load_setting
+
+log = logging.getLogger("HandlerRegistry")
+
+ENTRY_POINT_GROUP = "clipboardpro.handlers"
+
+DEFAULT_HANDLERS = [
+    "handlers.image_handler:ImageHandler",   # 优先级 10 - 最高
+    "handlers.file_handler:FileHandler",     # 优先级 20
+    "handlers.rich_text_handler:RichTextHandler",  # 优先级 25
+    "handlers.url_handler:URLHandler",       # 优先级 30
+    "handlers.text_handler:TextHandler",     # 优先级 40 - 最低（兜底）
+]
+
+
+def _import_spec(spec):
+    module_name, _, class_name = spec.partition(':')
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def _entry_point_classes():
+    try:
+        eps = metadata.entry_points()
+        group = eps.select(group=ENTRY_POINT_GROUP) if hasattr(eps, 'select') else eps.get(ENTRY_POINT_GROUP, [])
+        return [(ep.name, ep.load) for ep in group]
+    except Exception as e:
+        log.warning(f"读取 entry points 失败: {e}")
+        return []
+
+
+def load_handlers():
+    """实例化所有处理器并按优先级排序 (数字越小优先级越高)"""
+    specs = load_setting("clipboard_handlers") or DEFAULT_HANDLERS
+    if isinstance(specs, str):
+        specs = [specs]
+
+    loaders = [(spec, lambda spec=spec: _import_spec(spec)) for spec in specs]
+    loaders += _entry_point_classes()
+
+    handlers, seen = [], set()
+    for name, loader in loaders:
+        try:
+            cls = loader()
+            if cls in seen:
+                continue
+            seen.add(cls)
+            handlers.append(cls())
+        except Exception as e:
+            log.error(f"加载处理器 {name} 失败: {e}", exc_info=True)
+
+    handlers.sort(key=lambda h: h.priority)
+    return handlers
+
+
+class LatencyHistogram:
+    """固定桶的耗时直方图 (毫秒)"""
+
+    BOUNDS_MS = [0.1, 0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000]
+
+    def __init__(self):
+        self.buckets = [0] * (len(self.BOUNDS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, seconds):
+        ms = seconds * 1000
+        self.buckets[bisect.bisect_left(self.BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def snapshot(self):
+        labels = [f"<={b}ms" for b in self.BOUNDS_MS] + [f">{self.BOUNDS_MS[-1]}ms"]
+        return {
+            'count': self.count,
+            'avg_ms': self.total_ms / self.count if self.count else 0.0,
+            'max_ms': self.max_ms,
+            'buckets': dict(zip(labels, self.buckets)),
+        }
+
+
+class HandlerMetrics:
+    """按 (处理器, 阶段) 记录耗时，阶段为 can_handle / handle"""
+
+    def __init__(self):
+        self._histograms = {}
+
+    def record(self, handler_name, phase, seconds):
+        key = (handler_name, phase)
+        if key not in self._histograms:
+            self._histograms[key] = LatencyHistogram()
+        self._histograms[key].record(seconds)
+
+    def snapshot(self):
+        result = {}
+        for (name, phase), hist in self._histograms.items():
+            result.setdefault(name, {})[phase] = hist.snapshot()
+        return result
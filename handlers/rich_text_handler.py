@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+富文本处理器
+处理带 text/html 的剪贴板数据 (浏览器、Office 等)，纯文本作为影子列用于显示与搜索
+"""
+import logging
+from handlers.base_handler import BaseHandler
+from handlers.context import CaptureContext
+from core.rich_text import sanitize_html
+
+log = logging.getLogger("RichTextHandler")
+
+
+class RichTextHandler(BaseHandler):
+    """富文本处理器"""
+
+    def __init__(self):
+        super().__init__(priority=25)  # 在文件之后、URL 之前
+
+    def can_handle(self, ctx: CaptureContext) -> bool:
+        """有 HTML 且有纯文本 (单独的 URL 仍交给URL处理器)"""
+        return bool(ctx.html) and bool(ctx.text) and not ctx.is_url
+
+    def handle(self, ctx: CaptureContext, db_manager, partition_info: dict = None):
+        """处理富文本"""
+        try:
+            text = ctx.text
+
+            # 去重检查
+            if self._is_duplicate(text):
+                log.debug("富文本重复，跳过")
+                return None, False
+
+            html = sanitize_html(ctx.html)
+            partition_id = partition_info.get('id') if partition_info and partition_info.get('type') == 'partition' else None
+
+            # 保存到数据库 (HTML 压缩存储，item_type 仍为 text)
+            item, is_new = db_manager.add_item(
+                text=text,
+                item_type='text',
+                is_file=False,
+                partition_id=partition_id,
+                html=html or None
+            )
+
+            if is_new:
+                log.info(f"✅ 捕获富文本: {text[:50]}... (HTML {len(html)} 字符)")
+
+            return item, is_new
+
+        except Exception as e:
+            log.error(f"富文本处理失败: {e}", exc_info=True)
+            return None, False
@@ -4,9 +4,8 @@
 处理纯文本剪贴板数据（排除URL）
 """
 import logging
-import re
-from PyQt5.QtCore import QMimeData
 from handlers.base_handler import BaseHandler
+from handlers.context import CaptureContext
 
 log = logging.getLogger("TextHandler")
 
@@ -16,30 +15,15 @@ class TextHandler(BaseHandler):
     
     def __init__(self):
         super().__init__(priority=40)  # 最低优先级，作为兜底
-        self.url_pattern = re.compile(
-            r'https?://(?:www\.)?[-a-zA-Z0-9@:%._\+~#=]{1,256}\.[a-zA-Z0-9()]{1,6}\b'
-            r'(?:[-a-zA-Z0-9()@:%_\+.~#?&/=]*)'
-        )
     
-    def can_handle(self, mime_data: QMimeData) -> bool:
-        """判断是否为纯文本（排除URL）"""
-        if not mime_data.hasText():
-            return False
-        
-        text = mime_data.text().strip()
-        if not text:
-            return False
-        
-        # 如果是URL，交给URL处理器
-        if self.url_pattern.match(text):
-            return False
-        
-        return True
+    def can_handle(self, ctx: CaptureContext) -> bool:
+        """判断是否为纯文本（URL 交给URL处理器）"""
+        return bool(ctx.text) and not ctx.is_url
     
-    def handle(self, mime_data: QMimeData, db_manager, partition_info: dict = None):
+    def handle(self, ctx: CaptureContext, db_manager, partition_info: dict = None):
         """处理纯文本"""
         try:
-            text = mime_data.text().strip()
+            text = ctx.text
             
             # 去重检查
             if self._is_duplicate(text):
@@ -4,10 +4,9 @@ URL处理器
 处理URL链接剪贴板数据（新功能）
 """
 import logging
-import re
-from urllib.parse import urlparse
-from PyQt5.QtCore import QMimeData
 from handlers.base_handler import BaseHandler
+from handlers.context import CaptureContext
+from core.url_utils import canonicalize_url
 
 log = logging.getLogger("URLHandler")
 
@@ -17,37 +16,25 @@ class URLHandler(BaseHandler):
     
     def __init__(self):
         super().__init__(priority=30)  # 中等优先级
-        # URL正则表达式
-        self.url_pattern = re.compile(
-            r'https?://(?:www\.)?[-a-zA-Z0-9@:%._\+~#=]{1,256}\.[a-zA-Z0-9()]{1,6}\b'
-            r'(?:[-a-zA-Z0-9()@:%_\+.~#?&/=]*)'
-        )
     
-    def can_handle(self, mime_data: QMimeData) -> bool:
-        """判断是否为URL"""
-        if not mime_data.hasText():
-            return False
-        
-        text = mime_data.text().strip()
-        if not text:
-            return False
-        
-        # 检查是否匹配URL格式
-        return bool(self.url_pattern.match(text))
+    def can_handle(self, ctx: CaptureContext) -> bool:
+        """判断是否为URL (匹配结果由上下文缓存，文本处理器共用)"""
+        return ctx.is_url
     
-    def handle(self, mime_data: QMimeData, db_manager, partition_info: dict = None):
+    def handle(self, ctx: CaptureContext, db_manager, partition_info: dict = None):
         """处理URL"""
         try:
-            url = mime_data.text().strip()
+            url = ctx.text
             
-            # 去重检查
-            if self._is_duplicate(url):
+            # 去重检查 (按规范化形式，追踪参数不同也视为同一链接)
+            canonical, domain = canonicalize_url(url)
+            if self._is_duplicate(canonical):
                 log.debug("URL重复，跳过")
                 return None, False
             
             # 解析URL
-            parsed = urlparse(url)
-            domain = parsed.netloc or "未知域名"
+            parsed = ctx.parsed_url
+            domain = domain or "未知域名"
             
             # 提取路径作为简短描述
             path = parsed.path.strip('/') or "首页"
@@ -6,17 +6,21 @@ from ctypes import wintypes
 import time
 import datetime
 import subprocess
-from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QListWidget, QLineEdit,
-                             QListWidgetItem, QHBoxLayout, QTreeWidget, QTreeWidgetItem,
+from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QListView, QLineEdit,
+                             QHBoxLayout, QTreeWidget, QTreeWidgetItem,
                              QPushButton, QStyle, QAction, QSplitter, QGraphicsDropShadowEffect, QLabel,
                              QAbstractItemView, QShortcut, QMenu)
-from PyQt5.QtCore import Qt, QTimer, QPoint, QRect, QSettings, QUrl, QMimeData
+from PyQt5.QtCore import Qt, QTimer, QPoint, QRect, QSettings, QUrl, QMimeData, pyqtSignal
 from PyQt5.QtGui import QImage, QColor, QCursor, QKeySequence
 
 # Import the new dialog
 from ui.dialog_new_idea import NewIdeaDialog
 from ui.dialog_preview import PreviewDialog
 from ui.color_selector import ColorSelectorDialog
+from ui.quick_list import QuickListModel, QuickItemDelegate
+from core.rich_text import make_text_mime
+from core.image_codec import decode_image
+from core.search_query import parse_query, SYNTAX_HELP
 
 # =================================================================================
 #   Win32 API 定义
@@ -67,14 +71,23 @@ def log(message):
 # =================================================================================
 try:
     from data.database import DBManager
+    from data.search_session import SearchSession
     from services.clipboard import ClipboardManager
 except ImportError:
     class DBManager:
         def get_items(self, **kwargs): return []
+        def get_items_by_ids(self, ids): return []
         def get_partitions_tree(self): return []
+        def get_smart_partitions(self): return []
+        def search_item_ids(self, query): return set()
+    class SearchSession:
+        def __init__(self, db_manager): pass
+        def start(self, query, filters, on_chunk, on_done=None, ranked=False): return 0
+        def cancel(self): pass
     class ClipboardManager:
         def __init__(self, db_manager): pass
         def process_clipboard(self, mime_data): pass
+        def schedule_capture(self, partition_info=None): pass
 
 # =================================================================================
 #   样式表
@@ -100,17 +113,17 @@ QLabel#TitleLabel {
     padding-left: 5px;
 }
 
-QListWidget, QTreeWidget {
+QListView, QTreeWidget {
     border: none;
     background-color: #2E2E2E;
     alternate-background-color: #383838;
     outline: none;
 }
-QListWidget::item { padding: 8px; border: none; }
-QListWidget::item:selected, QTreeWidget::item:selected {
+QListView::item { padding: 8px; border: none; }
+QListView::item:selected, QTreeWidget::item:selected {
     background-color: #4D79C4; color: #FFFFFF;
 }
-QListWidget::item:hover { background-color: #444444; }
+QListView::item:hover { background-color: #444444; }
 
 QMenu {
     background-color: #383838;
@@ -163,10 +176,15 @@ QPushButton#PinButton:checked { background-color: #0078D4; color: white; border:
 
 class MainWindow(QWidget):
     RESIZE_MARGIN = 18 
+    search_results = pyqtSignal(int, list)   # (搜索编号, 新查到的一批项目 ID)，由搜索线程发出
 
     def __init__(self, db_manager):
         super().__init__()
         self.db = db_manager
+        self.search = SearchSession(self.db)
+        self._search_run = 0
+        self._search_ids = []
+        self.search_results.connect(self._on_search_results)
         self.settings = QSettings("MyTools", "ClipboardPro")
         
         self.m_drag = False
@@ -192,7 +210,7 @@ class MainWindow(QWidget):
         self._setup_shortcuts()  # Bind shortcuts
         self._restore_window_state()
 
-        self.list_widget.installEventFilter(self)
+        self.list_view.installEventFilter(self)
         
         self.setMouseTracking(True)
         self.container.setMouseTracking(True)
@@ -206,7 +224,7 @@ class MainWindow(QWidget):
         self.search_timer.timeout.connect(self._update_list)
         
         self.search_box.textChanged.connect(self._on_search_text_changed)
-        self.list_widget.itemActivated.connect(self._on_item_activated)
+        self.list_view.activated.connect(self._on_item_activated)
         self.partition_tree.currentItemChanged.connect(self._on_partition_selection_changed)
         
         self.clear_action.triggered.connect(self.search_box.clear)
@@ -254,8 +272,8 @@ class MainWindow(QWidget):
                 self._update_list()
                 
                 # 可选：将新项目滚动到视野中并选中
-                if self.list_widget.count() > 0:
-                    self.list_widget.setCurrentRow(0)
+                if self.list_model.rowCount() > 0:
+                    self.list_view.setCurrentIndex(self.list_model.index(0))
             else:
                 log("🟡 对话框被接受，但内容为空，不执行任何操作。")
         else:
@@ -343,6 +361,7 @@ class MainWindow(QWidget):
         # --- Search Bar ---
         self.search_box = QLineEdit(self)
         self.search_box.setPlaceholderText("搜索剪贴板历史...")
+        self.search_box.setToolTip(SYNTAX_HELP)
         self.clear_action = QAction(self)
         self.clear_action.setIcon(self.style().standardIcon(QStyle.SP_DialogCloseButton))
         self.search_box.addAction(self.clear_action, QLineEdit.TrailingPosition)
@@ -357,14 +376,18 @@ class MainWindow(QWidget):
         self.splitter = QSplitter(Qt.Horizontal)
         self.splitter.setHandleWidth(4)
         
-        self.list_widget = QListWidget()
-        self.list_widget.setFocusPolicy(Qt.StrongFocus)
-        self.list_widget.setAlternatingRowColors(True)
-        self.list_widget.setSelectionMode(QAbstractItemView.ExtendedSelection)  # Enable multi-selection
-        self.list_widget.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        self.list_widget.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        self.list_widget.setContextMenuPolicy(Qt.CustomContextMenu)
-        self.list_widget.customContextMenuRequested.connect(self._show_list_context_menu)
+        self.list_view = QListView()
+        self.list_model = QuickListModel(self)
+        self.list_view.setModel(self.list_model)
+        self.list_view.setItemDelegate(QuickItemDelegate(self.list_view))
+        self.list_view.setUniformItemSizes(True)  # 行高固定，布局不必逐行测量
+        self.list_view.setFocusPolicy(Qt.StrongFocus)
+        self.list_view.setAlternatingRowColors(True)
+        self.list_view.setSelectionMode(QAbstractItemView.ExtendedSelection)  # Enable multi-selection
+        self.list_view.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.list_view.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.list_view.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.list_view.customContextMenuRequested.connect(self._show_list_context_menu)
 
         self.partition_tree = QTreeWidget()
         self.partition_tree.setHeaderHidden(True)
@@ -372,7 +395,7 @@ class MainWindow(QWidget):
         self.partition_tree.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
         self.partition_tree.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
         
-        self.splitter.addWidget(self.list_widget)
+        self.splitter.addWidget(self.list_view)
         self.splitter.addWidget(self.partition_tree)
         self.splitter.setStretchFactor(0, 1)
         self.splitter.setStretchFactor(1, 0)
@@ -525,7 +548,7 @@ class MainWindow(QWidget):
     def _on_search_text_changed(self): self.search_timer.start(300)
 
     def _update_list(self):
-        search_text = self.search_box.text()
+        search_text = self.search_box.text().strip()
         partition_filter = None
         date_modify_filter = None # 新增变量
         current_partition = self.partition_tree.currentItem()
@@ -537,72 +560,33 @@ class MainWindow(QWidget):
                     # partition_filter 保持为 None
                 elif partition_data['type'] != 'all':
                     partition_filter = partition_data
-        # 1. 从数据库获取未经过滤的数据
-        all_items = self.db.get_items(partition_filter=partition_filter, date_modify_filter=date_modify_filter, limit=None)
-        
-        # 2. 在内存中进行搜索过滤
-        if search_text:
-            search_text_lower = search_text.lower()
-            filtered_items = []
-            for item in all_items:
-                content_match = search_text_lower in getattr(item, 'content', '').lower()
-                note_match = search_text_lower in getattr(item, 'note', '').lower()
-                if content_match or note_match:
-                    filtered_items.append(item)
-            items = filtered_items
-        else:
-            items = all_items
-
-        self.list_widget.clear()
-        for item in items:
-            display_text = self._get_content_display(item)
-            list_item = QListWidgetItem(display_text)
-            if item.custom_color:
-                list_item.setIcon(self._create_color_icon(item.custom_color))
-            list_item.setData(Qt.UserRole, item)
-            if getattr(item, 'content', ''):
-                list_item.setToolTip(str(item.content)[:500])
-            self.list_widget.addItem(list_item)
-        if self.list_widget.count() > 0: self.list_widget.setCurrentRow(0)
-
-    def _get_content_display(self, item):
-        # 状态图标
-        state_flags = ("📌" if item.is_pinned else "") + \
-                      ("⭐" if item.is_favorite else "") + \
-                      ("🔒" if item.is_locked else "")
-        
-        # 类型图标
-        type_icon = self._get_type_icon(item)
-        
-        # 拼接显示文本
-        display_text = f"{type_icon} {state_flags}".strip()
-        
-        # 内容摘要
-        content_summary = ""
-        if getattr(item, 'item_type', '') == 'file' and getattr(item, 'file_path', ''):
-            content_summary = os.path.basename(item.file_path)
-        elif getattr(item, 'item_type', '') == 'url' and getattr(item, 'url_domain', None):
-            content_summary = f"[{item.url_domain}] {item.url_title or ''}"
-        elif getattr(item, 'item_type', '') == 'image':
-            content_summary = "[图片] " + (os.path.basename(item.image_path) if getattr(item, 'image_path', None) else f"{item.content.split(' ')[-1]}")
+        # 分区和日期条件在数据库内完成，模型只取第一批，滚动时再取后续
+        query = dict(partition_filter=partition_filter, date_modify_filter=date_modify_filter)
+        # 与主窗口搜索框相同的搜索语法；提示中显示解析结果
+        parsed = parse_query(search_text)
+        self.list_model.highlight = parsed if search_text else None
+        self.search_box.setToolTip(parsed.describe() if search_text else SYNTAX_HELP)
+        if not search_text:
+            self.search.cancel()
+            self._search_run = 0
+            self.list_model.reset(lambda start, count: self.db.get_items(limit=count, offset=start, **query))
         else:
-            content_summary = getattr(item, 'content', '').replace('\n', ' ').replace('\r', '').strip()[:150]
-            
-        return f"{display_text} {content_summary}"
-
-    def _get_type_icon(self, item):
-        if item.item_type == 'url': return "🔗"
-        if item.item_type == 'image': return "🖼️"
-        if item.item_type == 'file' and item.file_path:
-            if os.path.exists(item.file_path):
-                if os.path.isdir(item.file_path): return "📂"
-                ext = os.path.splitext(item.file_path)[1].lower()
-                if ext in ['.mp3', '.wav', '.flac', '.aac', '.ogg', '.m4a', '.wma']: return "🎵"
-                if ext in ['.png', '.jpg', '.jpeg', '.gif', '.bmp', '.ico', '.webp']: return "🖼️"
-                if ext in ['.mp4', '.mkv', '.avi', '.mov', '.wmv']: return "🎬"
-                return "📄"
-            return "📄"
-        return "📝"
+            # 搜索在后台线程进行 (默认按相关度排序；关闭后按列表排序分批返回，输入延长时只复查上次的结果)，模型按已收到的 ID 取行
+            ids = self._search_ids = []
+            self.list_model.reset(lambda start, count: self.db.get_items_by_ids(ids[start:start + count]))
+            ranked = self.settings.value("search_ranked", True, type=bool)
+            self._search_run = self.search.start(search_text, query, self.search_results.emit, ranked=ranked)
+        if self.list_model.rowCount() > 0:
+            self.list_view.setCurrentIndex(self.list_model.index(0))
+
+    def _on_search_results(self, run_id, ids):
+        if run_id != self._search_run:
+            return  # 已被新的搜索取代
+        was_empty = self.list_model.rowCount() == 0
+        self._search_ids.extend(ids)
+        self.list_model.resume()
+        if was_empty and self.list_model.rowCount() > 0:
+            self.list_view.setCurrentIndex(self.list_model.index(0))
 
     def _create_color_icon(self, color_str):
         from PyQt5.QtGui import QPixmap, QPainter, QIcon
@@ -633,6 +617,13 @@ class MainWindow(QWidget):
             item = QTreeWidgetItem(self.partition_tree, [f"{name} ({count})"])
             item.setData(0, Qt.UserRole, data)
             item.setIcon(0, self.style().standardIcon(icon))
+
+        # -- 智能分区 --
+        smart_counts = counts.get('smart', {})
+        for smart in self.db.get_smart_partitions():
+            item = QTreeWidgetItem(self.partition_tree, [f"{smart.name} ({smart_counts.get(smart.id, 0)})"])
+            item.setData(0, Qt.UserRole, {'type': 'smart', 'id': smart.id, 'query': smart.query})
+            item.setIcon(0, self.style().standardIcon(QStyle.SP_FileDialogContentsView))
         
         # -- 递归添加用户分区 --
         top_level_partitions = self.db.get_partitions_tree()
@@ -682,10 +673,10 @@ class MainWindow(QWidget):
             clipboard = QApplication.clipboard()
             
             # 1. 处理图片
-            if getattr(db_item, 'item_type', '') == 'image' and getattr(db_item, 'data_blob', None):
-                image = QImage()
-                image.loadFromData(db_item.data_blob)
-                clipboard.setImage(image)
+            # 图片数据是延迟加载列，列表中的项目已脱离会话，需按 ID 读取
+            image_blob, image_codec = self.db.get_image_data(db_item.id, original=True) if getattr(db_item, 'item_type', '') == 'image' else (None, None)
+            if image_blob:
+                clipboard.setImage(decode_image(image_blob, image_codec))
             
             # 2. 处理文件：构建 URI 列表
             elif getattr(db_item, 'item_type', '') == 'file' and getattr(db_item, 'file_path', ''):
@@ -694,9 +685,13 @@ class MainWindow(QWidget):
                 mime_data.setUrls(urls)
                 clipboard.setMimeData(mime_data)
                 
-            # 3. 处理普通文本/链接
+            # 3. 富文本：同时写回 HTML 和纯文本
+            elif getattr(db_item, 'has_html', False):
+                clipboard.setMimeData(make_text_mime(self._full_content(db_item), self.db.get_item_html(db_item.id)))
+
+            # 4. 处理普通文本/链接
             else:
-                clipboard.setText(db_item.content)
+                clipboard.setText(self._full_content(db_item))
             
             self._paste_ditto_style()
         except Exception as e: log(f"❌ 操作失败: {e}")
@@ -726,26 +721,21 @@ class MainWindow(QWidget):
     def on_clipboard_changed(self):
         if self._processing_clipboard:
             return
-        self._processing_clipboard = True
-        try:
-            mime = self.clipboard.mimeData()
-            # quick.py 默认不与特定分区关联，所以传入 None
-            self.cm.process_clipboard(mime, None)
-        finally:
-            self._processing_clipboard = False
+        # quick.py 默认不与特定分区关联，所以传入 None
+        self.cm.schedule_capture(None)
 
     def keyPressEvent(self, event):
         key = event.key()
         if key == Qt.Key_Escape: self.close()
         elif key in (Qt.Key_Up, Qt.Key_Down):
-            if not self.list_widget.hasFocus():
-                self.list_widget.setFocus()
-                QApplication.sendEvent(self.list_widget, event)
+            if not self.list_view.hasFocus():
+                self.list_view.setFocus()
+                QApplication.sendEvent(self.list_view, event)
         else: super().keyPressEvent(event)
 
     def _show_list_context_menu(self, pos):
         """Build and show the complete context menu."""
-        selected_items = self.list_widget.selectedItems()
+        selected_items = self.list_view.selectionModel().selectedIndexes()
         if not selected_items:
             return
 
@@ -780,7 +770,7 @@ class MainWindow(QWidget):
         menu.addSeparator()
         menu.addAction("🗑️ 删除 (Del)", self.smart_delete)
 
-        menu.exec_(self.list_widget.mapToGlobal(pos))
+        menu.exec_(self.list_view.mapToGlobal(pos))
 
     def _add_partitions_to_menu(self, partitions, parent_menu):
         """Recursively add partitions to the move menu."""
@@ -800,17 +790,26 @@ class MainWindow(QWidget):
         self._update_list()
         self._update_partition_tree()
 
+    def _full_content(self, item_data):
+        """压缩存储的大文本只在用到时解压"""
+        if getattr(item_data, 'is_compressed', False):
+            return self.db.get_full_content(item_data.id)
+        return getattr(item_data, 'content', "")
+
     def _copy_item_content(self, item_data):
         """Copy content of a single item to clipboard."""
         if not item_data: return
-        content_to_copy = getattr(item_data, 'content', "")
-        QApplication.clipboard().setText(content_to_copy)
+        content_to_copy = self._full_content(item_data)
+        if getattr(item_data, 'has_html', False):
+            QApplication.clipboard().setMimeData(make_text_mime(content_to_copy, self.db.get_item_html(item_data.id)))
+        else:
+            QApplication.clipboard().setText(content_to_copy)
 
 
     # --- Batch Operation Methods ---
     def _get_selected_ids_and_items(self):
         """Helper to get all selected item IDs and their data."""
-        selected_widgets = self.list_widget.selectedItems()
+        selected_widgets = self.list_view.selectionModel().selectedIndexes()
         if not selected_widgets:
             return [], []
         
@@ -851,14 +850,14 @@ class MainWindow(QWidget):
         QShortcut(QKeySequence("Ctrl+E"), self, self._do_batch_toggle_favorite)
         QShortcut(QKeySequence("Ctrl+S"), self, self._do_batch_toggle_lock)
         QShortcut(QKeySequence("Del"), self, self.smart_delete)
-        QShortcut(QKeySequence("Ctrl+A"), self, self.list_widget.selectAll)
+        QShortcut(QKeySequence("Ctrl+A"), self, self.list_view.selectAll)
         QShortcut(QKeySequence(Qt.Key_Space), self, self.toggle_preview)
 
         for i in range(6):
             QShortcut(QKeySequence(f"Ctrl+{i}"), self).activated.connect(lambda l=i: self.batch_set_star(l))
 
     def eventFilter(self, source, event):
-        if source == self.list_widget and event.type() == event.KeyPress:
+        if source == self.list_view and event.type() == event.KeyPress:
             if event.key() == Qt.Key_Space:
                 self.toggle_preview()
                 return True
@@ -866,18 +865,16 @@ class MainWindow(QWidget):
 
     def _add_debug_test_item(self):
         """仅在数据库为空时，用于填充一些示例数据"""
-        for i in range(20):
-            item = QListWidgetItem(f"测试数据 {i+1}")
-            mock_data = type('obj', (object,), {'item_type': 'text', 'content': f'Content {i}'})
-            item.setData(Qt.UserRole, mock_data)
-            self.list_widget.addItem(item)
+        mock_items = [type('obj', (object,), {'id': -(i + 1), 'item_type': 'text', 'content': f'Content {i}', 'preview': f'测试数据 {i+1}'})
+                      for i in range(20)]
+        self.list_model.reset(lambda start, count: mock_items[start:start + count])
 
     def toggle_preview(self):
         if self.preview_dlg and self.preview_dlg.isVisible():
             self.preview_dlg.close()
             return
 
-        selected_items = self.list_widget.selectedItems()
+        selected_items = self.list_view.selectionModel().selectedIndexes()
         if not selected_items:
             return
             
@@ -887,7 +884,10 @@ class MainWindow(QWidget):
                 if not self.preview_dlg:
                     self.preview_dlg = PreviewDialog(self)
                 
-                self.preview_dlg.load_data(item.content, item.item_type, item.file_path, item.image_path, item.data_blob)
+                html = self.db.get_item_html(item.id) if getattr(item, 'has_html', False) else None
+                content = self.db.get_full_content(item.id) if getattr(item, 'is_compressed', False) else item.content
+                image_blob = self.db.get_image_blob(item.id) if item.item_type == 'image' else None
+                self.preview_dlg.load_data(content, item.item_type, item.file_path, item.image_path, image_blob, html)
                 self.preview_dlg.show()
                 self.preview_dlg.raise_()
                 self.preview_dlg.activateWindow()
@@ -2,13 +2,86 @@
 """
 剪贴板管理器
 使用策略模式处理不同类型的剪贴板数据
+dataChanged 事件先经过合并 (settle 窗口)、跨处理器指纹去重与令牌桶限流，再交给处理器链
+剪贴板内容只解析一次 (CaptureContext)，指纹计算与各处理器共享同一份解析结果
 """
+import time
+import hashlib
 import logging
-from PyQt5.QtCore import QObject, pyqtSignal, QMimeData
+from collections import OrderedDict
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal, QMimeData
+from PyQt5.QtWidgets import QApplication
+from handlers.context import CaptureContext
+from handlers.registry import load_handlers, HandlerMetrics
 
 log = logging.getLogger("ClipboardSvc")
 
 
+class TokenBucket:
+    """令牌桶限流器: rate 个/秒 补充，最多积攒 capacity 个"""
+
+    def __init__(self, rate=2.0, capacity=10):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.last = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+    def try_acquire(self):
+        self._refill()
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+    def wait_ms(self):
+        """距离下一个令牌可用的毫秒数"""
+        self._refill()
+        return max(0, int((1.0 - self.tokens) / self.rate * 1000))
+
+
+class RecentFingerprints:
+    """最近捕获内容的指纹 LRU，在 ttl 秒内重复出现的内容视为同一次复制"""
+
+    def __init__(self, capacity=64, ttl=2.0):
+        self.capacity = capacity
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+    def seen(self, fingerprint):
+        """返回指纹是否在 ttl 内出现过，并刷新其时间戳"""
+        now = time.monotonic()
+        last = self._entries.pop(fingerprint, None)
+        self._entries[fingerprint] = now
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+        return last is not None and now - last < self.ttl
+
+    def forget(self, fingerprint):
+        self._entries.pop(fingerprint, None)
+
+
+def mime_fingerprint(ctx: CaptureContext) -> str:
+    """为剪贴板内容生成廉价指纹 (不做 PNG 编码，不读文件)"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update('|'.join(ctx.formats).encode('utf-8'))
+    if ctx.has_image:
+        image = ctx.image
+        if image is not None:
+            size = image.sizeInBytes() if hasattr(image, 'sizeInBytes') else image.byteCount()
+            h.update(f"{image.width()}x{image.height()}".encode())
+            h.update(image.constBits().asstring(size))
+    elif ctx.urls:
+        h.update('\n'.join(u.toString() for u in ctx.urls).encode('utf-8'))
+    elif ctx.text:
+        h.update(ctx.text.encode('utf-8'))
+    return h.hexdigest()
+
+
 class ClipboardManager(QObject):
     """剪贴板管理器 - 使用策略模式"""
     
@@ -18,23 +91,28 @@ class ClipboardManager(QObject):
         super().__init__()
         self.db = db_manager
         self.handlers = []
+        self.handler_metrics = HandlerMetrics()
         self._register_handlers()
+
+        # --- dataChanged 风暴合并 ---
+        self.settle_ms = 80
+        self._pending_partition_info = None
+        self._settle_timer = QTimer(self)
+        self._settle_timer.setSingleShot(True)
+        self._settle_timer.timeout.connect(self._flush_pending)
+        self._recent = RecentFingerprints()
+        self._bucket = TokenBucket()
+        self.metrics = {'events': 0, 'coalesced': 0, 'duplicates': 0, 'rate_limited': 0, 'processed': 0}
+
+        # 引用模式文件的后台指纹检查
+        from services.file_snapshot import FileSnapshotChecker
+        self.snapshot_checker = FileSnapshotChecker(db_manager, self)
     
     def _register_handlers(self):
         """注册所有处理器，按优先级排序"""
         try:
-            from handlers import ImageHandler, FileHandler, URLHandler, TextHandler
-            
-            # 创建处理器实例
-            self.handlers = [
-                ImageHandler(),   # 优先级 10 - 最高
-                FileHandler(),    # 优先级 20
-                URLHandler(),     # 优先级 30
-                TextHandler(),    # 优先级 40 - 最低（兜底）
-            ]
-            
-            # 按优先级排序（数字越小优先级越高）
-            self.handlers.sort(key=lambda h: h.priority)
+            # 内置处理器 + 配置项 clipboard_handlers + entry points
+            self.handlers = load_handlers()
             
             log.info(f"✅ 注册了 {len(self.handlers)} 个处理器")
             for handler in self.handlers:
@@ -44,6 +122,50 @@ class ClipboardManager(QObject):
             log.error(f"处理器注册失败: {e}", exc_info=True)
             self.handlers = []
     
+    def schedule_capture(self, partition_info: dict = None):
+        """
+        dataChanged 的入口：在 settle 窗口内合并多次触发，窗口结束后只处理最终内容
+        
+        Args:
+            partition_info: (可选) 当前选中的分区信息
+        """
+        self.metrics['events'] += 1
+        if self._settle_timer.isActive():
+            self.metrics['coalesced'] += 1
+        self._pending_partition_info = partition_info
+        self._settle_timer.start(self.settle_ms)
+
+    def _flush_pending(self):
+        mime_data = QApplication.clipboard().mimeData()
+        if mime_data is None:
+            return
+
+        ctx = CaptureContext(mime_data)
+        fingerprint = mime_fingerprint(ctx)
+        if self._recent.seen(fingerprint):
+            self.metrics['duplicates'] += 1
+            log.debug("近期已捕获相同内容，跳过")
+            return
+
+        if not self._bucket.try_acquire():
+            # 限流：忘记本次指纹，等令牌补充后只处理届时的最新内容
+            self.metrics['rate_limited'] += 1
+            self._recent.forget(fingerprint)
+            self._settle_timer.start(max(self.settle_ms, self._bucket.wait_ms()))
+            log.debug("剪贴板捕获过于频繁，延迟处理")
+            return
+
+        self.metrics['processed'] += 1
+        self._process_context(ctx, self._pending_partition_info)
+
+    def get_metrics(self):
+        """返回合并/去重/限流计数的快照"""
+        return dict(self.metrics)
+
+    def get_handler_metrics(self):
+        """返回各处理器 can_handle / handle 的耗时直方图"""
+        return self.handler_metrics.snapshot()
+
     def process_clipboard(self, mime_data: QMimeData, partition_info: dict = None):
         """
         使用责任链模式处理剪贴板数据
@@ -55,12 +177,21 @@ class ClipboardManager(QObject):
         Returns:
             bool: True表示成功处理，False表示未处理
         """
+        return self._process_context(CaptureContext(mime_data), partition_info)
+
+    def _process_context(self, ctx: CaptureContext, partition_info: dict = None):
         try:
             # 遍历所有处理器
             for handler in self.handlers:
-                if handler.can_handle(mime_data):
-                    log.debug(f"使用 {handler.__class__.__name__} 处理")
-                    item, is_new = handler.handle(mime_data, self.db, partition_info)
+                name = handler.__class__.__name__
+                start = time.perf_counter()
+                can_handle = handler.can_handle(ctx)
+                self.handler_metrics.record(name, 'can_handle', time.perf_counter() - start)
+                if can_handle:
+                    log.debug(f"使用 {name} 处理")
+                    start = time.perf_counter()
+                    item, is_new = handler.handle(ctx, self.db, partition_info)
+                    self.handler_metrics.record(name, 'handle', time.perf_counter() - start)
                     
                     if item and is_new:
                         # 成功创建了新项目
@@ -92,8 +223,7 @@ class ClipboardManager(QObject):
                         return False
             
             # 没有处理器能处理该数据
-            formats = mime_data.formats()
-            log.debug(f"没有合适的处理器。可用格式: {list(formats)}")
+            log.debug(f"没有合适的处理器。可用格式: {ctx.formats}")
             return False
             
         except Exception as e:
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+文件引用后台检查器
+定期比对引用模式文件项目的 stat 指纹，源文件被修改、移动或删除时标记为 stale
+"""
+import logging
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from core.file_snapshot import changed_paths
+
+log = logging.getLogger("FileSnapshot")
+
+
+class FileSnapshotChecker(QObject):
+    """按批次轮询引用文件，避免一次性 stat 全部历史"""
+
+    items_changed = pyqtSignal(list)
+
+    def __init__(self, db_manager, parent=None, interval_ms=30000, batch_size=50):
+        super().__init__(parent)
+        self.db = db_manager
+        self.batch_size = batch_size
+        self._queue = []
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.check_batch)
+        self.timer.start(interval_ms)
+
+    def check_batch(self):
+        """检查一批引用文件，队列耗尽后重新从数据库加载"""
+        if not self._queue:
+            self._queue = list(self.db.get_reference_file_items())
+            if not self._queue:
+                return
+
+        batch, self._queue = self._queue[:self.batch_size], self._queue[self.batch_size:]
+        stale_ids = []
+        for item_id, fingerprint in batch:
+            changed = changed_paths(fingerprint)
+            if changed:
+                log.warning(f"⚠️ 引用文件已变化 (项目 {item_id}): {changed}")
+                self.db.mark_file_item_stale(item_id)
+                stale_ids.append(item_id)
+
+        if stale_ids:
+            self.items_changed.emit(stale_ids)
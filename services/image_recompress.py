@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+图片后台重压缩
+把编码标签与当前存储策略不同的图片 (旧版 PNG、捕获时快速编码的超大图片、切换编码后的旧数据)
+逐张解码并按策略重新编码。在普通线程中运行 (只使用 QImage)，按 ID 分批，随时可以中断，下次启动继续
+只换编码、不缩小尺寸：max_pixels 只作用于新捕获的图片，旧图片的像素、缩略图与感知哈希都保持不变
+"""
+import logging
+import threading
+import time
+from core.image_codec import ImagePolicy, decode_image, codec_format
+
+log = logging.getLogger("ImageRecompress")
+
+_running = set()
+_running_lock = threading.Lock()
+
+
+def recompress_images(db, policy=None, batch_size=20, stop_event=None, pause=0.05):
+    """返回 (处理数量, 节省字节数)"""
+    policy = policy or ImagePolicy.from_settings()
+    target = policy.tag
+    total, saved, last_id = 0, 0, 0
+    while not (stop_event and stop_event.is_set()):
+        rows = db.get_images_to_recompress(target, last_id, batch_size)
+        if not rows:
+            break
+        for item_id, blob, codec in rows:
+            last_id = item_id
+            if stop_event and stop_event.is_set():
+                break
+            try:
+                image = decode_image(blob, codec)
+                if image.isNull():
+                    log.warning(f"图片 {item_id} 无法解码，跳过重压缩")
+                    continue
+                new_blob, new_codec, _ = policy.encode(image, fast=False, downscale=False)
+                if len(new_blob) >= len(blob) and codec_format(new_codec) == codec_format(codec):
+                    # 同一格式下没有变小：保留原数据，只更新标签，避免每次启动重复处理
+                    new_blob = blob
+                if db.replace_image_blob(item_id, new_blob, new_codec, expected_codec=codec):
+                    total += 1
+                    saved += len(blob) - len(new_blob)
+            except Exception as e:
+                log.error(f"重压缩图片 {item_id} 失败: {e}", exc_info=True)
+            time.sleep(pause)  # 让出 CPU 和数据库写锁，不影响前台捕获
+    if total:
+        log.info(f"✅ 已重压缩 {total} 张图片 ({target})，节省 {saved / 1024:.1f}KB")
+    return total, saved
+
+
+def start_image_recompression(db, policy=None):
+    """在后台线程启动重压缩；同一数据库同时只运行一个任务"""
+    policy = policy or ImagePolicy.from_settings()
+    key = str(db.engine.url)
+    with _running_lock:
+        if key in _running:
+            return None
+        _running.add(key)
+
+    def run():
+        try:
+            recompress_images(db, policy)
+        finally:
+            with _running_lock:
+                _running.discard(key)
+
+    thread = threading.Thread(target=run, name="ImageRecompress", daemon=True)
+    thread.start()
+    return thread
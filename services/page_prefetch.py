@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+列表预取
+- 当前页显示后，在后台线程按与 load_data 完全相同的参数查询相邻页 (计数 + 第一批行 + 筛选统计)，
+  结果进入 DBManager 的查询缓存，翻页时直接命中
+- 空闲时预热常用视图 (全部 / 今日 / 各顶层分区)
+- 相邻页中的图片行通过 rows_ready 交回界面线程，由缩略图服务提前生成列表缩略图；
+  缩略图写入不递增数据变更计数，预取的页因此保持有效
+"""
+import logging
+import threading
+from collections import deque
+from PyQt5.QtCore import QObject, pyqtSignal
+from ui.table_model import FETCH_BATCH
+
+log = logging.getLogger("PagePrefetch")
+
+# 近似计数上限：结果超过该数量时只显示 "N+"，翻页不必每次扫描整个分区 (跳到末页时再精确计数)
+COUNT_CAP = 5000
+
+
+def count_cap(page, page_size):
+    """只数到能判断"是否还有下一页"为止"""
+    return COUNT_CAP if page_size <= 0 else max(COUNT_CAP, page * page_size + 1)
+
+
+def page_window(total, page, page_size):
+    """(偏移, 本页行数)；page_size 为 -1 表示不分页"""
+    if page_size == -1:
+        return 0, total
+    offset = (page - 1) * page_size
+    return offset, max(0, min(page_size, total - offset))
+
+
+def first_batch(row_count, exact=True):
+    """模型 reset 后第一次 fetchMore 的行数 (与 LazyRowsMixin 一致)"""
+    return FETCH_BATCH if not exact else min(FETCH_BATCH, row_count)
+
+
+def query_page(db, filters, facet_filters, sort_mode, page, page_size):
+    """按 load_data 的顺序执行一个视图的查询，返回第一批行 (全部命中缓存时只是几次字典查找)"""
+    cap = count_cap(page, page_size)
+    total = db.get_count(cap=cap, **filters)
+    offset, row_count = page_window(total, page, page_size)
+    exact = total < cap or page_size != -1
+    rows = []
+    if row_count:
+        rows = db.get_items(sort_mode=sort_mode, limit=first_batch(row_count, exact), offset=offset, **filters)
+    db.get_facets(**facet_filters)
+    return rows
+
+
+class PagePrefetcher(QObject):
+    rows_ready = pyqtSignal(list)   # 需要预生成缩略图的行
+
+    def __init__(self, db_manager, parent=None):
+        super().__init__(parent)
+        self.db = db_manager
+        self._queue = deque()
+        self._keys = set()
+        self._cond = threading.Condition()
+        threading.Thread(target=self._run, name="PagePrefetch", daemon=True).start()
+
+    def submit(self, key, filters, facet_filters, sort_mode, page, page_size, thumbnails=False):
+        """加入预取队列；相同 key 已在队列中时忽略"""
+        with self._cond:
+            if key in self._keys:
+                return
+            self._keys.add(key)
+            self._queue.append((key, filters, facet_filters, sort_mode, page, page_size, thumbnails))
+            self._cond.notify()
+
+    def cancel(self):
+        """视图切换后丢弃尚未执行的预取"""
+        with self._cond:
+            self._queue.clear()
+            self._keys.clear()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                key, filters, facet_filters, sort_mode, page, page_size, thumbnails = self._queue.popleft()
+                self._keys.discard(key)
+            try:
+                rows = query_page(self.db, filters, facet_filters, sort_mode, page, page_size)
+                if thumbnails and rows:
+                    self.rows_ready.emit(rows)
+            except Exception as e:
+                log.error(f"预取 {key} 失败: {e}", exc_info=True)
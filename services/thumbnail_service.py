@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+缩略图服务
+- 多尺寸 (列表图标 / 详情面板 / 预览窗口)，首次请求时在线程池中解码、缩放并写回数据库
+- 解码后的 QImage 放入按字节数限制的 LRU，再次选中同一图片时直接命中
+- 列表尺寸优先从捕获时生成的 200px 缩略图缩放，不解码原图
+"""
+import logging
+from collections import OrderedDict
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, Qt, QBuffer, QByteArray, QIODevice, pyqtSignal
+from PyQt5.QtGui import QImage
+from core.image_codec import decode_image
+
+log = logging.getLogger("ThumbnailService")
+
+# 尺寸键 -> 最长边像素
+SIZES = {
+    'list': 48,
+    'detail': 480,
+    'preview': 1600,
+}
+CAPTURE_THUMB_SIZE = 200  # ImageHandler 捕获时生成的缩略图尺寸
+
+
+def _image_bytes(image):
+    return image.sizeInBytes() if hasattr(image, 'sizeInBytes') else image.byteCount()
+
+
+class _JobSignals(QObject):
+    done = pyqtSignal(int, str, QImage)
+
+
+class _ThumbnailJob(QRunnable):
+    """在工作线程中生成一个尺寸的缩略图 (QImage 可以在非 GUI 线程使用，QPixmap 不行)"""
+
+    def __init__(self, db, item_id, size_key, signals):
+        super().__init__()
+        self.db = db
+        self.item_id = item_id
+        self.size_key = size_key
+        self.signals = signals
+
+    def run(self):
+        image = QImage()
+        try:
+            stored = self.db.get_thumbnail(self.item_id, self.size_key)
+            if stored and image.loadFromData(stored):
+                self.signals.done.emit(self.item_id, self.size_key, image)
+                return
+
+            max_edge = SIZES[self.size_key]
+            source, codec = None, None
+            if max_edge <= CAPTURE_THUMB_SIZE:
+                source, codec = self.db.get_image_data(self.item_id, thumbnail=True)
+            if not source:
+                # 大尺寸优先从保留的原图生成
+                source, codec = self.db.get_image_data(self.item_id, original=True)
+            image = decode_image(source, codec)
+            if image.isNull():
+                self.signals.done.emit(self.item_id, self.size_key, QImage())
+                return
+
+            if image.width() > max_edge or image.height() > max_edge:
+                image = image.scaled(max_edge, max_edge, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+            byte_array = QByteArray()
+            buffer = QBuffer(byte_array)
+            buffer.open(QIODevice.WriteOnly)
+            image.save(buffer, "PNG")
+            self.db.save_thumbnail(self.item_id, self.size_key, byte_array.data(), image.width(), image.height())
+            self.signals.done.emit(self.item_id, self.size_key, image)
+        except Exception as e:
+            log.error(f"生成缩略图失败 (项目 {self.item_id}, {self.size_key}): {e}", exc_info=True)
+            self.signals.done.emit(self.item_id, self.size_key, QImage())
+
+
+class ThumbnailService(QObject):
+    """异步缩略图 + 解码缓存"""
+
+    thumbnail_ready = pyqtSignal(int, str, QImage)
+
+    def __init__(self, db_manager, parent=None, cache_bytes=64 * 1024 * 1024, max_threads=2):
+        super().__init__(parent)
+        self.db = db_manager
+        self.cache_bytes = cache_bytes
+        self._cache = OrderedDict()
+        self._cached_bytes = 0
+        self._pending = set()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        self._signals = _JobSignals()
+        self._signals.done.connect(self._on_done, Qt.QueuedConnection)
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def get_cached(self, item_id, size_key):
+        """缓存命中时返回 QImage，否则返回 None"""
+        key = (item_id, size_key)
+        image = self._cache.get(key)
+        if image is not None:
+            self._cache.move_to_end(key)
+            self.stats['hits'] += 1
+        return image
+
+    def request(self, item_id, size_key):
+        """
+        获取缩略图：命中缓存时直接返回 QImage；
+        否则返回 None，生成完成后发出 thumbnail_ready(item_id, size_key, image)
+        """
+        image = self.get_cached(item_id, size_key)
+        if image is not None:
+            return image
+        key = (item_id, size_key)
+        if key not in self._pending:
+            self.stats['misses'] += 1
+            self._pending.add(key)
+            self.pool.start(_ThumbnailJob(self.db, item_id, size_key, self._signals))
+        return None
+
+    def invalidate(self, item_id):
+        for key in [k for k in self._cache if k[0] == item_id]:
+            self._cached_bytes -= _image_bytes(self._cache.pop(key))
+
+    def _on_done(self, item_id, size_key, image):
+        key = (item_id, size_key)
+        self._pending.discard(key)
+        if image.isNull():
+            return
+        old = self._cache.pop(key, None)
+        if old is not None:
+            self._cached_bytes -= _image_bytes(old)
+        self._cache[key] = image
+        self._cached_bytes += _image_bytes(image)
+        while self._cached_bytes > self.cache_bytes and len(self._cache) > 1:
+            _, evicted = self._cache.popitem(last=False)
+            self._cached_bytes -= _image_bytes(evicted)
+        self.thumbnail_ready.emit(item_id, size_key, image)
@@ -113,6 +113,9 @@ CustomTitleBar {
     border: 1px solid #007fd4;
     background-color: #252526;
 }
+#ToolbarSearchBar[queryError="true"] {
+    border: 1px solid #f48771;
+}
 
 /* 显示条数按钮 - 纯文字模式，无边框背景 */
 #DisplayCountButton {
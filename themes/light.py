@@ -61,6 +61,9 @@ CustomTitleBar {
     background-color: #ffffff;
     border: 1px solid #0078d4;
 }
+#ToolbarSearchBar[queryError="true"] {
+    border: 1px solid #e81123;
+}
 
 #ToolBarButton {
     background: transparent;
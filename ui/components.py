@@ -5,6 +5,7 @@ from PyQt5.QtWidgets import (QTableWidget, QAbstractItemView, QLineEdit, QWidget
 from PyQt5.QtCore import Qt, pyqtSignal, QSettings, QSize, QEvent, QRect, QStringListModel
 from PyQt5.QtGui import QColor, QBrush, QIcon, QPen, QFontMetrics
 from core.shared import get_color_icon
+from core.search_query import parse_query, SYNTAX_HELP
 
 # === 侧边栏 ===
 class FilterTreeWidget(QTreeWidget):
@@ -154,6 +155,7 @@ class SearchBar(QLineEdit):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setPlaceholderText("🔍 搜索内容...")
+        self.setToolTip(SYNTAX_HELP)
         self.settings = QSettings("ClipboardPro", "SearchHistory")
         self.history = self.settings.value("history", [], type=list)
 
@@ -187,6 +189,13 @@ class SearchBar(QLineEdit):
 
     def _on_text_changed(self, text):
         self.clearBtn.setVisible(bool(text))
+        # 按搜索语法解析 (与数据库查询使用同一解析器)，提示中显示解析结果，有无法识别的条件时标红边框
+        query = parse_query(text.strip())
+        self.setToolTip(query.describe() if text.strip() else SYNTAX_HELP)
+        if self.property("queryError") != bool(query.errors):
+            self.setProperty("queryError", bool(query.errors))
+            self.style().unpolish(self)
+            self.style().polish(self)
 
     def resizeEvent(self, event):
         button_size = self.clearBtn.sizeHint()
@@ -225,6 +234,7 @@ class CustomTitleBar(QWidget):
     color_clicked = pyqtSignal()
     pin_clicked = pyqtSignal(bool)
     mode_clicked = pyqtSignal(bool)
+    collapse_clicked = pyqtSignal(bool)
     display_count_changed = pyqtSignal(int)
     
     def __init__(self, parent=None):
@@ -271,6 +281,7 @@ class CustomTitleBar(QWidget):
         self.btn_refresh = self._btn("🔄", "刷新"); self.btn_refresh.setObjectName("ToolBarButton"); self.btn_refresh.clicked.connect(self.refresh_clicked.emit); layout.addWidget(self.btn_refresh)
         self.btn_color = self._btn("🌈", "设置标签颜色"); self.btn_color.setObjectName("ToolBarButton"); self.btn_color.clicked.connect(self.color_clicked.emit); layout.addWidget(self.btn_color)
         self.btn_mode = self._btn("📝", "编辑模式", True); self.btn_mode.setObjectName("ToolBarButton"); self.btn_mode.clicked.connect(self.mode_clicked.emit); layout.addWidget(self.btn_mode)
+        self.btn_collapse = self._btn("🧬", "折叠近似重复", True); self.btn_collapse.setObjectName("ToolBarButton"); self.btn_collapse.clicked.connect(self.collapse_clicked.emit); layout.addWidget(self.btn_collapse)
         self.btn_pin = self._btn("📌", "置顶", True); self.btn_pin.setObjectName("ToolBarButton"); self.btn_pin.clicked.connect(self.pin_clicked.emit); layout.addWidget(self.btn_pin)
 
         self.btn_settings = QToolButton()
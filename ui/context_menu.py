@@ -31,7 +31,7 @@ class ContextMenuHandler:
             return
             
         try:
-            ids = [int(self.table.item(r.row(), 8).text()) for r in rows]  # ID列从9改为8
+            ids = self.table.selected_ids()
             log.info(f"✅ 选中 {len(ids)} 个条目，ID: {ids}")
         except Exception as e:
             log.error(f"❌ 解析ID失败: {e}", exc_info=True)
@@ -80,6 +80,15 @@ class ContextMenuHandler:
                 menu.addAction("选择新颜色...").triggered.connect(lambda: self.set_custom_color(ids))
                 menu.addAction("清除颜色").triggered.connect(lambda: self.batch_set_color(ids, None))
                 
+                # 近似重复 (单选时查询 LSH 索引)
+                if len(ids) == 1:
+                    menu.addSeparator()
+                    menu.addAction("🔍 查找相似内容").triggered.connect(lambda: self.mw.show_similar(ids[0]))
+                    near = self.db.find_near_duplicates(ids[0])
+                    if near:
+                        near_ids = [item.id for item, _ in near]
+                        menu.addAction(f"🧬 合并 {len(near)} 条近似内容到此项").triggered.connect(lambda: self.merge_near_duplicates(ids[0], near_ids))
+
                 menu.addSeparator()
                 menu.addAction("🗑️ 移至回收站").triggered.connect(lambda: self.move_to_trash(ids))
 
@@ -108,6 +117,13 @@ class ContextMenuHandler:
         for i in ids: self.db.update_item(i, **{field: new_val})
         self.mw.load_data()
 
+    def merge_near_duplicates(self, keep_id, near_ids):
+        log.info(f"执行: 合并近似重复 {near_ids} -> {keep_id}")
+        if self.db.merge_items(keep_id, near_ids):
+            self.mw.lbl_status.setText(f"🧬 已合并 {len(near_ids)} 条近似内容")
+        self.mw.load_data()
+        self.mw.partition_panel.refresh_partitions()
+
     def batch_set_color(self, ids, color):
         log.info(f"执行: 设置颜色 {color}")
         for i in ids: self.db.update_item(i, custom_color=color)
@@ -203,14 +203,22 @@ class PreviewDialog(QDialog):
 
         return super().eventFilter(source, event)
 
-    def load_data(self, content, item_type, file_path=None, image_path=None, image_blob=None):
+    def load_data(self, content, item_type, file_path=None, image_path=None, image_blob=None, html=None, image=None, image_pending=False):
+        """image / image_pending 含义同 DetailPanel.load_item：优先使用缩略图服务给出的预览尺寸图片"""
         self.clear_state()
         
         pixmap = QPixmap()
         can_show_image = False
 
         if item_type == 'image':
-            if image_blob:
+            if image is not None and not image.isNull():
+                pixmap = QPixmap.fromImage(image)
+                can_show_image = True
+            elif image_pending:
+                self.mode = 'image'
+                self.lbl_info.setText("⏳ 图片加载中...")
+                return
+            elif image_blob:
                 can_show_image = pixmap.loadFromData(image_blob)
             else: # 兼容旧数据
                 import os
@@ -219,17 +227,14 @@ class PreviewDialog(QDialog):
                     can_show_image = pixmap.load(path_to_try)
 
         if can_show_image:
-            self.mode = 'image'
-            self.original_pixmap = pixmap
-            self.scroll_area.show()
-            self.controls.show()
-            self.fit_to_window(fast_mode=True)
-            self.update_info_label()
-            self.scroll_area.setFocus()
+            self._show_pixmap(pixmap)
             return
 
         self.mode = 'text'
-        self.text_preview.setPlainText(content)
+        if html:
+            self.text_preview.setHtml(html)
+        else:
+            self.text_preview.setPlainText(content)
         self.text_preview.show()
         self.controls.hide() 
         f = self.text_preview.font()
@@ -237,6 +242,20 @@ class PreviewDialog(QDialog):
         self.text_preview.setFont(f)
         self.lbl_info.setText("Text View")
 
+    def set_image(self, image):
+        """后台生成的预览图片就绪"""
+        if image is not None and not image.isNull():
+            self._show_pixmap(QPixmap.fromImage(image))
+
+    def _show_pixmap(self, pixmap):
+        self.mode = 'image'
+        self.original_pixmap = pixmap
+        self.scroll_area.show()
+        self.controls.show()
+        self.fit_to_window(fast_mode=True)
+        self.update_info_label()
+        self.scroll_area.setFocus()
+
     def clear_state(self):
         self.image_label.clear()
         self.image_container.adjustSize()
@@ -3,12 +3,11 @@ import logging
 import ctypes
 import os
 from ctypes.wintypes import MSG
-from datetime import datetime, time, timedelta
 
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                              QDockWidget, QLabel, QPushButton, QFrame, 
                              QApplication, QShortcut, QSizeGrip, QMessageBox,
-                             QAbstractItemView, QTableWidgetItem, QHeaderView, QMenu)
+                             QAbstractItemView, QHeaderView, QMenu)
 from PyQt5.QtCore import Qt, QPoint, QTimer, QSettings, QRect
 from PyQt5.QtGui import QColor, QKeySequence, QImage
 from sqlalchemy.orm import joinedload
@@ -16,7 +15,12 @@ from sqlalchemy.orm import joinedload
 # 核心逻辑
 from data.database import DBManager, Partition
 from services.clipboard import ClipboardManager
-from core.shared import format_size, get_color_icon
+from services.thumbnail_service import ThumbnailService
+from services.page_prefetch import PagePrefetcher, count_cap, page_window
+from services.image_recompress import start_image_recompression
+from core.item_meta import ensure_metadata
+from core.rich_text import make_text_mime
+from core.image_codec import decode_image
 
 # UI 组件
 from ui.components import CustomTitleBar
@@ -78,6 +82,8 @@ class MainWindow(QMainWindow):
         self.is_pinned = False
         
         self.edit_mode = False
+        self.collapse_similar = False
+        self.similar_to = None  # "查找相似"视图的基准项目，切换分区时清除
         self.current_sort_mode = "manual"
         self.last_external_hwnd = None
         self.col_alignments = {} 
@@ -85,11 +91,12 @@ class MainWindow(QMainWindow):
         self.page = 1
         self.page_size = 100
         self.total_items = 0
+        self.total_exact = True
+        self._list_filters = {}
         self._processing_clipboard = False
         self.item_id_to_select_after_load = None
         
-        self.cached_items = []
-        self.cached_items_map = {}
+        self._facet_filters = {}   # 当前数据库筛选条件 (筛选面板统计用)
         
         self.save_timer = QTimer()
         self.save_timer.setSingleShot(True)
@@ -100,8 +107,26 @@ class MainWindow(QMainWindow):
         self.focus_timer.timeout.connect(self.track_active_window)
         self.focus_timer.start(200)
         
+        # 搜索在数据库中执行，输入停顿后再重新查询
+        self.search_timer = QTimer()
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(300)
+        self.search_timer.timeout.connect(lambda: self.load_data(reset_page=True))
+        
         self.db = DBManager()
         self.cm = ClipboardManager(self.db)
+        self.thumbs = ThumbnailService(self.db, self)
+        self.thumbs.thumbnail_ready.connect(self.on_thumbnail_ready)
+        # 相邻页预取 + 空闲时预热常用视图 (结果进入数据库层的查询缓存)
+        self.prefetcher = PagePrefetcher(self.db, self)
+        self.prefetcher.rows_ready.connect(self._prefetch_thumbnails)
+        self.idle_timer = QTimer(self)
+        self.idle_timer.setSingleShot(True)
+        self.idle_timer.setInterval(3000)
+        self.idle_timer.timeout.connect(self._warm_default_views)
+        # 启动稍后再把旧图片迁移到当前存储策略，避开启动时的加载高峰
+        QTimer.singleShot(15000, lambda: start_image_recompression(self.db))
+        self._preview_item_id = None
         self.cm.data_captured.connect(self.refresh_after_capture) 
         
         self.clipboard = QApplication.clipboard()
@@ -133,11 +158,12 @@ class MainWindow(QMainWindow):
         self.title_bar = CustomTitleBar(self)
         self.title_bar.refresh_clicked.connect(self.load_data)
         self.title_bar.theme_clicked.connect(self.toggle_theme)
-        self.title_bar.search_changed.connect(self._apply_frontend_filters)
+        self.title_bar.search_changed.connect(self.search_timer.start)
         self.title_bar.display_count_changed.connect(self.on_display_count_changed)
         self.title_bar.pin_clicked.connect(self.toggle_pin)
         self.title_bar.clean_clicked.connect(self.auto_clean)
         self.title_bar.mode_clicked.connect(self.toggle_edit_mode)
+        self.title_bar.collapse_clicked.connect(self.toggle_collapse_similar)
         self.title_bar.color_clicked.connect(self.toolbar_set_color)
         self.inner_layout.addWidget(self.title_bar)
         
@@ -158,7 +184,7 @@ class MainWindow(QMainWindow):
         self.dock_filter.setFeatures(QDockWidget.AllDockWidgetFeatures)
         self.dock_filter.setAllowedAreas(Qt.LeftDockWidgetArea | Qt.RightDockWidgetArea)
         self.filter_panel = FilterPanel() 
-        self.filter_panel.filterChanged.connect(self._apply_frontend_filters)
+        self.filter_panel.filterChanged.connect(lambda: self.load_data(reset_page=True))
         self.dock_filter.setWidget(self.filter_panel)
         self.dock_container.addDockWidget(Qt.LeftDockWidgetArea, self.dock_filter)
         
@@ -168,7 +194,8 @@ class MainWindow(QMainWindow):
         self.dock_partition.setFeatures(QDockWidget.AllDockWidgetFeatures)
         self.dock_partition.setAllowedAreas(Qt.LeftDockWidgetArea | Qt.RightDockWidgetArea)
         self.partition_panel = PartitionPanel(self.db)
-        self.partition_panel.partitionSelectionChanged.connect(lambda: self.load_data(reset_page=True))
+        self.partition_panel.search_text_provider = lambda: self.title_bar.get_search_text()
+        self.partition_panel.partitionSelectionChanged.connect(self.on_partition_selection_changed)
         self.partition_panel.partitionsUpdated.connect(self.partition_panel.refresh_partitions)
         self.partition_panel.partitionsUpdated.connect(self.load_data)
         self.dock_partition.setWidget(self.partition_panel)
@@ -207,9 +234,13 @@ class MainWindow(QMainWindow):
         self.table.setMinimumWidth(300)
         self.table.horizontalHeader().customContextMenuRequested.connect(self.show_header_menu)
         self.table.horizontalHeader().sectionResized.connect(self.schedule_save_state)
-        self.table.itemSelectionChanged.connect(self.update_detail_panel)
-        self.table.itemDoubleClicked.connect(self.on_table_double_click)
-        self.table.itemChanged.connect(self.on_item_changed)
+        self.table.selectionModel().selectionChanged.connect(self.update_detail_panel)
+        self.table.doubleClicked.connect(self.on_table_double_click)
+        self.model = self.table.source_model
+        self.model.col_alignments = self.col_alignments
+        self.model.icon_provider = self._list_thumbnail
+        self.model.item_edited.connect(self.on_item_edited)
+        self.model.rowsInserted.connect(self.on_rows_fetched)
         self.table.customContextMenuRequested.connect(self.show_context_menu)
         self.table.reorder_signal.connect(self.reorder_items)
         self.dock_container.setCentralWidget(self.table)
@@ -286,15 +317,12 @@ class MainWindow(QMainWindow):
             self.preview_dlg.close()
             return
         
-        rows = self.table.selectionModel().selectedRows()
-        if not rows:
+        ids = self.table.selected_ids()
+        if not ids:
             return
             
         try:
-            item_id_item = self.table.item(rows[0].row(), 8)
-            if not item_id_item:
-                return
-            item_id = int(item_id_item.text())
+            item_id = ids[0]
             
             session = self.db.get_session()
             from data.database import ClipboardItem
@@ -303,7 +331,14 @@ class MainWindow(QMainWindow):
                 if not self.preview_dlg:
                     self.preview_dlg = PreviewDialog(self)
                 
-                self.preview_dlg.load_data(item.content, item.item_type, item.file_path, item.image_path, item.data_blob)
+                html = self.db.get_item_html(item.id) if item.has_html else None
+                content = self.db.get_full_content(item.id) if item.is_compressed else item.content
+                self._preview_item_id = item.id
+                if self._uses_thumbnail_service(item):
+                    image = self.thumbs.request(item.id, 'preview')
+                    self.preview_dlg.load_data(content, item.item_type, item.file_path, item.image_path, html=html, image=image, image_pending=image is None)
+                else:
+                    self.preview_dlg.load_data(content, item.item_type, item.file_path, item.image_path, None, html)
                 self.preview_dlg.show()
                 self.preview_dlg.raise_()
                 self.preview_dlg.activateWindow()
@@ -385,26 +420,13 @@ class MainWindow(QMainWindow):
             self.title_bar.search_bar.selectAll()
 
     def _batch_action(self, name, action_func):
-        rows = self.table.selectionModel().selectedRows()
-        if not rows:
-            return
-        
-        ids = []
-        for r in rows:
-            item = self.table.item(r.row(), 8)
-            if item and item.text():
-                ids.append(int(item.text()))
-        
+        ids = self.table.selected_ids()
         if ids:
             log.info(f"⌨️ 快捷键触发: {name} ({len(ids)} 项)")
             action_func(ids)
 
     def smart_delete(self, force_warn=False):
-        rows = self.table.selectionModel().selectedRows()
-        if not rows:
-            return
-        
-        ids = [int(self.table.item(r.row(), 8).text()) for r in rows if self.table.item(r.row(), 8) and self.table.item(r.row(), 8).text()]
+        ids = self.table.selected_ids()
         if not ids:
             return
         
@@ -457,10 +479,11 @@ class MainWindow(QMainWindow):
         s.setValue("geometry", self.saveGeometry())
         s.setValue("windowState", self.dock_container.saveState())
         s.setValue("editMode", self.edit_mode)
+        s.setValue("collapseSimilar", self.collapse_similar)
         s.setValue("current_theme", self.current_theme)
-        s.setValue("columnWidths", [self.table.columnWidth(i) for i in range(self.table.columnCount())])
+        s.setValue("columnWidths", [self.table.columnWidth(i) for i in range(self.model.columnCount())])
         header = self.table.horizontalHeader()
-        s.setValue("columnOrder", [header.visualIndex(i) for i in range(self.table.columnCount())])
+        s.setValue("columnOrder", [header.visualIndex(i) for i in range(self.model.columnCount())])
         for i, align in self.col_alignments.items():
             s.setValue(f"col_{i}_align", align)
         s.setValue("is_pinned", self.is_pinned)
@@ -511,20 +534,24 @@ class MainWindow(QMainWindow):
             self.title_bar.btn_mode.setChecked(self.edit_mode)
         self.toggle_edit_mode(self.edit_mode)
 
+        self.collapse_similar = s.value("collapseSimilar", False, type=bool)
+        if hasattr(self.title_bar, 'btn_collapse'):
+            self.title_bar.btn_collapse.setChecked(self.collapse_similar)
+
         self.page_size = s.value("pageSize", 100, type=int)
         if hasattr(self, 'title_bar'):
             self.title_bar.set_display_count(self.page_size)
         
         if cw := s.value("columnWidths"):
             for i, w in enumerate([int(w) for w in cw]): 
-                if i < self.table.columnCount():
+                if i < self.model.columnCount():
                     self.table.setColumnWidth(i, w)
         if co := s.value("columnOrder"):
             header = self.table.horizontalHeader()
             for logical_idx, visual_idx in enumerate(co):
                 header.moveSection(header.visualIndex(logical_idx), int(visual_idx))
         
-        for i in range(self.table.columnCount()):
+        for i in range(self.model.columnCount()):
             if align := s.value(f"col_{i}_align"):
                 self.col_alignments[i] = int(align)
         
@@ -555,13 +582,11 @@ class MainWindow(QMainWindow):
         if self._processing_clipboard:
             return
         
-        self._processing_clipboard = True
-        try:
-            self.cm.process_clipboard(self.clipboard.mimeData(), self.partition_panel.get_current_selection())
-        finally:
-            self._processing_clipboard = False
+        self.cm.schedule_capture(self.partition_panel.get_current_selection())
 
-    def refresh_after_capture(self):
+    def refresh_after_capture(self, item=None, is_new=False):
+        if is_new and getattr(item, 'near_dup_group', None):
+            self.lbl_status.setText("🧬 新内容与已有项目近似，可在右键菜单中合并")
         QTimer.singleShot(0, self.load_data)
         QTimer.singleShot(0, self.partition_panel.refresh_partitions)
 
@@ -571,6 +596,8 @@ class MainWindow(QMainWindow):
 
     def go_to_last_page(self):
         if self.page_size > 0:
+            if not self.total_exact:
+                self.total_items = self.db.get_count(**self._list_filters)
             total_pages = (self.total_items + self.page_size - 1) // self.page_size
             self.page = total_pages if total_pages > 0 else 1
             self.load_data()
@@ -593,86 +620,59 @@ class MainWindow(QMainWindow):
                 self.page = 1
             
             partition_filter = self.partition_panel.get_current_selection()
-            date_filter = self.filter_panel.get_checked('date_create')[0] if self.filter_panel.get_checked('date_create') else None
-            date_modify_filter = self.filter_panel.get_checked('date_modify')[0] if self.filter_panel.get_checked('date_modify') else None
-            
-            if partition_filter and partition_filter.get('type') == 'today':
-                date_modify_filter = '今日'
-                partition_filter = None
+            if self.similar_to is not None:
+                partition_filter = {'type': 'similar', 'id': self.similar_to}
+            # 统计只按分区 / 日期计算，勾选星级、颜色等不会让其他选项消失
+            self._facet_filters = self._view_filters(partition_filter, self.filter_panel.get_checked('date_create'), self.filter_panel.get_checked('date_modify'))
             
             self.table.setSelectionMode(QAbstractItemView.ExtendedSelection)
-            self.table.is_trash_view = bool(partition_filter and partition_filter.get('type') == 'trash')
-
-            log.info(f"🔍 数据库筛选条件: 分区={partition_filter}, 创建日期={date_filter}, 修改日期={date_modify_filter}")
+            self.table.is_trash_view = self._facet_filters['partition_filter'] is not None and self._facet_filters['partition_filter'].get('type') == 'trash'
+
+            checked = self._checked_facets()
+            filters = dict(self._facet_filters, search=self.title_bar.get_search_text() or None,
+                           stars=checked['stars'], colors=checked['colors'], types=checked['types'],
+                           tag_ids=self.db.get_tag_ids(checked['tags']) if checked['tags'] else None)
+            if checked['tags'] and not filters['tag_ids']:
+                filters['tag_ids'] = [-1]  # 勾选的标签已被删除：结果为空
+            log.info(f"🔍 数据库筛选条件: {filters}")
+            self._list_filters = filters
             
-            self.total_items = self.db.get_count(partition_filter=partition_filter, date_filter=date_filter, date_modify_filter=date_modify_filter)
+            # 只数到能判断"是否还有下一页"为止；超过上限时显示为近似值
+            cap = count_cap(self.page, self.page_size)
+            self.total_items = self.db.get_count(cap=cap, **filters)
+            self.total_exact = self.total_items < cap
             
-            limit, offset = self.page_size, 0
+            offset, row_count = page_window(self.total_items, self.page, self.page_size)
             if self.page_size != -1:
                 self.bottom_bar.show()
                 total_pages = (self.total_items + self.page_size - 1) // self.page_size if self.page_size > 0 else 1
-                self.lbl_page.setText(f"{self.page} / {max(1, total_pages)}")
+                self.lbl_page.setText(f"{self.page} / {max(1, total_pages)}{'' if self.total_exact else '+'}")
                 
                 is_first = self.page == 1
-                is_last = self.page == total_pages or total_pages == 0
+                is_last = self.total_exact and (self.page == total_pages or total_pages == 0)
                 
                 self.btn_first.setEnabled(not is_first)
                 self.btn_prev.setEnabled(not is_first)
                 self.btn_next.setEnabled(not is_last)
                 self.btn_last.setEnabled(not is_last)
-                
-                offset = (self.page - 1) * self.page_size
             else:
                 self.bottom_bar.show()
-                limit = None
                 self.lbl_page.setText("1 / 1")
                 self.btn_first.setEnabled(False)
                 self.btn_prev.setEnabled(False)
                 self.btn_next.setEnabled(False)
                 self.btn_last.setEnabled(False)
 
-            items = self.db.get_items(sort_mode=self.current_sort_mode, limit=limit, offset=offset, date_filter=date_filter, date_modify_filter=date_modify_filter, partition_filter=partition_filter)
+            # 模型只取第一批，其余在滚动时按窗口加载 ("全部" 也一样)
+            query = dict(sort_mode=self.current_sort_mode, **filters)
+            loader = lambda start, count: self.db.get_items(limit=count, offset=offset + start, **query)
+            self.model.reset(loader, row_count if self.total_exact or self.page_size != -1 else None)
+            log.info(f"✅ 已加载 {self.model.rowCount()}/{row_count} 行，其余滚动时加载")
             
-            self.cached_items = items
-            self.cached_items_map = {item.id: item for item in items}
-            log.info(f"✅ 从数据库加载 {len(items)} 条数据并缓存")
-            
-            self.table.blockSignals(True)
-            self.table.setRowCount(len(items))
-            for row, item in enumerate(items):
-                self.table.setItem(row, 8, QTableWidgetItem(str(item.id)))
-                
-                st_flags = ("📌" if item.is_pinned else "") + ("❤️" if item.is_favorite else "") + ("🔒" if item.is_locked else "")
-                display_text = f"{self._get_type_icon(item)} {st_flags}".strip()
-                state_item = QTableWidgetItem(display_text)
-                if item.custom_color:
-                    state_item.setIcon(get_color_icon(item.custom_color))
-                self.table.setItem(row, 0, state_item)
-                
-                self.table.setItem(row, 1, QTableWidgetItem(item.content.replace('\n', ' ')[:100]))
-                self.table.setItem(row, 2, QTableWidgetItem(item.note))
-                self.table.setItem(row, 3, QTableWidgetItem("★" * item.star_level))
-                self.table.setItem(row, 4, QTableWidgetItem(format_size(item.content)))
-                
-                if item.is_file and item.file_path:
-                    _, ext = os.path.splitext(item.file_path)
-                    type_str = ext.upper()[1:] if ext else "FILE"
-                else:
-                    type_str = "TXT"
-                self.table.setItem(row, 5, QTableWidgetItem(type_str))
-                
-                self.table.setItem(row, 6, QTableWidgetItem(item.created_at.strftime("%m-%d %H:%M")))
-                self.table.setItem(row, 7, QTableWidgetItem(item.file_path or ""))
-                
-                for col in range(7):
-                    align = self.col_alignments.get(col, Qt.AlignLeft | Qt.AlignVCenter if col in [1,2] else Qt.AlignCenter)
-                    table_item = self.table.item(row, col)
-                    if table_item:
-                        table_item.setTextAlignment(align)
-            self.table.blockSignals(False)
-            
-            self._apply_frontend_filters()
+            self._refresh_filter_stats()
+            self._update_status()
             self.tag_panel.refresh_tags(self.db)
+            self._schedule_prefetch()
             
             if self.item_id_to_select_after_load is not None:
                 self.select_item_in_table(self.item_id_to_select_after_load)
@@ -682,126 +682,51 @@ class MainWindow(QMainWindow):
         except Exception as e:
             log.error(f"Load Error: {e}", exc_info=True)
 
-    def _apply_frontend_filters(self):
-        log.info("🎭 应用前端过滤...")
-        search_text = self.title_bar.get_search_text().strip().lower()
-        stars = set(self.filter_panel.get_checked('stars'))
-        colors = set(self.filter_panel.get_checked('colors'))
-        types = set(self.filter_panel.get_checked('types'))
-        tags = set(self.filter_panel.get_checked('tags'))
-        
-        log.debug(f"   筛选条件: 搜索='{search_text}', 星级={stars}, 颜色={colors}, 类型={types}, 标签={tags}")
-        
-        visible_count = 0
-        for row in range(self.table.rowCount()):
-            should_show = True
-            id_item = self.table.item(row, 8)
-            if not id_item or not id_item.text():
-                self.table.setRowHidden(row, True)
-                continue
-            
-            item = self.cached_items_map.get(int(id_item.text()))
-            if not item:
-                self.table.setRowHidden(row, True)
-                continue
-            
-            if search_text and not (search_text in item.content.lower() or search_text in (item.note or "").lower() or any(search_text in tag.name.lower() for tag in item.tags)):
-                should_show = False
-            if should_show and stars and item.star_level not in stars:
-                should_show = False
-            if should_show and colors and (not item.custom_color or item.custom_color not in colors):
-                should_show = False
-            if should_show and types and self._get_item_type_key(item) not in types:
-                should_show = False
-            if should_show and tags and not {tag.name for tag in item.tags}.intersection(tags):
-                should_show = False
-            
-            self.table.setRowHidden(row, not should_show)
-            if should_show:
-                visible_count += 1
-        
-        log.info(f"✅ 前端过滤完成: 显示 {visible_count}/{len(self.cached_items)} 行")
-        
-        # Correct Logic: Stats should be calculated from all items on the page
-        # to prevent filter options from disappearing when a filter is applied.
-        stats = self._calculate_stats_from_items(self.cached_items)
-        self.filter_panel.update_stats(stats)
-        
-        self.lbl_status.setText(f"总计: {self.total_items} 条 | 当前页: {len(self.cached_items)} 条 | 显示: {visible_count} 条")
-
-    def _get_type_icon(self, item):
-        if item.item_type == 'url': return "🔗"
-        if item.item_type == 'image': return "🖼️"
-        if item.item_type == 'file' and item.file_path:
-            if os.path.exists(item.file_path):
-                if os.path.isdir(item.file_path): return "📂"
-                ext = os.path.splitext(item.file_path)[1].lower()
-                if ext in ['.mp3', '.wav', '.flac', '.aac', '.ogg', '.m4a', '.wma']: return "🎵"
-                if ext in ['.png', '.jpg', '.jpeg', '.gif', '.bmp', '.ico', '.webp']: return "🖼️"
-                if ext in ['.mp4', '.mkv', '.avi', '.mov', '.wmv']: return "🎬"
-                return "📄"
-            return "📄"
-        return "📝"
-
-    def _get_item_type_key(self, item):
-        if item.item_type == 'text': return 'text'
-        if item.item_type == 'url': return 'url'
-        if item.item_type == 'file' and item.file_path:
-            if os.path.exists(item.file_path):
-                if os.path.isdir(item.file_path): return 'folder'
-                _, ext = os.path.splitext(item.file_path)
-                return ext.lstrip('.').upper() if ext else 'FILE'
-            return 'FILE'
-        if item.item_type == 'image':
-            path = item.image_path or item.file_path
-            if path:
-                _, ext = os.path.splitext(path)
-                return ext.lstrip('.').upper() if ext else 'IMAGE'
-            return 'IMAGE'
-        return 'text'
-
-    def _calculate_stats_from_items(self, items):
-        from data.database import Tag
-        stats = {'tags': {}, 'stars': {}, 'colors': {}, 'types': {}, 'date_create': {}, 'date_modify': {}}
-        session = self.db.get_session()
-        try:
-            all_tags_in_db = {tag.name for tag in session.query(Tag).all()}
-            for item in items:
-                stats['stars'][item.star_level] = stats['stars'].get(item.star_level, 0) + 1
-                if item.custom_color:
-                    stats['colors'][item.custom_color] = stats['colors'].get(item.custom_color, 0) + 1
-                for tag in item.tags:
-                    stats['tags'][tag.name] = stats['tags'].get(tag.name, 0) + 1
-                stats['types'][self._get_item_type_key(item)] = stats['types'].get(self._get_item_type_key(item), 0) + 1
-        finally:
-            session.close()
-        
-        final_tags = {tag_name: 0 for tag_name in all_tags_in_db}
-        final_tags.update(stats['tags'])
-        stats['tags'] = list(final_tags.items())
-        
-        def get_date_label(dt):
-            today = datetime.now().date()
-            if dt.date() == today: return "今日"
-            if dt.date() == today - timedelta(days=1): return "昨日"
-            if dt.date() >= today - timedelta(days=7): return "周内"
-            if dt.date() >= today - timedelta(days=14): return "两周"
-            if dt.month == today.month and dt.year == today.year: return "本月"
-            first_day_curr = today.replace(day=1)
-            last_day_last = first_day_curr - timedelta(days=1)
-            first_day_last = last_day_last.replace(day=1)
-            if first_day_last <= dt.date() <= last_day_last: return "上月"
-            return None
-
-        for item in items:
-            label = get_date_label(item.created_at)
-            if label:
-                stats['date_create'][label] = stats['date_create'].get(label, 0) + 1
-            if item.modified_at:
-                label = get_date_label(item.modified_at)
-                if label:
-                    stats['date_modify'][label] = stats['date_modify'].get(label, 0) + 1
-        return stats
+    def _view_filters(self, partition_filter, date_filter=None, date_modify_filter=None):
+        """分区选择 + 日期勾选 -> 数据库筛选条件 ("今日数据" 是按修改日期筛选的全部数据)"""
+        if partition_filter and partition_filter.get('type') == 'today':
+            date_modify_filter = '今日'
+            partition_filter = None
+        return dict(date_filter=date_filter or None, date_modify_filter=date_modify_filter or None,
+                    partition_filter=partition_filter, collapse_similar=self.collapse_similar)
+
+    def _schedule_prefetch(self):
+        """当前页显示后预取前后两页 (含列表缩略图)，并重新开始空闲计时"""
+        self.prefetcher.cancel()
+        if self.page_size > 0:
+            total_pages = (self.total_items + self.page_size - 1) // self.page_size
+            for page in (self.page + 1, self.page - 1):
+                if 1 <= page <= total_pages:
+                    self.prefetcher.submit(('page', page), self._list_filters, self._facet_filters,
+                                           self.current_sort_mode, page, self.page_size, thumbnails=True)
+        self.idle_timer.start()
+
+    def _warm_default_views(self):
+        """空闲时预热常用视图的第一页：全部、今日、各顶层分区"""
+        for selection in self.partition_panel.top_level_selections():
+            filters = self._view_filters(selection)
+            key = ('warm', selection.get('type'), selection.get('id'))
+            self.prefetcher.submit(key, filters, filters, self.current_sort_mode, 1, self.page_size)
+
+    def _prefetch_thumbnails(self, rows):
+        for item in rows:
+            if self._uses_thumbnail_service(item):
+                self.thumbs.request(item.id, 'list')
+
+    def on_rows_fetched(self, parent, first, last):
+        """滚动加载了新的一批行"""
+        self._update_status()
+
+    def _checked_facets(self):
+        return {facet: set(self.filter_panel.get_checked(facet)) for facet in ('stars', 'colors', 'types', 'tags')}
+
+    def _update_status(self):
+        total = self.total_items if self.total_exact else f"{self.total_items}+"
+        self.lbl_status.setText(f"总计: {total} 条 | 当前页: {self.model.total} 条 (已加载 {self.model.rowCount()})")
+
+    def _refresh_filter_stats(self):
+        # 统计基于数据库筛选后的完整结果集 (不受前端勾选影响，避免勾选后其他选项消失)，结果由数据库层缓存
+        self.filter_panel.update_stats(self.db.get_facets(**self._facet_filters))
 
     def show_header_menu(self, pos):
         col = self.table.horizontalHeader().logicalIndexAt(pos)
@@ -812,11 +737,7 @@ class MainWindow(QMainWindow):
         menu.exec_(self.table.horizontalHeader().mapToGlobal(pos))
         
     def set_col_align(self, col, align):
-        self.col_alignments[col] = int(align)
-        for row in range(self.table.rowCount()):
-            table_item = self.table.item(row, col)
-            if table_item:
-                table_item.setTextAlignment(align)
+        self.model.set_alignment(col, align)
         self.schedule_save_state()
 
     def on_display_count_changed(self, count):
@@ -843,24 +764,39 @@ class MainWindow(QMainWindow):
 
     def toggle_edit_mode(self, checked):
         self.edit_mode = checked
+        self.model.editable = checked
         self.table.setEditTriggers(QAbstractItemView.DoubleClicked if checked else QAbstractItemView.NoEditTriggers)
         self.schedule_save_state()
 
-    def on_table_double_click(self, item):
+    def on_partition_selection_changed(self):
+        self.similar_to = None
+        self.load_data(reset_page=True)
+
+    def show_similar(self, item_id):
+        """只显示与指定项目相似的内容 (图片按感知哈希，文本按 SimHash)"""
+        self.similar_to = item_id
+        self.load_data(reset_page=True)
+        self.lbl_status.setText(f"🔍 相似内容: {self.total_items} 条 (点击任意分区返回)")
+
+    def toggle_collapse_similar(self, checked):
+        """折叠视图：每个近似重复组只显示最新的一条"""
+        self.collapse_similar = checked
+        self.schedule_save_state()
+        self.load_data(reset_page=True)
+
+    def on_table_double_click(self, index):
         if self.edit_mode:
             return
         self.copy_and_paste_item()
 
-    def on_item_changed(self, item):
+    def on_item_edited(self, item_id, col, text):
         if not self.edit_mode:
             return
         
-        row, col = item.row(), item.column()
-        item_id = int(self.table.item(row, 8).text())
         if col == 1:
-            self.db.update_item(item_id, content=item.text().strip())
+            self.db.update_item(item_id, content=text)
         elif col == 2:
-            self.db.update_item(item_id, note=item.text().strip())
+            self.db.update_item(item_id, note=text)
         
         self.load_data()
 
@@ -872,12 +808,15 @@ class MainWindow(QMainWindow):
             if obj:
                 self._processing_clipboard = True
                 try:
-                    if obj.item_type == 'image' and obj.data_blob:
-                        image = QImage()
-                        image.loadFromData(obj.data_blob)
-                        self.clipboard.setImage(image)
+                    image_blob, image_codec = self.db.get_image_data(obj.id, original=True) if obj.item_type == 'image' else (None, None)
+                    if image_blob:
+                        self.clipboard.setImage(decode_image(image_blob, image_codec))
                     else:
-                        self.clipboard.setText(obj.content)
+                        content = self.db.get_full_content(obj.id) if obj.is_compressed else obj.content
+                        if obj.has_html:
+                            self.clipboard.setMimeData(make_text_mime(content, self.db.get_item_html(obj.id)))
+                        else:
+                            self.clipboard.setText(content)
                 finally:
                     self._processing_clipboard = False
                 
@@ -902,20 +841,15 @@ class MainWindow(QMainWindow):
             ctypes.windll.user32.keybd_event(0x11, 2, 0) # CTRL up
 
     def update_detail_panel(self):
-        rows = self.table.selectionModel().selectedRows()
-        has_selection = bool(rows)
+        ids = self.table.selected_ids()
+        has_selection = bool(ids)
         self.tag_panel.setEnabled(has_selection)
 
-        if not rows:
+        if not ids:
             self.detail_panel.clear()
             return
         
-        item = self.table.item(rows[0].row(), 8)
-        if not item or not item.text():
-            log.warning("⚠️ 选中行的ID列为空")
-            return
-        
-        item_id = int(item.text())
+        item_id = ids[0]
         log.debug(f"📋 更新详情面板，项目ID: {item_id}")
         session = self.db.get_session()
         from data.database import ClipboardItem
@@ -932,10 +866,30 @@ class MainWindow(QMainWindow):
             group_name = path_parts[0] if path_parts else None
             partition_name = " -> ".join(path_parts) if path_parts else None
 
-            self.detail_panel.load_item(item_obj.content, item_obj.note, tags, group_name=group_name, partition_name=partition_name, item_type=item_obj.item_type, image_path=item_obj.image_path, file_path=item_obj.file_path, image_blob=item_obj.data_blob)
+            content = self.db.get_full_content(item_id) if item_obj.is_compressed else item_obj.content
+            image = self.thumbs.request(item_id, 'detail') if self._uses_thumbnail_service(item_obj) else None
+            self.detail_panel.load_item(content, item_obj.note, tags, group_name=group_name, partition_name=partition_name, item_type=item_obj.item_type, image_path=item_obj.image_path, file_path=item_obj.file_path,
+                                        image=image, image_pending=self._uses_thumbnail_service(item_obj) and image is None)
             self.current_item_id = item_id
         session.close()
 
+    @staticmethod
+    def _uses_thumbnail_service(item):
+        """数据库内保存了图片数据的项目走缩略图服务；旧版按路径保存的图片仍直接读文件"""
+        return item.item_type == 'image' and not item.image_path
+
+    def _list_thumbnail(self, item):
+        """表格绘制到图片行时才请求列表缩略图"""
+        return self.thumbs.request(item.id, 'list') if self._uses_thumbnail_service(item) else None
+
+    def on_thumbnail_ready(self, item_id, size_key, image):
+        if size_key == 'list':
+            self.model.set_thumbnail(item_id, image)
+        elif size_key == 'detail' and item_id == self.current_item_id:
+            self.detail_panel.set_image(image)
+        elif size_key == 'preview' and item_id == self._preview_item_id and self.preview_dlg and self.preview_dlg.isVisible():
+            self.preview_dlg.set_image(image)
+
     def reorder_items(self, new_ids):
         self.db.update_sort_order(new_ids)
 
@@ -952,12 +906,8 @@ class MainWindow(QMainWindow):
             self.partition_panel.refresh_partitions()
 
     def on_tag_panel_commit_tags(self, tags):
-        rows = self.table.selectionModel().selectedRows()
-        if not rows or not tags:
-            return
-        
-        item_ids = [int(self.table.item(r.row(), 8).text()) for r in rows if self.table.item(r.row(), 8) and self.table.item(r.row(), 8).text()]
-        if item_ids:
+        item_ids = self.table.selected_ids()
+        if item_ids and tags:
             self.db.add_tags_to_items(item_ids, tags)
             self.load_data()
             self.update_detail_panel()
@@ -983,11 +933,7 @@ class MainWindow(QMainWindow):
             app.setStyleSheet(themes.light.STYLESHEET)
     
     def toolbar_set_color(self):
-        rows = self.table.selectionModel().selectedRows()
-        if not rows:
-            return
-        
-        item_ids = [int(self.table.item(r.row(), 8).text()) for r in rows if self.table.item(r.row(), 8) and self.table.item(r.row(), 8).text()]
+        item_ids = self.table.selected_ids()
         if item_ids:
             self.set_custom_color(item_ids)
 
@@ -1013,15 +959,14 @@ class MainWindow(QMainWindow):
 
     def select_item_in_table(self, item_id_to_select):
         log.debug(f"滚动到项目: {item_id_to_select}")
-        for row in range(self.table.rowCount()):
-            item = self.table.item(row, 8)
-            if item and item.text() == str(item_id_to_select):
-                self.table.blockSignals(True)
-                self.table.selectRow(row)
-                self.table.scrollToItem(item, QAbstractItemView.ScrollHint.PositionAtCenter)
-                self.table.blockSignals(False)
-                log.info(f"✅ 已在表格中高亮显示项目 {item_id_to_select}")
-                return
+        while self.model.row_of(item_id_to_select) is None and self.model.canFetchMore():
+            self.model.fetchMore()
+        row = self.table.view_row_of(item_id_to_select)
+        if row is not None:
+            self.table.selectRow(row)
+            self.table.scrollTo(self.model.index(row, 1), QAbstractItemView.ScrollHint.PositionAtCenter)
+            log.info(f"✅ 已在表格中高亮显示项目 {item_id_to_select}")
+            return
         log.warning(f"⚠️ 未能在当前显示的表格中找到项目ID: {item_id_to_select}")
     
     def on_tag_panel_add_tag(self, tag_input=None):
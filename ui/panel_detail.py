@@ -118,7 +118,11 @@ class DetailPanel(QWidget):
         self.layout.addStretch(1)
         self.layout.addWidget(self.tag_input)
 
-    def load_item(self, content, note, tags, group_name=None, partition_name=None, item_type='text', image_path=None, file_path=None, image_blob=None):
+    def load_item(self, content, note, tags, group_name=None, partition_name=None, item_type='text', image_path=None, file_path=None, image_blob=None, image=None, image_pending=False):
+        """
+        image: 缩略图服务给出的详情尺寸 QImage (优先)
+        image_pending: 缩略图正在后台生成，先显示占位，完成后调用 set_image
+        """
         # 设置分区信息
         self.lbl_group.setText(f"分组: {group_name or '--'}")
         self.lbl_partition.setText(f"分区: {partition_name or '未分类'}")
@@ -131,7 +135,17 @@ class DetailPanel(QWidget):
         can_show_image = False
 
         if item_type == 'image':
-            if image_blob:
+            if image is not None and not image.isNull():
+                pixmap = QPixmap.fromImage(image)
+                can_show_image = True
+            elif image_pending:
+                self.preview.hide()
+                self.image_container.show()
+                self.image_label.show()
+                self.image_label.setMinimumSize(0, 0)
+                self.image_label.setMaximumSize(16777215, 16777215)
+                self.image_label.setText("⏳ 图片加载中...")
+            elif image_blob:
                 can_show_image = pixmap.loadFromData(image_blob)
             else: # 兼容旧数据
                 path_to_try = image_path or file_path
@@ -139,13 +153,9 @@ class DetailPanel(QWidget):
                     can_show_image = pixmap.load(path_to_try)
 
         if can_show_image:
-            self.preview.hide()
-            self.image_container.show()
-            self.image_label.show()
-            max_w = self.width() - 40
-            scaled_pixmap = pixmap.scaled(max_w, max_w, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-            self.image_label.setPixmap(scaled_pixmap)
-            self.image_label.setFixedSize(scaled_pixmap.size())
+            self._show_pixmap(pixmap)
+        elif item_type == 'image' and image_pending:
+            pass
         else:
             self.image_container.hide()
             self.image_label.hide()
@@ -160,6 +170,22 @@ class DetailPanel(QWidget):
         self._refresh_tags(tags)
         self._update_preview_height()
 
+    def set_image(self, image):
+        """后台缩略图生成完成后更新图片"""
+        if image is not None and not image.isNull():
+            self._show_pixmap(QPixmap.fromImage(image))
+
+    def _show_pixmap(self, pixmap):
+        self.preview.hide()
+        self.image_container.show()
+        self.image_label.show()
+        max_w = self.width() - 40
+        # 详情尺寸缩略图通常已接近面板宽度，只有更大时才缩放
+        if pixmap.width() > max_w or pixmap.height() > max_w:
+            pixmap = pixmap.scaled(max_w, max_w, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        self.image_label.setPixmap(pixmap)
+        self.image_label.setFixedSize(pixmap.size())
+
     def _update_preview_height(self):
         """智能计算并设置预览框的高度"""
         # 仅在文本预览可见时操作
@@ -6,6 +6,7 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QTreeWidget, QTreeWidgetItem,
                              QAbstractItemView, QStyle, QTreeWidgetItemIterator)
 from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtGui import QFont, QIcon, QPixmap, QColor, QPainter
+from core.search_query import SYNTAX_HELP
 
 log = logging.getLogger(__name__)
 
@@ -161,6 +162,7 @@ class PartitionPanel(QWidget):
     def __init__(self, db_manager, parent=None):
         super().__init__(parent)
         self.db = db_manager
+        self.search_text_provider = None  # 返回当前搜索框文本，新建智能分区时作为默认搜索
         self._init_ui()
         self.refresh_partitions()
 
@@ -231,6 +233,15 @@ class PartitionPanel(QWidget):
             item.setIcon(0, self.style().standardIcon(icon))
             item.setFlags(item.flags() & ~Qt.ItemIsDragEnabled & ~Qt.ItemIsDropEnabled)
 
+        # -- 智能分区 (保存的搜索，成员已物化，计数与普通分区一样直接读取) --
+        smart_counts = counts.get('smart', {})
+        for smart in self.db.get_smart_partitions():
+            item = QTreeWidgetItem(self.tree, [f"{smart.name} ({smart_counts.get(smart.id, 0)})"])
+            item.setData(0, Qt.UserRole, {'type': 'smart', 'id': smart.id, 'query': smart.query, 'color': smart.color})
+            item.setIcon(0, self.style().standardIcon(QStyle.SP_FileDialogContentsView))
+            item.setToolTip(0, smart.query)
+            item.setFlags(item.flags() & ~Qt.ItemIsDragEnabled & ~Qt.ItemIsDropEnabled)
+
         # -- 递归添加用户分区 --
         top_level_partitions = self.db.get_partitions_tree()
         self._add_partition_recursive(top_level_partitions, self.tree, partition_counts)
@@ -266,10 +277,16 @@ class PartitionPanel(QWidget):
                 menu.addSeparator()
                 menu.addAction("重命名", lambda: self._rename_item(item))
                 menu.addAction("删除", lambda: self._delete_item(item))
+            elif item_data.get('type') == 'smart':
+                menu.addAction("编辑搜索", lambda: self._edit_smart_query(item))
+                menu.addSeparator()
+                menu.addAction("重命名", lambda: self._rename_item(item))
+                menu.addAction("删除", lambda: self._delete_item(item))
             elif item_data.get('type') not in ['all', 'uncategorized', 'untagged', 'trash']:
                  menu.addAction("添加分区", self._add_partition) # fallback for safety
         else:
             menu.addAction("添加分区", self._add_partition)
+            menu.addAction("新建智能分区", self._add_smart_partition)
             
         menu.exec_(self.tree.viewport().mapToGlobal(pos))
 
@@ -280,6 +297,23 @@ class PartitionPanel(QWidget):
             if self.db.add_partition(name, parent_id=parent_id):
                 self.partitionsUpdated.emit()
 
+    def _add_smart_partition(self):
+        name, ok = QInputDialog.getText(self, "新建智能分区", "请输入智能分区名称:", QLineEdit.Normal, "")
+        if not (ok and name):
+            return
+        default_query = self.search_text_provider() if self.search_text_provider else ""
+        query, ok = QInputDialog.getText(self, "新建智能分区", f"搜索条件:\n{SYNTAX_HELP}", QLineEdit.Normal, default_query or "")
+        if ok and query.strip():
+            if self.db.add_smart_partition(name, query):
+                self.partitionsUpdated.emit()
+
+    def _edit_smart_query(self, item):
+        item_data = item.data(0, Qt.UserRole)
+        query, ok = QInputDialog.getText(self, "编辑搜索", f"搜索条件:\n{SYNTAX_HELP}", QLineEdit.Normal, item_data.get('query', ''))
+        if ok and query.strip() and query.strip() != item_data.get('query'):
+            self.db.update_smart_partition(item_data['id'], query=query)
+            self.partitionsUpdated.emit()
+
     def _change_item_color(self, item):
         item_data = item.data(0, Qt.UserRole)
         current_color = QColor(item_data.get('color', '#FFFFFF'))
@@ -293,11 +327,21 @@ class PartitionPanel(QWidget):
         old_name = item.text(0).split(' (')[0]
         new_name, ok = QInputDialog.getText(self, "重命名", "请输入新名称:", QLineEdit.Normal, old_name)
         if ok and new_name and new_name != old_name:
-            self.db.rename_partition(item_data['id'], new_name)
+            if item_data.get('type') == 'smart':
+                self.db.update_smart_partition(item_data['id'], name=new_name)
+            else:
+                self.db.rename_partition(item_data['id'], new_name)
             self.partitionsUpdated.emit()
 
     def _delete_item(self, item):
         item_data = item.data(0, Qt.UserRole)
+        if item_data.get('type') == 'smart':
+            item_name = item.text(0).split(' (')[0]
+            reply = QMessageBox.question(self, "确认删除", f"确定要删除智能分区 '{item_name}' 吗？\n只删除保存的搜索，其中的数据不受影响。",
+                                         QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+            if reply == QMessageBox.Yes and self.db.delete_smart_partition(item_data['id']):
+                self.partitionsUpdated.emit()
+            return
         if item_data.get('type') != 'partition':
             log.warning(f"尝试删除一个非分区类型的项目: {item_data.get('type')}")
             return
@@ -323,3 +367,8 @@ class PartitionPanel(QWidget):
             
     def get_current_selection(self):
         return self.tree.currentItem().data(0, Qt.UserRole) if self.tree.currentItem() else None
+
+    def top_level_selections(self):
+        """常用视图 (全部 / 今日 / 智能分区 / 各顶层分区) 的选择数据，供空闲预热使用"""
+        selections = [self.tree.topLevelItem(i).data(0, Qt.UserRole) for i in range(self.tree.topLevelItemCount())]
+        return [data for data in selections if data and data.get('type') in ('all', 'today', 'smart', 'partition')]
@@ -1,21 +1,20 @@
 # -*- coding: utf-8 -*-
-import os
-from PyQt5.QtWidgets import QTableWidget, QAbstractItemView, QHeaderView, QTableWidgetItem
+from PyQt5.QtWidgets import QTableView, QAbstractItemView, QHeaderView
 from PyQt5.QtCore import Qt, pyqtSignal, QSize
-from core.shared import get_color_icon, format_size
+from ui.table_model import ItemTableModel, COL_PATH, COL_ID
 
-class TablePanel(QTableWidget):
+class TablePanel(QTableView):
     reorder_signal = pyqtSignal(list)
 
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.is_trash_view = False
         
-        # 基础设置
-        self.setColumnCount(9)
-        self.setHorizontalHeaderLabels(["状态", "内容", "备注", "星级", "大小", "类型", "创建时间", "PATH", "ID"])
-        self.hideColumn(7) # 隐藏 PATH
-        self.hideColumn(8) # 隐藏 ID
+        # 基础设置：数据由 ItemTableModel 按需加载 (筛选在数据库查询中完成)
+        self.source_model = ItemTableModel(self)
+        self.setModel(self.source_model)
+        self.source_model.reordered.connect(self.reorder_signal)
+        self.hideColumn(COL_PATH) # 隐藏 PATH
+        self.hideColumn(COL_ID) # 隐藏 ID
         
         # === 核心修复：行高与图标 ===
         # 1. 强制设定行高，不再依赖自动计算，解决挤压问题
@@ -29,6 +28,8 @@ class TablePanel(QTableWidget):
         self.setDragEnabled(True)
         self.setAcceptDrops(True)
         self.setDragDropMode(QAbstractItemView.DragDrop)
+        self.setDefaultDropAction(Qt.MoveAction)
+        self.setDropIndicatorShown(True)
         self.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.setShowGrid(False) # 不显示网格线
@@ -88,99 +89,22 @@ class TablePanel(QTableWidget):
         from PyQt5.QtCore import QSettings
         QSettings("ClipboardPro", "Settings").setValue("table_font_size", size)
 
-    def dropEvent(self, event):
-        if event.source() != self: 
-            super().dropEvent(event)
-            return
-        super().dropEvent(event)
-        new_ids = []
-        for r in range(self.rowCount()):
-            item = self.item(r, 8)
-            if item: new_ids.append(int(item.text()))
-        self.reorder_signal.emit(new_ids)
+    @property
+    def is_trash_view(self):
+        return self.source_model.trash_view
 
-    def mimeData(self, indexes):
-        from PyQt5.QtCore import QMimeData
-        mime_data = QMimeData()
-        item_ids = []
-        unique_rows = {index.row() for index in indexes}
-        for row in unique_rows:
-            id_item = self.item(row, 8)
-            if id_item: item_ids.append(id_item.text())
-        if item_ids:
-            encoded_data = ",".join(item_ids).encode()
-            mime_data.setData("application/x-clipboard-item-ids", encoded_data)
-            if self.is_trash_view:
-                mime_data.setData("application/x-clipboard-source", b"trash")
-        return mime_data
+    @is_trash_view.setter
+    def is_trash_view(self, value):
+        self.source_model.trash_view = value
 
-    def populate_table(self, items, col_alignments):
-        """填充表格数据，这是 MainWindow 调用的核心方法"""
-        self.blockSignals(True)
-        self.setRowCount(len(items))
-        
-        for row, item in enumerate(items):
-            # ID (Hidden)
-            self.setItem(row, 8, QTableWidgetItem(str(item.id)))
-            
-            # 状态与图标
-            st_flags = ""
-            if item.is_pinned: st_flags += "📌"
-            if item.is_favorite: st_flags += "❤️"
-            if item.is_locked: st_flags += "🔒"
-            
-            type_icon = self._get_type_symbol(item)
-            display_text = f"{type_icon} {st_flags}".strip()
-            
-            state_item = QTableWidgetItem(display_text)
-            if item.custom_color:
-                state_item.setIcon(get_color_icon(item.custom_color))
-            # 文本居中
-            state_item.setTextAlignment(Qt.AlignCenter)
-            self.setItem(row, 0, state_item)
-            
-            # 内容
-            content_display = self._get_content_display(item)
-            content_item = QTableWidgetItem(content_display)
-            content_item.setToolTip(item.content[:500]) # 限制Tooltip长度防止卡顿
-            self.setItem(row, 1, content_item)
-
-            # 其他
-            self.setItem(row, 2, QTableWidgetItem(item.note))
-            self.setItem(row, 3, QTableWidgetItem("★" * item.star_level))
-            self.setItem(row, 4, QTableWidgetItem(format_size(item.content)))
-            self.setItem(row, 5, QTableWidgetItem(self._get_type_string(item)))
-            self.setItem(row, 6, QTableWidgetItem(item.created_at.strftime("%m-%d %H:%M")))
-            
-            # 应用对齐方式
-            for col in range(7):
-                # 默认: 内容(1)和备注(2)左对齐，其他居中
-                default_align = Qt.AlignLeft | Qt.AlignVCenter if col in [1, 2] else Qt.AlignCenter
-                align = col_alignments.get(col, default_align)
-                
-                it = self.item(row, col)
-                if it: it.setTextAlignment(align)
-
-        self.blockSignals(False)
-
-    def _get_content_display(self, item):
-        if item.item_type == 'file' and item.file_path:
-            return os.path.basename(item.file_path)
-        elif item.item_type == 'url' and item.url_domain:
-            return f"[{item.url_domain}] {item.url_title or ''}"
-        elif item.item_type == 'image':
-            return "[图片] " + (os.path.basename(item.image_path) if item.image_path else "")
-        else:
-            return item.content.replace('\n', ' ').replace('\r', '').strip()[:150]
+    def item_id_at(self, row):
+        """视图行号 -> 项目 ID"""
+        return self.source_model.item_id(row)
 
-    def _get_type_symbol(self, item):
-        if item.item_type == 'url': return "🔗"
-        if item.item_type == 'image': return "🖼️"
-        if item.item_type == 'file': return "📂" if os.path.isdir(item.file_path or "") else "📄"
-        return "📝"
+    def view_row_of(self, item_id):
+        """项目 ID -> 视图行号；尚未加载时返回 None"""
+        return self.source_model.row_of(item_id)
 
-    def _get_type_string(self, item):
-        if item.item_type == 'file' and item.file_path:
-            _, ext = os.path.splitext(item.file_path)
-            return ext.upper()[1:] if ext else "FILE"
-        return "TXT"
\ No newline at end of file
+    def selected_ids(self):
+        """选中行的项目 ID (按选中顺序)"""
+        return [i for i in (self.item_id_at(r.row()) for r in self.selectionModel().selectedRows()) if i is not None]
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+快速面板列表 (QListView + 懒加载模型 + 自绘委托)
+- 打开面板、输入搜索、切换分区时只查询第一批，不做 COUNT，滚动到底部再取下一批
+- 颜色圆点、类型图标和状态标记由委托直接绘制，不为每行创建 QListWidgetItem / QIcon
+- 搜索时摘要中的命中部分 (文本词、拼音命中的汉字、正则) 高亮显示
+"""
+import os
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QRectF, QSize
+from PyQt5.QtGui import QColor, QFont, QPainter
+from PyQt5.QtWidgets import QApplication, QStyle, QStyledItemDelegate, QStyleOptionViewItem
+from core.item_meta import ensure_metadata, type_icon
+from ui.table_model import LazyRowsMixin
+
+QUICK_FETCH_BATCH = 100
+ROW_PADDING = 8
+DOT_SIZE = 12
+HIGHLIGHT_COLOR = "#FFB74D"
+
+
+def item_badges(item):
+    """类型图标 + 状态标记 (置顶 / 收藏 / 锁定)"""
+    flags = ("📌" if getattr(item, 'is_pinned', False) else "") + \
+            ("⭐" if getattr(item, 'is_favorite', False) else "") + \
+            ("🔒" if getattr(item, 'is_locked', False) else "")
+    meta = ensure_metadata(item)
+    return f"{type_icon(getattr(item, 'item_type', 'text'), meta['type_key'], meta['file_ext'])} {flags}".strip()
+
+
+def item_summary(item):
+    """列表中显示的内容摘要 (基于捕获时计算的派生列，不访问文件系统)"""
+    item_type = getattr(item, 'item_type', '')
+    if item_type == 'file' and getattr(item, 'file_path', ''):
+        return os.path.basename(item.file_path)
+    if item_type == 'url' and getattr(item, 'url_domain', None):
+        return f"[{item.url_domain}] {item.url_title or ''}"
+    if item_type == 'image':
+        return "[图片] " + (os.path.basename(item.image_path) if getattr(item, 'image_path', None) else f"{item.content.split(' ')[-1]}")
+    return ensure_metadata(item)['preview']
+
+
+class QuickListModel(LazyRowsMixin, QAbstractListModel):
+    fetch_batch = QUICK_FETCH_BATCH
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._init_rows()
+        self.highlight = None   # 当前搜索 (core.search_query.SearchQuery)，委托据此高亮摘要
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._items)
+
+    def data(self, index, role=Qt.DisplayRole):
+        item = self.item_at(index.row()) if index.isValid() else None
+        if item is None:
+            return None
+        if role == Qt.UserRole:
+            return item
+        if role == Qt.DisplayRole:
+            return f"{item_badges(item)} {item_summary(item)}"
+        if role == Qt.ToolTipRole:
+            return getattr(item, 'preview', None)
+        return None
+
+
+class QuickItemDelegate(QStyledItemDelegate):
+    """整行自绘：背景 (遵循样式表) -> 颜色圆点 -> 图标与标记 -> 省略的摘要"""
+
+    def paint(self, painter, option, index):
+        item = index.data(Qt.UserRole)
+        opt = QStyleOptionViewItem(option)
+        self.initStyleOption(opt, index)
+        opt.text = ""
+        style = opt.widget.style() if opt.widget else QApplication.style()
+        style.drawControl(QStyle.CE_ItemViewItem, opt, painter, opt.widget)
+        if item is None:
+            return
+
+        painter.save()
+        rect = option.rect.adjusted(ROW_PADDING, 0, -ROW_PADDING, 0)
+        color = getattr(item, 'custom_color', None)
+        if color:
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QColor(color))
+            painter.drawRoundedRect(QRectF(rect.left(), rect.center().y() - DOT_SIZE / 2 + 1, DOT_SIZE, DOT_SIZE), 4, 4)
+            rect.setLeft(rect.left() + DOT_SIZE + 6)
+
+        selected = option.state & QStyle.State_Selected
+        painter.setPen(option.palette.color(option.palette.HighlightedText if selected else option.palette.Text))
+        painter.setFont(option.font)
+        fm = option.fontMetrics
+        badges = item_badges(item) + " "
+        painter.drawText(rect, Qt.AlignLeft | Qt.AlignVCenter, badges)
+        rect.setLeft(rect.left() + fm.horizontalAdvance(badges))
+        summary = fm.elidedText(item_summary(item), Qt.ElideRight, rect.width())
+        query = getattr(index.model(), 'highlight', None)
+        spans = query.highlight_spans(summary) if query else []
+        if not spans:
+            painter.drawText(rect, Qt.AlignLeft | Qt.AlignVCenter, summary)
+        else:
+            self._draw_highlighted(painter, rect, summary, spans, option)
+        painter.restore()
+
+    def _draw_highlighted(self, painter, rect, text, spans, option):
+        """逐段绘制摘要，命中区间加粗并使用高亮色"""
+        normal_pen = painter.pen()
+        bold = QFont(option.font)
+        bold.setBold(True)
+        x, pos = rect.left(), 0
+        segments = []
+        for start, end in spans:
+            if start < pos:
+                start = pos
+            if start >= end:
+                continue
+            segments.append((text[pos:start], False))
+            segments.append((text[start:end], True))
+            pos = end
+        segments.append((text[pos:], False))
+        for segment, hit in segments:
+            if not segment:
+                continue
+            painter.setFont(bold if hit else option.font)
+            painter.setPen(QColor(HIGHLIGHT_COLOR) if hit else normal_pen)
+            seg_rect = rect.adjusted(x - rect.left(), 0, 0, 0)
+            painter.drawText(seg_rect, Qt.AlignLeft | Qt.AlignVCenter, segment)
+            x += painter.fontMetrics().horizontalAdvance(segment)
+            if x >= rect.right():
+                break
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), option.fontMetrics.height() + ROW_PADDING * 2)
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+主表格的数据模型
+- 按窗口从数据库分批加载 (canFetchMore / fetchMore)，滚动到底部时才取下一批
+- 单元格在绘制时由 data() 现场生成，不再为每行创建 9 个 QTableWidgetItem
+- 拖拽排序、拖到分区、编辑模式都通过模型完成
+"""
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QMimeData, pyqtSignal
+from PyQt5.QtGui import QIcon, QPixmap
+from core.shared import get_color_icon, format_bytes
+from core.item_meta import ensure_metadata, type_icon, type_label
+
+COLUMNS = ["状态", "内容", "备注", "星级", "大小", "类型", "创建时间", "PATH", "ID"]
+COL_STATE, COL_CONTENT, COL_NOTE, COL_PATH, COL_ID = 0, 1, 2, 7, 8
+EDITABLE_COLUMNS = (COL_CONTENT, COL_NOTE)
+FETCH_BATCH = 200
+
+ITEM_IDS_MIME = "application/x-clipboard-item-ids"
+SOURCE_MIME = "application/x-clipboard-source"
+
+
+class LazyRowsMixin:
+    """
+    按窗口从数据库加载行 (主表格与快速面板共用)
+    loader(start, count) 返回 [ClipboardItem]；total 为 None 时不做 COUNT，取到不足一批即视为结束
+    """
+    fetch_batch = FETCH_BATCH
+
+    def _init_rows(self):
+        self._items = []
+        self._row_by_id = {}
+        self._loader = None
+        self._total = 0
+        self._exhausted = True
+
+    def reset(self, loader, total=None):
+        """切换查询：清空已加载的行，只取第一批"""
+        self.beginResetModel()
+        self._items = []
+        self._row_by_id = {}
+        self._loader = loader
+        self._total = None if total is None else max(0, total)
+        self._exhausted = loader is None
+        self._on_reset()
+        self.endResetModel()
+        if self.canFetchMore():
+            self.fetchMore()
+
+    def _on_reset(self):
+        pass
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted:
+            return False
+        return self._total is None or len(self._items) < self._total
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        start = len(self._items)
+        count = self.fetch_batch if self._total is None else min(self.fetch_batch, self._total - start)
+        rows = self._loader(start, count)
+        if len(rows) < count:
+            self._exhausted = True  # 已到末尾 (或数据在加载期间被删除)
+        if not rows:
+            return
+        self.beginInsertRows(QModelIndex(), start, start + len(rows) - 1)
+        for offset, item in enumerate(rows):
+            self._row_by_id[item.id] = start + offset
+        self._items.extend(rows)
+        self.endInsertRows()
+
+    def resume(self):
+        """数据源有了更多行 (流式搜索收到新结果)：取消"已到末尾"标记，屏幕未填满时继续加载"""
+        if self._loader is None:
+            return
+        self._exhausted = False
+        if len(self._items) < self.fetch_batch and self.canFetchMore():
+            self.fetchMore()
+
+    def fetch_all(self):
+        while self.canFetchMore():
+            self.fetchMore()
+
+    @property
+    def items(self):
+        return self._items
+
+    @property
+    def total(self):
+        return len(self._items) if self._total is None else self._total
+
+    def item_at(self, row):
+        return self._items[row] if 0 <= row < len(self._items) else None
+
+    def item_id(self, row):
+        item = self.item_at(row)
+        return item.id if item else None
+
+    def row_of(self, item_id):
+        return self._row_by_id.get(item_id)
+
+
+class ItemTableModel(LazyRowsMixin, QAbstractTableModel):
+    item_edited = pyqtSignal(int, int, str)   # (项目ID, 列, 新文本)
+    reordered = pyqtSignal(list)              # 拖拽排序后的项目 ID 顺序
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._init_rows()
+        self._icons = {}             # 项目ID -> 列表缩略图 QIcon (None 表示没有)
+        self._color_icons = {}
+        self.col_alignments = {}
+        self.icon_provider = None    # icon_provider(item) -> QImage 或 None (异步生成中)
+        self.editable = False
+        self.trash_view = False
+
+    def _on_reset(self):
+        self._icons = {}
+
+    # ---------- 显示 ----------
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._items)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return COLUMNS[section] if section < len(COLUMNS) else None
+        return section + 1
+
+    def data(self, index, role=Qt.DisplayRole):
+        item = self.item_at(index.row()) if index.isValid() else None
+        if item is None:
+            return None
+        col = index.column()
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return self._display(item, col)
+        if role == Qt.TextAlignmentRole and col < COL_PATH:
+            default = Qt.AlignLeft | Qt.AlignVCenter if col in EDITABLE_COLUMNS else Qt.AlignCenter
+            return int(self.col_alignments.get(col, default))
+        if role == Qt.DecorationRole:
+            if col == COL_STATE and item.custom_color:
+                if item.custom_color not in self._color_icons:
+                    self._color_icons[item.custom_color] = get_color_icon(item.custom_color)
+                return self._color_icons[item.custom_color]
+            if col == COL_CONTENT:
+                return self._thumbnail_icon(item)
+        if role == Qt.ToolTipRole and col == COL_CONTENT:
+            return ensure_metadata(item)['preview']
+        if role == Qt.UserRole:
+            return item.id
+        return None
+
+    def _display(self, item, col):
+        if col == COL_ID:
+            return str(item.id)
+        if col == COL_NOTE:
+            return item.note
+        if col == 3:
+            return "★" * (item.star_level or 0)
+        if col == 6:
+            return item.created_at.strftime("%m-%d %H:%M") if item.created_at else ""
+        if col == COL_PATH:
+            return item.file_path or ""
+        meta = ensure_metadata(item)
+        if col == COL_STATE:
+            flags = ("📌" if item.is_pinned else "") + ("❤️" if item.is_favorite else "") + ("🔒" if item.is_locked else "")
+            return f"{type_icon(item.item_type, meta['type_key'], meta['file_ext'])} {flags}".strip()
+        if col == COL_CONTENT:
+            return meta['preview'][:100]
+        if col == 4:
+            return format_bytes(meta['byte_size'])
+        if col == 5:
+            return type_label(item, meta)
+        return None
+
+    def _thumbnail_icon(self, item):
+        if item.id not in self._icons:
+            image = self.icon_provider(item) if self.icon_provider else None
+            self._icons[item.id] = QIcon(QPixmap.fromImage(image)) if image is not None else None
+        return self._icons[item.id]
+
+    def set_thumbnail(self, item_id, image):
+        """缩略图服务生成完成后刷新对应单元格"""
+        row = self.row_of(item_id)
+        if row is None:
+            return
+        self._icons[item_id] = QIcon(QPixmap.fromImage(image))
+        index = self.index(row, COL_CONTENT)
+        self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+    def set_alignment(self, col, align):
+        self.col_alignments[col] = int(align)
+        if self._items:
+            self.dataChanged.emit(self.index(0, col), self.index(len(self._items) - 1, col), [Qt.TextAlignmentRole])
+
+    # ---------- 编辑 ----------
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemIsDropEnabled
+        flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsDragEnabled | Qt.ItemIsDropEnabled
+        if self.editable and index.column() in EDITABLE_COLUMNS:
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def setData(self, index, value, role=Qt.EditRole):
+        item = self.item_at(index.row()) if index.isValid() else None
+        if item is None or role != Qt.EditRole or index.column() not in EDITABLE_COLUMNS:
+            return False
+        self.item_edited.emit(item.id, index.column(), str(value).strip())
+        return True
+
+    # ---------- 拖拽 ----------
+    def supportedDropActions(self):
+        return Qt.MoveAction | Qt.CopyAction
+
+    def mimeTypes(self):
+        return [ITEM_IDS_MIME]
+
+    def mimeData(self, indexes):
+        mime_data = QMimeData()
+        rows = sorted({index.row() for index in indexes})
+        item_ids = [str(self._items[r].id) for r in rows if r < len(self._items)]
+        if item_ids:
+            mime_data.setData(ITEM_IDS_MIME, ",".join(item_ids).encode())
+            if self.trash_view:
+                mime_data.setData(SOURCE_MIME, b"trash")
+        return mime_data
+
+    def dropMimeData(self, data, action, row, column, parent):
+        """表格内拖拽排序：把拖动的行移到目标位置，发出新的 ID 顺序"""
+        if self.trash_view or not data.hasFormat(ITEM_IDS_MIME):
+            return False
+        try:
+            moving = [int(x) for x in bytes(data.data(ITEM_IDS_MIME)).decode().split(',') if x]
+        except ValueError:
+            return False
+        moving = [i for i in moving if i in self._row_by_id]
+        if not moving:
+            return False
+        target = row if row != -1 else (parent.row() if parent.isValid() else len(self._items))
+        moving_set = set(moving)
+        before = [it for it in self._items[:target] if it.id not in moving_set]
+        after = [it for it in self._items[target:] if it.id not in moving_set]
+        moved = [self._items[self._row_by_id[i]] for i in moving]
+
+        self.beginResetModel()
+        self._items = before + moved + after
+        self._row_by_id = {it.id: r for r, it in enumerate(self._items)}
+        self.endResetModel()
+        self.reordered.emit([it.id for it in self._items])
+        return True
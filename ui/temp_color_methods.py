@@ -5,7 +5,7 @@ def toolbar_set_color(self):
         QMessageBox.information(self, "提示", "请先选择要设置颜色的项目")
         return
     
-    item_ids = [int(self.table.item(r.row(), 9).text()) for r in rows]
+    item_ids = self.table.selected_ids()
     self.set_custom_color(item_ids)
 
 def set_custom_color(self, item_ids):